@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'imtehangah_server.settings')
 
 application = get_asgi_application()
+
+# Auto-submit examinations at their deadline; see EXAM_DEADLINE_SCHEDULER.
+from usermanagement import deadlines  # noqa: E402
+
+deadlines.start()
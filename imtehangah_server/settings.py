@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'usermanagement.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,13 +80,78 @@ WSGI_APPLICATION = 'imtehangah_server.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# IMTEHANGAH_DB selects the profile: "sqlite" (default) or "postgresql".
+# PostgreSQL needs psycopg installed and keeps connections open for
+# IMTEHANGAH_DB_CONN_MAX_AGE seconds, checking them before reuse.
+
+DATABASE_PROFILE = os.environ.get('IMTEHANGAH_DB', 'sqlite')
+
+if DATABASE_PROFILE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('IMTEHANGAH_DB_NAME', 'imtehangah'),
+            'USER': os.environ.get('IMTEHANGAH_DB_USER', 'imtehangah'),
+            'PASSWORD': os.environ.get('IMTEHANGAH_DB_PASSWORD', ''),
+            'HOST': os.environ.get('IMTEHANGAH_DB_HOST', '127.0.0.1'),
+            'PORT': os.environ.get('IMTEHANGAH_DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('IMTEHANGAH_DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+        }
     }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('IMTEHANGAH_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
+# Pragmas applied to every new SQLite connection (see usermanagement.database).
+# busy_timeout is the one lock wait; it replaces the driver's `timeout` option.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
 }
 
+# Take the SQLite write lock when an atomic block begins, so writers queue on
+# busy_timeout instead of failing with "database is locked".
+SQLITE_TRANSACTION_MODE = 'IMMEDIATE'
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# IMTEHANGAH_CACHE selects the backend: "locmem" (default, per process),
+# "file" (shared by processes on one host) or "redis" (shared by all hosts).
+
+CACHE_BACKEND = os.environ.get('IMTEHANGAH_CACHE', 'locmem')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('IMTEHANGAH_REDIS_URL', 'redis://127.0.0.1:6379/1'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'var' / 'cache',
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -104,7 +171,18 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+AUTHENTICATION_BACKENDS = [
+    'django.contrib.auth.backends.ModelBackend',
+    # Students and teachers log in with their own password fields
+    'usermanagement.authentication.ExamineeBackend',
+]
+
 REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+        'usermanagement.authentication.ExamTokenAuthentication',
+    ],
     # Use Django's standard `django.contrib.auth` permissions,
     # or allow read-only access for unauthenticated users.
     'DEFAULT_PERMISSION_CLASSES': [
@@ -112,6 +190,90 @@ REST_FRAMEWORK = {
     ]
 }
 
+# Student/teacher tokens are valid for EXAM_TOKEN_MAX_AGE seconds and, once
+# verified, trusted from an in-process cache for EXAM_TOKEN_CACHE_TTL seconds.
+EXAM_TOKEN_MAX_AGE = 12 * 60 * 60
+
+EXAM_TOKEN_CACHE_TTL = 60
+
+EXAM_TOKEN_CACHE_SIZE = 50000
+
+# Examination delivery
+# Cache aliases holding question pools and pre-built examination payloads.
+
+PAPER_POOL_CACHE = 'default'
+
+EXAM_PAYLOAD_CACHE = 'default'
+
+# Payloads carry the pass key and enabled flag, so they are rebuilt after
+# EXAM_PAYLOAD_TIMEOUT seconds. The deadline thread prewarms examinations that
+# start within EXAM_PREWARM_MINUTES.
+EXAM_PAYLOAD_TIMEOUT = 60
+
+EXAM_PREWARM_MINUTES = 15
+
+# Read-through cache of question categories and per-category question lists.
+QUESTION_BANK_CACHE = 'default'
+
+QUESTION_BANK_CACHE_TIMEOUT = 60 * 60
+
+# Flag questions whose estimated similarity to an older question reaches
+# QUESTION_DUPLICATE_THRESHOLD (0 to 1) when they are saved or imported.
+DETECT_DUPLICATE_QUESTIONS = True
+
+QUESTION_DUPLICATE_THRESHOLD = 0.8
+
+# Answer autosaves are buffered in memory and written in batches every
+# AUTOSAVE_FLUSH_INTERVAL seconds or once AUTOSAVE_FLUSH_THRESHOLD answers wait.
+AUTOSAVE_FLUSH_INTERVAL = 2.0
+
+AUTOSAVE_FLUSH_THRESHOLD = 1000
+
+# Server processes (wsgi.py/asgi.py) auto-submit open participations once an
+# examination closes. Autosaves are accepted for EXAM_DEADLINE_GRACE seconds
+# after the close time. The schedule is reloaded from the database every
+# EXAM_DEADLINE_RESYNC seconds; deadlines older than EXAM_DEADLINE_LOOKBACK
+# seconds are not closed again.
+EXAM_DEADLINE_SCHEDULER = True
+
+EXAM_DEADLINE_GRACE = 30
+
+EXAM_DEADLINE_RESYNC = 5 * 60
+
+EXAM_DEADLINE_LOOKBACK = 24 * 60 * 60
+
+# Copy submitted answers into StudentAnswer rows for item analysis.
+STORE_NORMALIZED_ANSWERS = True
+
+# Background jobs run by `manage.py run_worker`
+# Failed jobs are retried JOB_MAX_ATTEMPTS times, waiting JOB_RETRY_BACKOFF
+# seconds doubled per attempt. Workers refresh their running jobs every
+# JOB_HEARTBEAT_INTERVAL seconds; running jobs without a heartbeat for
+# JOB_STALE_AFTER seconds are requeued, or failed on their last attempt.
+# Live progress goes to the JOB_PROGRESS_CACHE alias.
+JOB_MAX_ATTEMPTS = 3
+
+JOB_RETRY_BACKOFF = 30
+
+JOB_HEARTBEAT_INTERVAL = 60
+
+JOB_STALE_AFTER = 5 * 60
+
+JOB_PROGRESS_CACHE = 'default'
+
+# Performance instrumentation
+# Queries slower than PERF_SLOW_QUERY_MS are logged with their SQL. Each
+# process writes its request histograms to PERF_SNAPSHOT_DIR every
+# PERF_SNAPSHOT_INTERVAL seconds for `manage.py perfstats`. When
+# PERF_METRICS_TOKEN is set, /metrics requires it as a bearer token.
+PERF_SLOW_QUERY_MS = 200
+
+PERF_SNAPSHOT_DIR = BASE_DIR / 'var' / 'perf'
+
+PERF_SNAPSHOT_INTERVAL = 30
+
+PERF_METRICS_TOKEN = os.environ.get('IMTEHANGAH_METRICS_TOKEN')
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -129,6 +291,15 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Generated result exports, served with resumable downloads and deleted
+# EXPORT_MAX_AGE seconds after they were written
+EXPORT_ROOT = BASE_DIR / 'exports'
+
+EXPORT_MAX_AGE = 24 * 60 * 60
+
+# Uploaded bulk imports, kept until their background job has run
+IMPORT_ROOT = BASE_DIR / 'imports'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'imtehangah_server.settings')
 
 application = get_wsgi_application()
+
+# Auto-submit examinations at their deadline; see EXAM_DEADLINE_SCHEDULER.
+from usermanagement import deadlines  # noqa: E402
+
+deadlines.start()
@@ -1,10 +1,253 @@
-from django.contrib import admin
-from .models import Student, Teacher, QuestionCategory, Question, Examination, StudentParticipation, StudentResult
-
-admin.site.register(Student)
-admin.site.register(Teacher)
-admin.site.register(QuestionCategory)
-admin.site.register(Question)
-admin.site.register(Examination)
-admin.site.register(StudentParticipation)
-admin.site.register(StudentResult)
\ No newline at end of file
+import itertools
+
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import authentication, caching, jobs, payloads, search
+from .exports import stream_csv
+from .models import (DuplicateQuestion, ExamScore, Examination, Job, Question, QuestionCategory, QuestionStatistics,
+                     Student, StudentAnswer, StudentParticipation, StudentResult, Teacher)
+
+
+class CappedCountPaginator(Paginator):
+    """
+    Avoid an exact ``COUNT(*)`` over huge tables.
+
+    Unfiltered PostgreSQL changelists use the planner's row estimate; anything
+    else counts at most ``count_cap`` rows, so the page links stop there.
+    """
+    count_cap = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = queryset.query
+        if connection.vendor == 'postgresql' and not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] > self.count_cap:
+                return int(row[0])
+        return queryset.order_by().values('pk')[:self.count_cap].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    export_fields = ()
+    actions = ['export_as_csv']
+
+    @admin.action(description='Export selected rows as CSV')
+    def export_as_csv(self, request, queryset):
+        fields = self.export_fields or [field.attname for field in self.model._meta.concrete_fields]
+        rows = queryset.order_by().values_list(*fields).iterator(chunk_size=2000)
+        return stream_csv(f'{self.model._meta.model_name}.csv', itertools.chain([fields], rows))
+
+
+class EnableActionsMixin:
+    def _set_enabled(self, request, queryset, value):
+        # The selection may be filtered on is_enable itself, so it is empty once updated.
+        pks = list(queryset.values_list('pk', flat=True))
+        updated = self.model._default_manager.filter(pk__in=pks).update(is_enable=value)
+        self.after_enable_change(pks, value)
+        self.message_user(request, f"{updated} row(s) {'enabled' if value else 'disabled'}.", messages.SUCCESS)
+
+    def after_enable_change(self, pks, value):
+        """Hook for caches that ``QuerySet.update`` bypasses; ``pks`` are the rows updated."""
+
+    @admin.action(description='Enable selected rows')
+    def enable_selected(self, request, queryset):
+        self._set_enabled(request, queryset, True)
+
+    @admin.action(description='Disable selected rows')
+    def disable_selected(self, request, queryset):
+        self._set_enabled(request, queryset, False)
+
+
+class AuditedAdmin(EnableActionsMixin, LargeTableAdmin):
+    actions = ['enable_selected', 'disable_selected', 'export_as_csv']
+    list_filter = ('is_enable',)
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(Student)
+class StudentAdmin(AuditedAdmin):
+    list_display = ('student_roll_no', 'student_name', 'student_email', 'student_phone', 'is_enable', 'created_at')
+    search_fields = ('student_roll_no__exact', 'student_email__exact', '^student_name')
+    raw_id_fields = ('created_by', 'updated_by')
+    export_fields = ('student_id', 'student_roll_no', 'student_name', 'student_email', 'student_phone', 'is_enable')
+
+    def after_enable_change(self, pks, value):
+        if not value:
+            authentication.revoke_many('student', pks)
+
+
+@admin.register(Teacher)
+class TeacherAdmin(AuditedAdmin):
+    list_display = ('teacher_name', 'teacher_email', 'teacher_phone', 'is_enable', 'created_at')
+    search_fields = ('teacher_email__exact', '^teacher_name')
+    raw_id_fields = ('created_by', 'updated_by')
+    export_fields = ('teacher_id', 'teacher_name', 'teacher_email', 'teacher_phone', 'is_enable')
+
+    def after_enable_change(self, pks, value):
+        if not value:
+            authentication.revoke_many('teacher', pks)
+
+
+@admin.register(QuestionCategory)
+class QuestionCategoryAdmin(AuditedAdmin):
+    list_display = ('question_category_name', 'is_enable', 'created_at')
+    search_fields = ('^question_category_name',)
+    raw_id_fields = ('created_by', 'updated_by')
+
+    def after_enable_change(self, pks, value):
+        caching.invalidate_categories()
+
+
+@admin.register(Question)
+class QuestionAdmin(AuditedAdmin):
+    list_display = ('short_text', 'question_type', 'category', 'question_level', 'is_enable', 'updated_at')
+    list_filter = ('is_enable', 'question_type', 'question_level')
+    list_select_related = ('category',)
+    search_fields = ('question_text',)
+    autocomplete_fields = ('category', 'created_by', 'updated_by')
+    export_fields = ('question_id', 'question_text', 'answers', 'correct_answers', 'question_type', 'category_id',
+                     'question_level', 'is_enable')
+
+    @admin.display(description='Question')
+    def short_text(self, obj):
+        return obj.question_text[:80]
+
+    def get_search_results(self, request, queryset, search_term):
+        # Served by the full-text index rather than a LIKE scan of every question's text.
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=search.matching_ids(search_term)), False
+
+    def after_enable_change(self, pks, value):
+        pools = Question.objects.filter(pk__in=pks).values_list('category_id', 'question_level').distinct()
+        for category_id, level in pools:
+            payloads.invalidate_question_pool(category_id, level)
+
+
+@admin.register(Examination)
+class ExaminationAdmin(AuditedAdmin):
+    list_display = ('examination_name', 'category', 'level', 'number_of_questions', 'start_time', 'margin_time',
+                    'is_enable')
+    list_filter = ('is_enable', 'level')
+    list_select_related = ('category',)
+    search_fields = ('^examination_name',)
+    date_hierarchy = 'start_time'
+    autocomplete_fields = ('category', 'created_by', 'updated_by')
+    actions = ['enable_selected', 'disable_selected', 'regrade_selected', 'export_as_csv']
+
+    def after_enable_change(self, pks, value):
+        for examination_id in pks:
+            payloads.invalidate_payload(examination_id)
+
+    @admin.action(description='Regrade selected examinations')
+    def regrade_selected(self, request, queryset):
+        for examination in queryset:
+            job, created = jobs.enqueue('grade_examination', {'examination_id': str(examination.pk)},
+                                        user=request.user)
+            self.message_user(
+                request,
+                f"{examination}: regrade {'queued' if created else 'already ' + job.status} (job {job.pk}).",
+                messages.SUCCESS if created else messages.INFO,
+            )
+
+
+@admin.register(StudentParticipation)
+class StudentParticipationAdmin(LargeTableAdmin):
+    list_display = ('__str__', 'join_date_time', 'submit_date_time')
+    list_select_related = ('student', 'examination')
+    list_filter = (('submit_date_time', admin.EmptyFieldListFilter),)
+    search_fields = ('student__student_roll_no__exact', 'student__student_email__exact')
+    autocomplete_fields = ('student', 'examination')
+    date_hierarchy = 'join_date_time'
+
+
+@admin.register(StudentResult)
+class StudentResultAdmin(LargeTableAdmin):
+    list_display = ('__str__', 'examination_name', 'score')
+    list_select_related = ('participation__student', 'participation__examination')
+    search_fields = ('participation__student__student_roll_no__exact',)
+    raw_id_fields = ('participation',)
+    export_fields = ('student_result_id', 'participation_id', 'participation__student__student_roll_no', 'score')
+
+    @admin.display(description='Examination')
+    def examination_name(self, obj):
+        return obj.participation.examination.examination_name
+
+    def get_queryset(self, request):
+        # The answer blobs are only needed on the change form.
+        queryset = super().get_queryset(request)
+        if request.resolver_match and request.resolver_match.url_name.endswith('changelist'):
+            queryset = queryset.defer('question_result')
+        return queryset
+
+
+@admin.register(StudentAnswer)
+class StudentAnswerAdmin(LargeTableAdmin):
+    list_display = ('participation', 'question', 'chosen_answer', 'is_correct', 'time_spent')
+    list_select_related = ('participation__student', 'participation__examination', 'question')
+    list_filter = ('is_correct',)
+    raw_id_fields = ('participation', 'question')
+
+
+@admin.register(QuestionStatistics)
+class QuestionStatisticsAdmin(LargeTableAdmin):
+    list_display = ('question', 'attempt_count', 'correct_count', 'updated_at')
+    list_select_related = ('question',)
+    raw_id_fields = ('question',)
+
+
+@admin.register(DuplicateQuestion)
+class DuplicateQuestionAdmin(LargeTableAdmin):
+    list_display = ('question', 'similar_to', 'similarity', 'is_dismissed', 'created_at')
+    list_filter = ('is_dismissed',)
+    list_select_related = ('question', 'similar_to')
+    raw_id_fields = ('question', 'similar_to')
+    actions = ['dismiss_selected']
+
+    @admin.action(description='Dismiss selected flags (not duplicates)')
+    def dismiss_selected(self, request, queryset):
+        dismissed = queryset.update(is_dismissed=True)
+        self.message_user(request, f"{dismissed} flag(s) dismissed.", messages.SUCCESS)
+
+
+@admin.register(ExamScore)
+class ExamScoreAdmin(LargeTableAdmin):
+    list_display = ('examination', 'student', 'score', 'submit_date_time', 'duration_seconds')
+    list_select_related = ('examination', 'student')
+    raw_id_fields = ('participation', 'examination', 'student')
+    search_fields = ('student__student_roll_no__exact',)
+
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    list_display = ('kind', 'status', 'progress', 'attempts', 'locked_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('dedup_key__exact',)
+    raw_id_fields = ('created_by',)
+    readonly_fields = ('attempts', 'progress', 'progress_message', 'result', 'error', 'locked_by', 'locked_at',
+                       'finished_at')
+    actions = ['retry_selected']
+
+    @admin.action(description='Retry selected failed jobs')
+    def retry_selected(self, request, queryset):
+        retried = 0
+        for job_id in queryset.filter(status=Job.FAILED).values_list('pk', flat=True):
+            try:
+                with transaction.atomic():
+                    retried += Job.objects.filter(pk=job_id).update(
+                        status=Job.QUEUED, attempts=0, run_after=timezone.now(), error=None, finished_at=None,
+                    )
+            except IntegrityError:
+                # An equivalent job is already queued or running.
+                continue
+        self.message_user(request, f"{retried} job(s) queued again.", messages.SUCCESS)
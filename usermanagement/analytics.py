@@ -0,0 +1,210 @@
+"""
+Normalised answers and item analysis.
+
+Submitted answers are copied into ``StudentAnswer`` rows and counted in
+``QuestionStatistics``, so item analysis runs indexed aggregates instead of
+parsing result blobs.
+"""
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from . import grading, papers
+from .models import QuestionStatistics, StudentAnswer, StudentResult
+
+CHOSEN_ANSWER_LENGTH = 255
+DISCRIMINATION_GROUP = 0.27
+
+
+def enabled():
+    return getattr(settings, 'STORE_NORMALIZED_ANSWERS', True)
+
+
+def chosen_answer(question_type, answer):
+    values = grading.normalize_answers(question_type, grading.extract_answer(answer))
+    return '|'.join(sorted(values))[:CHOSEN_ANSWER_LENGTH]
+
+
+def _time_spent(entry):
+    if isinstance(entry, dict):
+        try:
+            return max(0, int(entry.get('time_spent')))
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def _build_answers(participation_ids):
+    entries = {}
+    for participation_id, question_result in StudentResult.objects.filter(
+        participation_id__in=participation_ids,
+    ).order_by('pk').values_list('participation_id', 'question_result'):
+        if isinstance(question_result, dict):
+            entries.setdefault(participation_id, {}).update(question_result)
+
+    # Only questions on the participation's paper are recorded.
+    paper_sets = {
+        participation_id: frozenset(str(question_id) for question_id in paper)
+        for participation_id, paper in papers.papers_for(entries).items()
+    }
+    answer_key = grading.answer_key_for(set().union(*paper_sets.values()))
+
+    rows = []
+    for participation_id, answers in entries.items():
+        paper = paper_sets.get(participation_id, frozenset())
+        for question_id, entry in answers.items():
+            key_entry = answer_key.get(str(question_id)) if str(question_id) in paper else None
+            if key_entry is None:
+                continue
+            rows.append(StudentAnswer(
+                participation_id=participation_id,
+                question_id=question_id,
+                chosen_answer=chosen_answer(key_entry[0], entry),
+                is_correct=grading.is_correct(key_entry, entry),
+                time_spent=_time_spent(entry),
+            ))
+    return rows
+
+
+def _increment_statistics(rows):
+    increments = defaultdict(lambda: [0, 0, 0, 0])
+    for row in rows:
+        counters = increments[row.question_id]
+        counters[0] += 1
+        counters[1] += int(row.is_correct)
+        if row.time_spent is not None:
+            counters[2] += row.time_spent
+            counters[3] += 1
+    QuestionStatistics.objects.bulk_create(
+        [QuestionStatistics(question_id=question_id) for question_id in increments],
+        ignore_conflicts=True,
+    )
+    for question_id, (attempts, correct, time_spent, timed) in increments.items():
+        QuestionStatistics.objects.filter(question_id=question_id).update(
+            attempt_count=F('attempt_count') + attempts,
+            correct_count=F('correct_count') + correct,
+            total_time_spent=F('total_time_spent') + time_spent,
+            timed_attempt_count=F('timed_attempt_count') + timed,
+        )
+
+
+def record_submissions(participation_ids):
+    """
+    Normalise the answers of submitted participations and update counters.
+
+    Participations that already have answer rows are skipped, so recording
+    the same submission twice does not count it twice.
+    """
+    if not enabled():
+        return 0
+    participation_ids = [uuid.UUID(str(participation_id)) for participation_id in participation_ids]
+    with transaction.atomic():
+        recorded = set(StudentAnswer.objects.filter(
+            participation_id__in=list(participation_ids),
+        ).values_list('participation_id', flat=True).distinct())
+        pending = [participation_id for participation_id in participation_ids if participation_id not in recorded]
+        rows = _build_answers(pending)
+        StudentAnswer.objects.bulk_create(rows, batch_size=500)
+        _increment_statistics(rows)
+    return len(rows)
+
+
+def rescore_answers(examination, answer_key, batch_size=500):
+    """Refresh ``is_correct`` after an answer key changed and rebuild the counters it touches."""
+    if not enabled():
+        return 0
+    answers = StudentAnswer.objects.filter(
+        participation__examination_id=examination.pk,
+    ).order_by('pk').values_list('student_answer_id', 'question_id', 'chosen_answer', 'is_correct')
+    changed_questions = set()
+    updated = 0
+    last_id = None
+    while True:
+        page = answers if last_id is None else answers.filter(pk__gt=last_id)
+        batch = list(page[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        updates = []
+        for answer_id, question_id, chosen, was_correct in batch:
+            key_entry = answer_key.get(str(question_id))
+            if key_entry is None:
+                continue
+            now_correct = grading.is_correct(key_entry, chosen.split('|') if chosen else [])
+            if now_correct != was_correct:
+                updates.append(StudentAnswer(student_answer_id=answer_id, is_correct=now_correct))
+                changed_questions.add(question_id)
+        StudentAnswer.objects.bulk_update(updates, ['is_correct'], batch_size=batch_size)
+        updated += len(updates)
+    for question_id in changed_questions:
+        QuestionStatistics.objects.filter(question_id=question_id).update(
+            correct_count=StudentAnswer.objects.filter(question_id=question_id, is_correct=True).count(),
+        )
+    return updated
+
+
+def rebuild_statistics(question_ids):
+    """Recompute the counters of ``question_ids`` from their answer rows."""
+    question_ids = list(question_ids)
+    totals = StudentAnswer.objects.filter(question_id__in=question_ids).values('question_id').annotate(
+        attempts=Count('pk'),
+        correct=Count('pk', filter=Q(is_correct=True)),
+        total_time=Coalesce(Sum('time_spent'), 0),
+        timed=Count('time_spent'),
+    )
+    rows = [
+        QuestionStatistics(
+            question_id=total['question_id'],
+            attempt_count=total['attempts'],
+            correct_count=total['correct'],
+            total_time_spent=total['total_time'],
+            timed_attempt_count=total['timed'],
+        )
+        for total in totals
+    ]
+    with transaction.atomic():
+        QuestionStatistics.objects.filter(question_id__in=question_ids).delete()
+        QuestionStatistics.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def item_analysis(question, distractors=5):
+    """Return difficulty, distractor and discrimination figures for a question."""
+    statistics = QuestionStatistics.objects.filter(question=question).first()
+    attempts = statistics.attempt_count if statistics else 0
+    correct = statistics.correct_count if statistics else 0
+    answers = StudentAnswer.objects.filter(question=question)
+
+    wrong_choices = list(
+        answers.filter(is_correct=False).exclude(chosen_answer='')
+        .values('chosen_answer').annotate(count=Count('pk')).order_by('-count', 'chosen_answer')[:distractors]
+    )
+
+    discrimination = None
+    group_size = int(attempts * DISCRIMINATION_GROUP)
+    if group_size:
+        # Students are ranked by their stored total, one join per answer row.
+        ranked = answers.annotate(
+            total=F('participation__exam_score__score'),
+            correct_value=Case(When(is_correct=True, then=Value(1.0)), default=Value(0.0), output_field=FloatField()),
+        )
+        upper = ranked.order_by(F('total').desc(nulls_last=True), 'pk')[:group_size].aggregate(p=Avg('correct_value'))['p']
+        lower = ranked.order_by(F('total').asc(nulls_first=True), 'pk')[:group_size].aggregate(p=Avg('correct_value'))['p']
+        discrimination = round((upper or 0.0) - (lower or 0.0), 4)
+
+    return {
+        'question_id': str(question.pk),
+        'attempts': attempts,
+        'correct': correct,
+        'percent_correct': round(100.0 * correct / attempts, 2) if attempts else None,
+        'average_time_spent': (
+            round(statistics.total_time_spent / statistics.timed_attempt_count, 2)
+            if statistics and statistics.timed_attempt_count else None
+        ),
+        'top_distractors': wrong_choices,
+        'discrimination_index': discrimination,
+    }
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class UsermangementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'usermanagement'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+
+        from . import search, signals  # noqa: F401
+        from .database import configure_connection
+        from .metrics import install_query_observer
+
+        connection_created.connect(configure_connection, dispatch_uid='usermanagement.configure_connection')
+        connection_created.connect(install_query_observer, dispatch_uid='usermanagement.install_query_observer')
+        post_migrate.connect(search.ensure_index, sender=self, dispatch_uid='usermanagement.ensure_search_index')
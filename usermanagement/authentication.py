@@ -0,0 +1,180 @@
+"""
+Token authentication for students and teachers.
+
+The password hash is checked once at login. Tokens carry a stamp of that hash
+and are verified from an in-process LRU cache afterwards.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import BaseBackend
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.core import signing
+from django.utils.crypto import constant_time_compare, salted_hmac
+from rest_framework import authentication, exceptions
+
+from .lru import LRUCache
+from .models import Student, Teacher
+
+TOKEN_SALT = 'usermanagement.exam-token'
+TOKEN_KEYWORD = 'Bearer'
+
+ROLES = {
+    'student': (Student, 'student_email', 'student_password'),
+    'teacher': (Teacher, 'teacher_email', 'teacher_password'),
+}
+
+
+class ExamUser:
+    """The authenticated student or teacher attached to ``request.user``."""
+
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+    is_staff = False
+    is_superuser = False
+
+    def __init__(self, role, pk, name, email):
+        self.role = role
+        self.pk = pk
+        self.name = name
+        self.email = email
+
+    @property
+    def is_student(self):
+        return self.role == 'student'
+
+    @property
+    def is_teacher(self):
+        return self.role == 'teacher'
+
+    def has_perm(self, perm, obj=None):
+        return False
+
+    def has_perms(self, perm_list, obj=None):
+        return False
+
+    def __str__(self):
+        return self.name
+
+
+def _principal(role, instance):
+    model, email_field, password_field = ROLES[role]
+    return ExamUser(role, instance.pk, getattr(instance, instance._meta.model_name + '_name'),
+                    getattr(instance, email_field))
+
+
+def password_stamp(password_hash):
+    return salted_hmac(TOKEN_SALT, password_hash).hexdigest()[:12]
+
+
+def verify_password(raw_password, stored):
+    """Check a password, accepting legacy plain-text values. Returns (ok, needs_rehash)."""
+    try:
+        identify_hasher(stored)
+    except ValueError:
+        return constant_time_compare(raw_password, stored), True
+    return check_password(raw_password, stored), False
+
+
+class ExamineeBackend(BaseBackend):
+    def authenticate(self, request, email=None, password=None, role='student'):
+        if role not in ROLES or email is None or password is None:
+            return None
+        model, email_field, password_field = ROLES[role]
+        instance = model.objects.filter(**{f'{email_field}__iexact': email}).first()
+        if instance is None:
+            # Run the hasher anyway so unknown emails take as long as bad passwords.
+            make_password(password)
+            return None
+        ok, needs_rehash = verify_password(password, getattr(instance, password_field))
+        if not ok or not instance.is_enable:
+            return None
+        if needs_rehash:
+            setattr(instance, password_field, make_password(password))
+            model.objects.filter(pk=instance.pk).update(**{password_field: getattr(instance, password_field)})
+        return instance
+
+    def get_user(self, user_id):
+        return None
+
+
+def role_of(instance):
+    return 'teacher' if isinstance(instance, Teacher) else 'student'
+
+
+def issue_token(instance):
+    role = role_of(instance)
+    password_field = ROLES[role][2]
+    return signing.dumps(
+        {'r': role, 'id': str(instance.pk), 's': password_stamp(getattr(instance, password_field))},
+        salt=TOKEN_SALT,
+        compress=True,
+    )
+
+
+def token_max_age():
+    return getattr(settings, 'EXAM_TOKEN_MAX_AGE', 12 * 60 * 60)
+
+
+token_cache = LRUCache(
+    maxsize=getattr(settings, 'EXAM_TOKEN_CACHE_SIZE', 50000),
+    ttl=getattr(settings, 'EXAM_TOKEN_CACHE_TTL', 60),
+)
+
+
+def authenticate_token(token):
+    """Return the ``ExamUser`` for a token or ``None`` if it is not valid."""
+    principal = token_cache.get(token)
+    if principal is not None:
+        return principal
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT, max_age=token_max_age())
+    except signing.BadSignature:
+        return None
+    role = data.get('r')
+    if role not in ROLES:
+        return None
+    model, email_field, password_field = ROLES[role]
+    instance = model.objects.filter(pk=data.get('id'), is_enable=True).first()
+    if instance is None or not constant_time_compare(data.get('s', ''), password_stamp(getattr(instance, password_field))):
+        return None
+    principal = _principal(role, instance)
+    token_cache.set(token, principal)
+    return principal
+
+
+def cached_principal(token):
+    return token_cache.get(token)
+
+
+def revoke(role, pk):
+    """Forget every cached token of a student or teacher in this process."""
+    return revoke_many(role, [pk])
+
+
+def revoke_many(role, pks):
+    pks = {str(pk) for pk in pks}
+    return token_cache.delete_where(lambda token, principal: principal.role == role and str(principal.pk) in pks)
+
+
+def token_from_header(header):
+    parts = (header or '').split()
+    if len(parts) != 2 or parts[0] != TOKEN_KEYWORD:
+        return None
+    return parts[1]
+
+
+class ExamTokenAuthentication(authentication.BaseAuthentication):
+    def authenticate(self, request):
+        header = authentication.get_authorization_header(request).decode('latin-1')
+        if not header:
+            return None
+        token = token_from_header(header)
+        if token is None:
+            return None
+        principal = authenticate_token(token)
+        if principal is None:
+            raise exceptions.AuthenticationFailed('Invalid or expired token.')
+        return principal, token
+
+    def authenticate_header(self, request):
+        return TOKEN_KEYWORD
@@ -0,0 +1,169 @@
+"""Write-behind buffer that merges answer autosaves into batched ``StudentResult`` writes."""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .models import StudentParticipation, StudentResult
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 2.0
+DEFAULT_FLUSH_THRESHOLD = 1000
+
+
+def normalize_entry(value):
+    if isinstance(value, dict) and 'answer' in value:
+        entry = {'answer': value['answer']}
+        if value.get('time_spent') is not None:
+            entry['time_spent'] = value['time_spent']
+        return entry
+    return {'answer': value}
+
+
+class AnswerBuffer:
+    def __init__(self, flush_interval=None, flush_threshold=None):
+        if flush_interval is None:
+            flush_interval = getattr(settings, 'AUTOSAVE_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        if flush_threshold is None:
+            flush_threshold = getattr(settings, 'AUTOSAVE_FLUSH_THRESHOLD', DEFAULT_FLUSH_THRESHOLD)
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._buffered = 0
+        self._counters = {'received': 0, 'flushed': 0, 'dropped': 0, 'flushes': 0, 'failures': 0}
+        self._timer = None
+
+    def add(self, participation_id, answers):
+        """
+        Buffer answers for a participation.
+
+        Returns ``True`` when the buffer reached its flush threshold and the
+        caller should flush.
+        """
+        participation_id = str(participation_id)
+        with self._lock:
+            deltas = self._pending.setdefault(participation_id, {})
+            for question_id, value in answers.items():
+                if str(question_id) not in deltas:
+                    self._buffered += 1
+                deltas[str(question_id)] = normalize_entry(value)
+            self._counters['received'] += len(answers)
+            full = self._buffered >= self.flush_threshold
+        self._ensure_timer()
+        return full
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, buffered=self._buffered, participations=len(self._pending))
+
+    def _take(self, participation_ids=None):
+        with self._lock:
+            if participation_ids is None:
+                pending, self._pending = self._pending, {}
+            else:
+                pending = {}
+                for participation_id in participation_ids:
+                    deltas = self._pending.pop(str(participation_id), None)
+                    if deltas:
+                        pending[str(participation_id)] = deltas
+            self._buffered -= sum(len(deltas) for deltas in pending.values())
+            return pending
+
+    def _restore(self, pending):
+        # Put deltas back after a failed flush; newer autosaves win.
+        with self._lock:
+            for participation_id, deltas in pending.items():
+                current = self._pending.get(participation_id, {})
+                restored = {**deltas, **current}
+                self._buffered += len(restored) - len(current)
+                self._pending[participation_id] = restored
+
+    def flush(self, participation_ids=None):
+        """Persist buffered answers, optionally only for some participations."""
+        with self._flush_lock:
+            pending = self._take(participation_ids)
+            if not pending:
+                return 0
+            try:
+                flushed, dropped = self._persist(pending)
+            except Exception:
+                self._restore(pending)
+                with self._lock:
+                    self._counters['failures'] += 1
+                raise
+            with self._lock:
+                self._counters['flushed'] += flushed
+                self._counters['dropped'] += dropped
+                self._counters['flushes'] += 1
+            return flushed
+
+    def _persist(self, pending):
+        with transaction.atomic():
+            open_ids = {
+                str(participation_id) for participation_id in StudentParticipation.objects.filter(
+                    pk__in=list(pending), submit_date_time__isnull=True,
+                ).values_list('pk', flat=True)
+            }
+            # Lock the rows so processes flushing the same participation merge
+            # in turn. Two first flushes racing to create a row hit the unique
+            # constraint; the loser's answers are restored and merged next time.
+            results = {
+                str(result.participation_id): result
+                for result in StudentResult.objects.select_for_update().filter(participation_id__in=open_ids)
+            }
+
+            to_update, to_create = [], []
+            flushed = dropped = 0
+            for participation_id, deltas in pending.items():
+                if participation_id not in open_ids:
+                    dropped += len(deltas)
+                    continue
+                flushed += len(deltas)
+                result = results.get(participation_id)
+                if result is None:
+                    to_create.append(StudentResult(participation_id=participation_id, question_result=deltas))
+                else:
+                    question_result = result.question_result if isinstance(result.question_result, dict) else {}
+                    question_result.update(deltas)
+                    result.question_result = question_result
+                    to_update.append(result)
+
+            if to_update:
+                StudentResult.objects.bulk_update(to_update, ['question_result'], batch_size=500)
+            if to_create:
+                StudentResult.objects.bulk_create(to_create, batch_size=500)
+        return flushed, dropped
+
+    def _ensure_timer(self):
+        if self.flush_interval <= 0 or self._timer is not None:
+            return
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Thread(target=self._run_timer, name='autosave-flusher', daemon=True)
+                self._timer.start()
+
+    def _run_timer(self):
+        event = threading.Event()
+        while not event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Autosave flush failed; answers kept for the next attempt.')
+            finally:
+                close_old_connections()
+
+
+answer_buffer = AnswerBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        answer_buffer.flush()
+    except Exception:
+        logger.exception('Autosave flush at exit failed.')
@@ -0,0 +1,126 @@
+"""Versioned read-through caching; invalidating a scope bumps the version in its keys."""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .lru import LRUCache
+from .models import Question, QuestionCategory
+
+DEFAULT_TIMEOUT = 60 * 60
+
+
+def _scope_key(scope):
+    # Scopes may contain free text such as question levels.
+    return hashlib.md5(str(scope).encode('utf-8')).hexdigest()[:16]
+
+
+class VersionedCache:
+    registry = {}
+
+    def __init__(self, namespace, alias='default', timeout=DEFAULT_TIMEOUT):
+        self.namespace = namespace
+        self.alias = alias
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._filled = LRUCache(maxsize=100000)
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+        VersionedCache.registry[namespace] = self
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _version_key(self, scope):
+        return f"{self.namespace}:version:{_scope_key(scope)}"
+
+    def version(self, scope):
+        key = self._version_key(scope)
+        version = self.cache.get(key)
+        if version is None:
+            self.cache.add(key, time.time_ns(), None)
+            version = self.cache.get(key)
+        return version
+
+    def invalidate(self, scope):
+        key = self._version_key(scope)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, time.time_ns(), None)
+        self._count('invalidations')
+
+    def key(self, scope, name=''):
+        return f"{self.namespace}:{_scope_key(scope)}:{self.version(scope)}:{name}"
+
+    def get_or_load(self, scope, loader, name=''):
+        """Return the cached value for ``scope``/``name``, calling ``loader`` on a miss."""
+        key = self.key(scope, name)
+        value = self.cache.get(key)
+        if value is not None:
+            self._count('hits')
+            return value
+        self._count('misses')
+        if self._filled.get(key):
+            self._count('evictions')
+        value = loader()
+        self.cache.set(key, value, self.timeout)
+        self._filled.set(key, True)
+        return value
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+        return stats
+
+
+def all_stats():
+    return {namespace: versioned.stats() for namespace, versioned in VersionedCache.registry.items()}
+
+
+question_bank = VersionedCache(
+    'question_bank',
+    alias=getattr(settings, 'QUESTION_BANK_CACHE', 'default'),
+    timeout=getattr(settings, 'QUESTION_BANK_CACHE_TIMEOUT', DEFAULT_TIMEOUT),
+)
+
+CATEGORIES_SCOPE = 'categories'
+
+
+def get_categories(include_disabled=False):
+    """Read-through list of question categories as dicts."""
+    def load():
+        return list(QuestionCategory.objects.order_by('question_category_name').values(
+            'question_category_id', 'question_category_name', 'is_enable',
+        ))
+    categories = question_bank.get_or_load(CATEGORIES_SCOPE, load)
+    return categories if include_disabled else [category for category in categories if category['is_enable']]
+
+
+def get_category_questions(category_id, level=None, include_disabled=False):
+    """Read-through list of a category's questions, without their correct answers."""
+    def load():
+        return list(Question.objects.filter(category_id=category_id).order_by('created_at', 'question_id').values(
+            'question_id', 'question_text', 'answers', 'question_type', 'question_level', 'is_enable',
+        ))
+    questions = question_bank.get_or_load(f'category:{category_id}', load)
+    return [
+        question for question in questions
+        if (include_disabled or question['is_enable']) and (level is None or question['question_level'] == level)
+    ]
+
+
+def invalidate_categories():
+    question_bank.invalidate(CATEGORIES_SCOPE)
+
+
+def invalidate_category_questions(category_id):
+    question_bank.invalidate(f'category:{category_id}')
@@ -0,0 +1,61 @@
+"""
+Per-connection database tuning.
+
+New SQLite connections get ``SQLITE_PRAGMAS`` (WAL, ``busy_timeout``,
+``synchronous=NORMAL``), and ``SQLITE_TRANSACTION_MODE`` opens transactions
+with ``BEGIN IMMEDIATE`` so writers queue instead of failing with ``database
+is locked``. Bulk writers (grading, finalising submissions, rescoring answers)
+commit in chunks for the same reason: no single transaction holds the write
+lock for long.
+"""
+from django.conf import settings
+
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite_pragmas():
+    return getattr(settings, 'SQLITE_PRAGMAS', DEFAULT_SQLITE_PRAGMAS)
+
+
+def sqlite_transaction_mode():
+    return getattr(settings, 'SQLITE_TRANSACTION_MODE', None)
+
+
+def _begin_with(connection, mode):
+    def start_transaction_under_autocommit():
+        connection.cursor().execute(f'BEGIN {mode}')
+    return start_transaction_under_autocommit
+
+
+def configure_connection(sender, connection, **kwargs):
+    """``connection_created`` receiver applying ``SQLITE_PRAGMAS``."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    mode = sqlite_transaction_mode()
+    if mode and 'transaction_mode' not in connection.settings_dict.get('OPTIONS', {}):
+        connection._start_transaction_under_autocommit = _begin_with(connection, mode)
+
+
+def describe(connection):
+    """Return the settings that matter for throughput on ``connection``."""
+    description = {'vendor': connection.vendor, 'alias': connection.alias}
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for name in sqlite_pragmas():
+                cursor.execute(f'PRAGMA {name}')
+                row = cursor.fetchone()
+                description[name] = row[0] if row else None
+        description['transaction_mode'] = sqlite_transaction_mode() or 'DEFERRED'
+    else:
+        description['conn_max_age'] = connection.settings_dict.get('CONN_MAX_AGE')
+        description['conn_health_checks'] = connection.settings_dict.get('CONN_HEALTH_CHECKS')
+    return description
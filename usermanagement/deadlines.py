@@ -0,0 +1,274 @@
+"""
+In-process examination deadline scheduler.
+
+One daemon thread per process sleeps on a heap of deadlines, auto-submits an
+examination one ``AUTOSAVE_FLUSH_INTERVAL`` after it closes, prewarms the
+payloads of examinations about to start and resyncs from the database every
+``EXAM_DEADLINE_RESYNC`` seconds. Late autosaves are rejected from memory.
+"""
+import heapq
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import payloads, submissions
+from .autosave import DEFAULT_FLUSH_INTERVAL, answer_buffer
+from .models import Examination, StudentParticipation
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY = 30
+
+
+def grace():
+    return getattr(settings, 'EXAM_DEADLINE_GRACE', 30)
+
+
+def deadline(examination):
+    """Timestamp after which answers to ``examination`` are no longer accepted."""
+    return payloads.close_time(examination).timestamp() + grace()
+
+
+def close_examination(examination_id, now=None):
+    """
+    Submit every open participation of an examination and return their IDs.
+
+    Returns ``None`` without submitting anything when the examination's
+    deadline, read again from the database, is still ahead.
+    """
+    examination = Examination.objects.filter(pk=examination_id).only('pk', 'start_time', 'margin_time').first()
+    if examination is None:
+        return []
+    if deadline(examination) > (now or time.time()):
+        return None
+    answer_buffer.flush()
+    submitted_at = timezone.now()
+    updated = StudentParticipation.objects.filter(
+        examination_id=examination_id, submit_date_time__isnull=True,
+    ).update(submit_date_time=submitted_at)
+    if not updated:
+        return []
+    participation_ids = list(StudentParticipation.objects.filter(
+        examination_id=examination_id, submit_date_time=submitted_at,
+    ).values_list('pk', flat=True))
+    submissions.finalize(participation_ids)
+    return participation_ids
+
+
+class DeadlineScheduler:
+    def __init__(self, settle=None, resync_interval=None, lookback=None, prewarm_minutes=None):
+        if settle is None:
+            settle = getattr(settings, 'AUTOSAVE_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        if resync_interval is None:
+            resync_interval = getattr(settings, 'EXAM_DEADLINE_RESYNC', 5 * 60)
+        if lookback is None:
+            lookback = getattr(settings, 'EXAM_DEADLINE_LOOKBACK', 24 * 60 * 60)
+        if prewarm_minutes is None:
+            prewarm_minutes = getattr(settings, 'EXAM_PREWARM_MINUTES', 15)
+        self.settle = settle
+        self.prewarm_minutes = prewarm_minutes
+        self.resync_interval = resync_interval
+        self.lookback = lookback
+        self._condition = threading.Condition()
+        self._deadlines = {}
+        self._heap = []
+        self._closed = set()
+        self._confirmed = set()
+        self._counters = {'scheduled': 0, 'closed': 0, 'submitted': 0, 'failures': 0, 'rejected': 0}
+        self._thread = None
+        self._stopping = False
+
+    # Deadlines
+
+    def schedule(self, examination_id, deadline_ts, fire_at=None):
+        examination_id = str(examination_id)
+        with self._condition:
+            if self._deadlines.get(examination_id) == deadline_ts and fire_at is None:
+                return
+            self._deadlines[examination_id] = deadline_ts
+            self._closed.discard(examination_id)
+            self._confirmed.discard(examination_id)
+            heapq.heappush(self._heap, (fire_at or deadline_ts + self.settle, examination_id, deadline_ts))
+            self._counters['scheduled'] += 1
+            self._condition.notify()
+
+    def schedule_examination(self, examination):
+        self.schedule(examination.pk, deadline(examination))
+
+    def refresh(self, examination_id):
+        """Reschedule an examination from the database and return its deadline, or ``None`` if it is gone."""
+        examination = Examination.objects.filter(pk=examination_id).only('pk', 'start_time', 'margin_time').first()
+        if examination is None:
+            self.cancel(examination_id)
+            return None
+        deadline_ts = deadline(examination)
+        self.schedule(examination.pk, deadline_ts)
+        return deadline_ts
+
+    def cancel(self, examination_id):
+        with self._condition:
+            self._deadlines.pop(str(examination_id), None)
+            self._closed.discard(str(examination_id))
+            self._confirmed.discard(str(examination_id))
+
+    def deadline_of(self, examination_id):
+        return self._deadlines.get(str(examination_id))
+
+    def accepts(self, examination_id, now=None):
+        """False once the examination's deadline has passed. Unknown examinations are accepted."""
+        examination_id = str(examination_id)
+        now = now or time.time()
+        deadline_ts = self._deadlines.get(examination_id)
+        if deadline_ts is None or now <= deadline_ts:
+            return True
+        if examination_id not in self._confirmed:
+            # The examination may have been extended in another process since the last resync.
+            deadline_ts = self.refresh(examination_id)
+            if deadline_ts is None or now <= deadline_ts:
+                return True
+            with self._condition:
+                self._confirmed.add(examination_id)
+        with self._condition:
+            self._counters['rejected'] += 1
+        return False
+
+    def stats(self):
+        with self._condition:
+            return dict(self._counters, pending=len(self._deadlines) - len(self._closed), heap=len(self._heap),
+                        running=int(self._thread is not None and self._thread.is_alive()))
+
+    def restore(self):
+        """Schedule every examination whose deadline is recent or ahead, and forget older ones."""
+        now = timezone.now()
+        examinations = Examination.objects.filter(
+            start_time__gte=now - timedelta(seconds=self.lookback) - timedelta(minutes=self._longest_margin()),
+        ).only('pk', 'start_time', 'margin_time')
+        current = set()
+        for examination in examinations.iterator():
+            deadline_ts = deadline(examination)
+            if deadline_ts >= now.timestamp() - self.lookback:
+                current.add(str(examination.pk))
+                self.schedule(examination.pk, deadline_ts)
+        with self._condition:
+            for examination_id in set(self._deadlines) - current:
+                self._deadlines.pop(examination_id)
+                self._closed.discard(examination_id)
+                self._confirmed.discard(examination_id)
+        return len(current)
+
+    def prewarm(self):
+        """Cache the payloads of examinations starting soon or running. Returns how many."""
+        count = 0
+        for examination in payloads.exams_to_prewarm(self.prewarm_minutes):
+            payloads.prewarm(examination)
+            count += 1
+        return count
+
+    def _longest_margin(self):
+        longest = Examination.objects.order_by('-margin_time').values_list('margin_time', flat=True).first()
+        return max(longest or 0, 0)
+
+    # Firing
+
+    def _due(self, now):
+        """Pop the entries due at ``now``; return them and the seconds until the next one."""
+        due = []
+        with self._condition:
+            while self._heap:
+                fire_at, examination_id, deadline_ts = self._heap[0]
+                if self._deadlines.get(examination_id) != deadline_ts or examination_id in self._closed:
+                    heapq.heappop(self._heap)
+                    continue
+                if fire_at > now:
+                    return due, fire_at - now
+                heapq.heappop(self._heap)
+                due.append((examination_id, deadline_ts))
+            return due, None
+
+    def run_due(self, now=None):
+        """Close the examinations that are due. Returns the seconds until the next one, if any."""
+        now = now or time.time()
+        due, wait = self._due(now)
+        for examination_id, deadline_ts in due:
+            try:
+                submitted = close_examination(examination_id, now)
+                if submitted is None:
+                    # Extended elsewhere; the new deadline replaces this entry.
+                    deadline_ts = self.refresh(examination_id)
+                    if deadline_ts is not None:
+                        next_fire = deadline_ts + self.settle - now
+                        wait = next_fire if wait is None else min(wait, next_fire)
+                    continue
+            except Exception:
+                logger.exception('Closing examination %s failed; retrying in %s seconds.', examination_id, RETRY_DELAY)
+                with self._condition:
+                    self._counters['failures'] += 1
+                self.schedule(examination_id, deadline_ts, fire_at=time.time() + RETRY_DELAY)
+                wait = RETRY_DELAY if wait is None else min(wait, RETRY_DELAY)
+                continue
+            with self._condition:
+                if self._deadlines.get(examination_id) == deadline_ts:
+                    self._closed.add(examination_id)
+                self._counters['closed'] += 1
+                self._counters['submitted'] += len(submitted)
+            if submitted:
+                logger.info('Examination %s closed; %s participation(s) submitted.', examination_id, len(submitted))
+        return wait
+
+    # Thread
+
+    def start(self):
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='exam-deadlines', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            thread, self._thread = self._thread, None
+            self._condition.notify()
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        next_resync = 0.0
+        while True:
+            now = time.time()
+            try:
+                if now >= next_resync:
+                    self.restore()
+                    self.prewarm()
+                    next_resync = now + self.resync_interval
+                wait = self.run_due()
+            except Exception:
+                logger.exception('Deadline scheduler iteration failed.')
+                wait = RETRY_DELAY
+            finally:
+                close_old_connections()
+            timeout = next_resync - time.time()
+            if wait is not None:
+                timeout = min(timeout, wait)
+            with self._condition:
+                if self._stopping:
+                    return
+                # Woken early by schedule() when an earlier deadline arrives.
+                self._condition.wait(max(timeout, 0.0))
+                if self._stopping:
+                    return
+
+
+scheduler = DeadlineScheduler()
+
+
+def start():
+    """Start the scheduler thread if ``EXAM_DEADLINE_SCHEDULER`` is enabled. Called from wsgi.py and asgi.py."""
+    if getattr(settings, 'EXAM_DEADLINE_SCHEDULER', True):
+        scheduler.start()
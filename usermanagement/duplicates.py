@@ -0,0 +1,153 @@
+"""
+Near-duplicate question detection.
+
+MinHash signatures of word 3-shingles are banded into LSH buckets, so
+candidates come from one indexed lookup. Pairs reaching
+``QUESTION_DUPLICATE_THRESHOLD`` become ``DuplicateQuestion`` rows.
+"""
+import hashlib
+import random
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import DuplicateQuestion, QuestionBucket, QuestionFingerprint
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+MERSENNE_PRIME = (1 << 61) - 1
+IN_BATCH = 500
+
+WORD_PATTERN = re.compile(r'\w+')
+
+_random = random.Random(20240501)
+PERMUTATIONS = [(_random.randrange(1, MERSENNE_PRIME), _random.randrange(0, MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+
+def threshold():
+    return getattr(settings, 'QUESTION_DUPLICATE_THRESHOLD', 0.8)
+
+
+def enabled():
+    return getattr(settings, 'DETECT_DUPLICATE_QUESTIONS', True)
+
+
+def shingles(question_text, answers=()):
+    words = WORD_PATTERN.findall(str(question_text).casefold())
+    if isinstance(answers, (list, tuple)):
+        words += sorted(word for answer in answers for word in WORD_PATTERN.findall(str(answer).casefold()))
+    if len(words) < SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[index:index + SHINGLE_SIZE]) for index in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def signature(question_text, answers=()):
+    """Return the MinHash signature of a question, or ``None`` if it has no words."""
+    hashes = [_hash(shingle) for shingle in shingles(question_text, answers)]
+    if not hashes:
+        return None
+    return [min((a * value + b) % MERSENNE_PRIME for value in hashes) for a, b in PERMUTATIONS]
+
+
+def buckets(values):
+    result = []
+    for band in range(BANDS):
+        rows = ','.join(str(value) for value in values[band * ROWS:(band + 1) * ROWS])
+        result.append(f'{band:02d}' + hashlib.blake2b(rows.encode('ascii'), digest_size=8).hexdigest())
+    return result
+
+
+def similarity(first, second):
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_PERM
+
+
+def _chunks(values, size=IN_BATCH):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def index_questions(questions):
+    """
+    Fingerprint ``questions`` and flag those that nearly duplicate another one.
+
+    Questions are treated as newer than everything already indexed and, within
+    the batch, in the order given. Returns the number of new flags.
+    """
+    if not enabled():
+        return 0
+    signatures = {}
+    for question in questions:
+        values = signature(question.question_text, question.answers)
+        if values is not None:
+            signatures[question.pk] = values
+    if not signatures:
+        return 0
+    question_buckets = {question_id: buckets(values) for question_id, values in signatures.items()}
+    minimum = threshold()
+
+    with transaction.atomic():
+        ids = list(signatures)
+        QuestionBucket.objects.filter(question_id__in=ids).delete()
+        DuplicateQuestion.objects.filter(question_id__in=ids, is_dismissed=False).delete()
+
+        by_bucket = defaultdict(set)
+        for chunk in _chunks({bucket for values in question_buckets.values() for bucket in values}):
+            for bucket, question_id in QuestionBucket.objects.filter(bucket__in=chunk).values_list(
+                    'bucket', 'question_id'):
+                by_bucket[bucket].add(question_id)
+
+        existing = {question_id for members in by_bucket.values() for question_id in members}
+        known = {}
+        for chunk in _chunks(existing):
+            known.update(QuestionFingerprint.objects.filter(question_id__in=chunk).values_list(
+                'question_id', 'signature'))
+
+        flags = []
+        for question_id in ids:
+            candidates = {other for bucket in question_buckets[question_id] for other in by_bucket[bucket]}
+            for other in candidates:
+                if other == question_id or other not in known:
+                    continue
+                score = similarity(signatures[question_id], known[other])
+                if score >= minimum:
+                    flags.append(DuplicateQuestion(question_id=question_id, similar_to_id=other,
+                                                   similarity=round(score, 4)))
+            # Later questions of the batch are compared with this one too.
+            known[question_id] = signatures[question_id]
+            for bucket in question_buckets[question_id]:
+                by_bucket[bucket].add(question_id)
+
+        # Flags pointing at a reindexed question must still hold.
+        dependants = list(DuplicateQuestion.objects.filter(similar_to_id__in=ids, is_dismissed=False)
+                          .exclude(question_id__in=ids).values_list('pk', 'question_id', 'similar_to_id'))
+        others = {}
+        for chunk in _chunks({question_id for _, question_id, _ in dependants}):
+            others.update(QuestionFingerprint.objects.filter(question_id__in=chunk).values_list(
+                'question_id', 'signature'))
+        stale = [
+            pk for pk, question_id, similar_to_id in dependants
+            if question_id not in others or similarity(signatures[similar_to_id], others[question_id]) < minimum
+        ]
+        if stale:
+            DuplicateQuestion.objects.filter(pk__in=stale).delete()
+
+        QuestionFingerprint.objects.bulk_create(
+            [QuestionFingerprint(question_id=question_id, signature=values) for question_id, values in signatures.items()],
+            update_conflicts=True, unique_fields=['question'], update_fields=['signature', 'updated_at'],
+        )
+        QuestionBucket.objects.bulk_create(
+            [QuestionBucket(question_id=question_id, bucket=bucket)
+             for question_id, values in question_buckets.items() for bucket in values],
+            batch_size=1000,
+        )
+        DuplicateQuestion.objects.bulk_create(flags, ignore_conflicts=True)
+    return len(flags)
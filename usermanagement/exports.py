@@ -0,0 +1,229 @@
+"""
+Streaming examination result exports.
+
+CSV is streamed into the response. XLSX is written under ``EXPORT_ROOT``,
+replacing the previous export, and served with HTTP range support; files older
+than ``EXPORT_MAX_AGE`` seconds are removed.
+"""
+import csv
+import os
+import re
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import http_date, quote_etag
+
+from . import grading, papers
+from .models import Question, StudentParticipation
+
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_MAX_AGE = 24 * 60 * 60
+FILE_CHUNK_SIZE = 64 * 1024
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+EXPORT_NAME_PATTERN = re.compile(r'^[\w.-]+$')
+
+try:
+    import openpyxl
+except ImportError:  # XLSX export is optional
+    openpyxl = None
+
+
+class Echo:
+    """A file-like object that hands back what ``csv.writer`` writes."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(filename, rows):
+    """Stream an iterable of rows (header first) as a CSV attachment."""
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse((writer.writerow(row) for row in rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def question_columns(examination, chunk_size=DEFAULT_CHUNK_SIZE):
+    """IDs of the questions on any stored paper of the examination, oldest question first."""
+    question_ids = set()
+    undrawn = []
+    rows = StudentParticipation.objects.filter(examination_id=examination.pk).values_list('pk', 'paper')
+    for participation_id, paper in rows.iterator(chunk_size=chunk_size):
+        if paper is None:
+            undrawn.append(participation_id)
+        else:
+            question_ids.update(paper)
+    for start in range(0, len(undrawn), chunk_size):
+        for paper in papers.papers_for(undrawn[start:start + chunk_size]).values():
+            question_ids.update(paper)
+    return [
+        str(question_id) for question_id in Question.objects.filter(pk__in=list(question_ids))
+        .order_by('created_at', 'question_id').values_list('question_id', flat=True)
+    ]
+
+
+def _format_answer(entry):
+    answer = grading.extract_answer(entry)
+    if isinstance(answer, (list, tuple)):
+        return '|'.join(str(value) for value in answer)
+    return '' if answer is None else str(answer)
+
+
+def result_rows(examination, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the header and one row per participation, answered or not."""
+    columns = question_columns(examination, chunk_size)
+    yield ['student_roll_no', 'student_name', 'student_email', 'join_date_time', 'submit_date_time', 'score',
+           *[f'Q{number}:{question_id}' for number, question_id in enumerate(columns, start=1)]]
+    # At most one result per participation, joined with LEFT OUTER JOIN.
+    participations = StudentParticipation.objects.filter(
+        examination_id=examination.pk,
+    ).order_by('join_date_time', 'pk').values_list(
+        'student__student_roll_no',
+        'student__student_name',
+        'student__student_email',
+        'join_date_time',
+        'submit_date_time',
+        'results__score',
+        'results__question_result',
+    )
+    for roll_no, name, email, joined, submitted, score, question_result in participations.iterator(
+            chunk_size=chunk_size):
+        answers = question_result if isinstance(question_result, dict) else {}
+        yield [
+            roll_no, name, email,
+            joined.isoformat() if joined else '',
+            submitted.isoformat() if submitted else '',
+            '' if score is None else score,
+            *[_format_answer(answers.get(question_id)) for question_id in columns],
+        ]
+
+
+def export_root():
+    root = Path(getattr(settings, 'EXPORT_ROOT', Path(settings.BASE_DIR) / 'exports'))
+    root.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def export_filename(examination, file_format):
+    return f"results-{examination.pk}-{timezone.now():%Y%m%d%H%M%S}.{file_format}"
+
+
+def prune_exports(keep=None, max_age=None):
+    """Delete exports and leftover partial files older than ``max_age`` seconds, except ``keep``."""
+    if max_age is None:
+        max_age = getattr(settings, 'EXPORT_MAX_AGE', DEFAULT_MAX_AGE)
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in export_root().iterdir():
+        if path == keep or not path.is_file():
+            continue
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+def write_export(examination, file_format='csv', chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write an export into ``EXPORT_ROOT`` and return its path."""
+    path = export_root() / export_filename(examination, file_format)
+    partial = path.with_name(path.name + '.part')
+    if file_format == 'xlsx':
+        if openpyxl is None:
+            raise RuntimeError('XLSX export requires openpyxl.')
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet(title='Results')
+        for row in result_rows(examination, chunk_size):
+            sheet.append(row)
+        workbook.save(partial)
+    else:
+        with open(partial, 'w', newline='', encoding='utf-8') as handle:
+            writer = csv.writer(handle)
+            for row in result_rows(examination, chunk_size):
+                writer.writerow(row)
+    os.replace(partial, path)
+    # The new file supersedes earlier exports of the examination in this format.
+    for previous in export_root().glob(f'results-{examination.pk}-*.{file_format}'):
+        if previous != path:
+            previous.unlink(missing_ok=True)
+    prune_exports(keep=path)
+    return path
+
+
+def resolve_export(name):
+    if not EXPORT_NAME_PATTERN.match(name) or name.endswith('.part'):
+        return None
+    path = export_root() / name
+    return path if path.is_file() else None
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = handle.read(min(FILE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _parse_range(header, size):
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes.
+        length = min(int(last), size)
+        return size - length, size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start > end:
+        return None
+    return start, end
+
+
+def ranged_file_response(request, path, content_type):
+    """Serve a generated file, honouring ``Range`` and ``If-Range``."""
+    stat = path.stat()
+    size = stat.st_size
+    etag = quote_etag(f'{int(stat.st_mtime)}-{size}')
+    last_modified = http_date(stat.st_mtime)
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and (not if_range or if_range in (etag, last_modified)):
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None or byte_range[0] >= size:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = StreamingHttpResponse(_read_range(path, 0, size), content_type=content_type)
+        response['Content-Length'] = str(size)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read_range(path, start, end - start + 1), content_type=content_type,
+                                         status=206)
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    response['Content-Disposition'] = f'attachment; filename="{path.name}"'
+    return response
+
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
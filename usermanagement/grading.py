@@ -0,0 +1,250 @@
+"""
+Batch grading of examinations.
+
+Only the questions on a participation's paper count. Results are scored in
+batches by a pure function that can run in a process pool.
+"""
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import django
+
+from . import analytics, papers, scoreboard
+from .models import Question, StudentResult
+
+DEFAULT_BATCH_SIZE = 500
+PROCESS_POOL_THRESHOLD = 5000
+
+TRUE_VALUES = {'true', 't', 'yes', 'y', '1'}
+FALSE_VALUES = {'false', 'f', 'no', 'n', '0'}
+
+
+@dataclass
+class GradingReport:
+    examination_id: str
+    results: int = 0
+    questions: int = 0
+    batches: int = 0
+    workers: int = 1
+    elapsed: float = 0.0
+
+    @property
+    def results_per_second(self):
+        return self.results / self.elapsed if self.elapsed else 0.0
+
+
+def _normalize_text(value):
+    return ' '.join(str(value).split()).casefold()
+
+
+def _normalize_bool(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    text = _normalize_text(value)
+    if text in TRUE_VALUES:
+        return 'true'
+    if text in FALSE_VALUES:
+        return 'false'
+    return text
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return list(value)
+    return [value]
+
+
+def normalize_answers(question_type, values):
+    normalize = _normalize_bool if question_type == 'TF' else _normalize_text
+    return frozenset(normalize(value) for value in _as_list(values))
+
+
+def extract_answer(entry):
+    if isinstance(entry, dict) and 'answer' in entry:
+        return entry['answer']
+    return entry
+
+
+def is_correct(key_entry, answer):
+    question_type, correct = key_entry
+    chosen = normalize_answers(question_type, extract_answer(answer))
+    if not chosen:
+        return False
+    if question_type == 'SA':
+        # Any accepted spelling of a short answer is correct.
+        return len(chosen) == 1 and chosen <= correct
+    return chosen == correct
+
+
+def _answer_key(questions):
+    rows = questions.values_list('question_id', 'question_type', 'correct_answers')
+    return {
+        str(question_id): (question_type, normalize_answers(question_type, correct_answers))
+        for question_id, question_type, correct_answers in rows.iterator()
+    }
+
+
+def build_answer_key(examination):
+    """Return ``{question_id: (question_type, correct_answers)}`` for an exam."""
+    return _answer_key(Question.objects.filter(
+        category_id=examination.category_id,
+        question_level=examination.level,
+    ))
+
+
+def answer_key_for(question_ids):
+    return _answer_key(Question.objects.filter(pk__in=list(question_ids)))
+
+
+def score_result(answer_key, question_result, paper=None):
+    """Count the correct answers of a result; with ``paper`` only its questions count."""
+    if not isinstance(question_result, dict):
+        return 0.0
+    score = 0
+    for question_id, answer in question_result.items():
+        question_id = str(question_id)
+        if paper is not None and question_id not in paper:
+            continue
+        key_entry = answer_key.get(question_id)
+        if key_entry is not None and is_correct(key_entry, answer):
+            score += 1
+    return float(score)
+
+
+def score_batch(answer_key, batch):
+    """Score a list of ``(result_id, question_result, paper)`` triples."""
+    return [
+        (result_id, score_result(answer_key, question_result, paper))
+        for result_id, question_result, paper in batch
+    ]
+
+
+def _iter_batches(examination, batch_size):
+    # Keyset pagination keeps every batch an indexed range scan and never
+    # holds a cursor open on the table that is being updated.
+    results = StudentResult.objects.filter(
+        participation__examination_id=examination.pk,
+    ).order_by('student_result_id').values_list(
+        'student_result_id', 'question_result', 'participation_id', 'participation__paper',
+    )
+    pool = None
+    last_id = None
+    while True:
+        page = results if last_id is None else results.filter(student_result_id__gt=last_id)
+        rows = list(page[:batch_size])
+        if not rows:
+            return
+        batch = []
+        for result_id, question_result, participation_id, paper in rows:
+            if paper is None:
+                # Joined before papers were stored: draw it again from the pool.
+                pool = pool if pool is not None else papers.get_exam_pool(examination)
+                paper = papers.draw_paper(pool, examination.number_of_questions, participation_id.int)
+            batch.append((result_id, question_result, frozenset(str(question_id) for question_id in paper)))
+        yield batch
+        last_id = rows[-1][0]
+
+
+def _write_scores(scored, batch_size):
+    StudentResult.objects.bulk_update(
+        [StudentResult(student_result_id=result_id, score=score) for result_id, score in scored],
+        ['score'],
+        batch_size=batch_size,
+    )
+
+
+def _collect(scored, batch_size, report):
+    _write_scores(scored, batch_size)
+    report.results += len(scored)
+    report.batches += 1
+
+
+def grade_participations(participation_ids):
+    """
+    Score the results of a few participations, e.g. at submit time.
+
+    Only the questions on their papers are loaded. Returns
+    ``{participation_id: total_score}``.
+    """
+    participation_ids = [uuid.UUID(str(participation_id)) for participation_id in participation_ids]
+    paper_sets = {
+        participation_id: frozenset(str(question_id) for question_id in paper)
+        for participation_id, paper in papers.papers_for(participation_ids).items()
+    }
+    rows = list(StudentResult.objects.filter(
+        participation_id__in=list(participation_ids),
+    ).values_list('student_result_id', 'participation_id', 'question_result'))
+    answer_key = answer_key_for(set().union(*paper_sets.values()))
+    totals = {participation_id: 0.0 for participation_id in participation_ids}
+    scored = score_batch(answer_key, [
+        (result_id, question_result, paper_sets.get(participation_id, frozenset()))
+        for result_id, participation_id, question_result in rows
+    ])
+    for (result_id, score), (_, participation_id, _) in zip(scored, rows):
+        totals[participation_id] = totals.get(participation_id, 0.0) + score
+    _write_scores(scored, DEFAULT_BATCH_SIZE)
+    return totals
+
+
+def _init_worker():
+    django.setup()
+
+
+def grade_examination(examination, batch_size=DEFAULT_BATCH_SIZE, workers=None, progress=None):
+    """
+    Score every result of ``examination`` and store the scores.
+
+    ``workers`` greater than one spreads the batches over a process pool; by
+    default a pool is only used once the examination has more than
+    ``PROCESS_POOL_THRESHOLD`` results. ``progress``, if given, is called
+    with ``(graded, total)`` after every batch.
+    """
+    started = time.perf_counter()
+    answer_key = build_answer_key(examination)
+    report = GradingReport(examination_id=str(examination.pk), questions=len(answer_key))
+
+    total = None
+    if workers is None or progress is not None:
+        total = StudentResult.objects.filter(participation__examination_id=examination.pk).count()
+    if workers is None:
+        workers = None if total > PROCESS_POOL_THRESHOLD else 1
+
+    def collect(scored):
+        _collect(scored, batch_size, report)
+        if progress is not None:
+            progress(report.results, total)
+
+    def batches():
+        for batch in _iter_batches(examination, batch_size):
+            # Paper questions that have since left the pool still count.
+            missing = {question_id for _, _, paper in batch for question_id in paper} - answer_key.keys()
+            if missing:
+                answer_key.update(answer_key_for(missing))
+            yield batch
+
+    if workers == 1:
+        for batch in batches():
+            collect(score_batch(answer_key, batch))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            report.workers = executor._max_workers
+            # Keep a bounded number of batches in flight so memory does not
+            # grow with the size of the examination.
+            pending = deque()
+            for batch in batches():
+                pending.append(executor.submit(score_batch, answer_key, batch))
+                if len(pending) >= report.workers * 2:
+                    collect(pending.popleft().result())
+            while pending:
+                collect(pending.popleft().result())
+
+    analytics.rescore_answers(examination, answer_key, batch_size)
+    scoreboard.rebuild(examination)
+
+    report.elapsed = time.perf_counter() - started
+    return report
@@ -0,0 +1,332 @@
+"""
+Streaming bulk importers for students, teachers and questions.
+
+Bad rows are reported by line number and the rest are written in chunks.
+``manage.py import_*`` hashes passwords on a process pool; API uploads are
+imported by a background job.
+"""
+import csv
+import json
+import re
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DataError, IntegrityError, transaction
+
+from . import duplicates, payloads
+from .models import Question, QuestionCategory, Student, Teacher
+
+DEFAULT_CHUNK_SIZE = 1000
+FORMATS = ('csv', 'jsonl')
+UPLOAD_NAME_PATTERN = re.compile(r'^[a-z]+-[0-9a-f]{32}\.(csv|jsonl)$')
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows(self):
+        return self.created + self.skipped
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'skipped': self.skipped,
+            'errors': [{'line': line, 'error': error} for line, error in self.errors],
+            'elapsed': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def detect_format(name):
+    return 'jsonl' if str(name).lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_rows(stream, file_format):
+    """Yield ``(line_number, row)`` pairs from a text stream."""
+    if file_format == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield line_number, exc
+                continue
+            yield line_number, row if isinstance(row, dict) else ValueError('Row is not an object.')
+    else:
+        # Line 1 is the header row.
+        for line_number, row in enumerate(csv.DictReader(stream), start=2):
+            yield line_number, row
+
+
+def import_root():
+    root = Path(getattr(settings, 'IMPORT_ROOT', Path(settings.BASE_DIR) / 'imports'))
+    root.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def save_upload(uploaded_file, kind, file_format):
+    """Copy an uploaded file into ``IMPORT_ROOT`` and return its name."""
+    name = f'{kind}-{uuid.uuid4().hex}.{file_format}'
+    with open(import_root() / name, 'wb') as handle:
+        for chunk in uploaded_file.chunks():
+            handle.write(chunk)
+    return name
+
+
+def resolve_upload(name):
+    if not UPLOAD_NAME_PATTERN.match(str(name)):
+        return None
+    path = import_root() / name
+    return path if path.is_file() else None
+
+
+def _required(row, *names):
+    values = []
+    for name in names:
+        value = row.get(name)
+        if value is None or str(value).strip() == '':
+            raise ValidationError(f"'{name}' is required.")
+        values.append(str(value).strip())
+    return values
+
+
+def _as_bool(value, default=True):
+    if value is None or str(value).strip() == '':
+        return default
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y', 't')
+
+
+def _as_list(value):
+    if isinstance(value, list):
+        return value
+    text = str(value or '').strip()
+    if text.startswith('['):
+        return json.loads(text)
+    return [part.strip() for part in text.split('|') if part.strip()]
+
+
+def _init_worker():
+    django.setup()
+
+
+class BaseImporter:
+    model = None
+    password_field = None
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, created_by=None):
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.created_by = created_by
+
+    def prepare(self):
+        """Load whatever the uniqueness checks need, once per import."""
+
+    def build(self, row):
+        """Validate a row and return an unsaved model instance."""
+        raise NotImplementedError
+
+    def clean(self, instance):
+        # Field lengths and choices. The raw password is checked once hashed,
+        # and foreign keys come from prepare() rather than a query per row.
+        exclude = [field.name for field in self.model._meta.concrete_fields if field.is_relation]
+        if self.password_field:
+            exclude.append(self.password_field)
+        instance.clean_fields(exclude=exclude)
+        return instance
+
+    def run(self, rows):
+        started = time.perf_counter()
+        report = ImportReport()
+        self.prepare()
+        executor = None
+        if self.password_field and self.workers != 1:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        try:
+            chunk = []
+            for line_number, row in rows:
+                if isinstance(row, Exception):
+                    report.errors.append((line_number, str(row)))
+                    report.skipped += 1
+                    continue
+                try:
+                    chunk.append((line_number, self.clean(self.build(row))))
+                except (ValidationError, ValueError, KeyError) as exc:
+                    if isinstance(exc, ValidationError) and hasattr(exc, 'error_dict'):
+                        message = '; '.join(f'{name}: {error}' for name, errors in exc.message_dict.items()
+                                            for error in errors)
+                    else:
+                        message = '; '.join(exc.messages) if isinstance(exc, ValidationError) else str(exc)
+                    report.errors.append((line_number, message))
+                    report.skipped += 1
+                    continue
+                if len(chunk) >= self.chunk_size:
+                    report.created += len(self._write(chunk, executor, report))
+                    chunk = []
+            if chunk:
+                report.created += len(self._write(chunk, executor, report))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def _hash_passwords(self, chunk, executor):
+        raw = [getattr(instance, self.password_field) for instance in chunk]
+        if executor is None:
+            hashed = [make_password(password) for password in raw]
+        else:
+            hashed = executor.map(make_password, raw, chunksize=max(1, len(raw) // 32))
+        for instance, password in zip(chunk, hashed):
+            setattr(instance, self.password_field, password)
+
+    def _write(self, chunk, executor, report):
+        """Insert ``(line_number, instance)`` pairs and return the instances created."""
+        instances = [instance for _, instance in chunk]
+        if self.password_field:
+            self._hash_passwords(instances, executor)
+        try:
+            with transaction.atomic():
+                self.model.objects.bulk_create(instances, batch_size=self.chunk_size)
+            return instances
+        except (IntegrityError, DataError):
+            pass
+        created = []
+        for line_number, instance in chunk:
+            try:
+                with transaction.atomic():
+                    self.model.objects.bulk_create([instance])
+            except (IntegrityError, DataError) as exc:
+                report.errors.append((line_number, str(exc)))
+                report.skipped += 1
+                continue
+            created.append(instance)
+        return created
+
+
+class StudentImporter(BaseImporter):
+    model = Student
+    password_field = 'student_password'
+
+    def prepare(self):
+        self.roll_numbers = set(Student.objects.values_list('student_roll_no', flat=True).iterator())
+        self.emails = {email.lower() for email in Student.objects.values_list('student_email', flat=True).iterator()}
+
+    def build(self, row):
+        roll_no, name, email, phone, password = _required(
+            row, 'student_roll_no', 'student_name', 'student_email', 'student_phone', 'student_password'
+        )
+        validate_email(email)
+        if roll_no in self.roll_numbers:
+            raise ValidationError(f"Duplicate student_roll_no '{roll_no}'.")
+        if email.lower() in self.emails:
+            raise ValidationError(f"Duplicate student_email '{email}'.")
+        self.roll_numbers.add(roll_no)
+        self.emails.add(email.lower())
+        return Student(
+            student_roll_no=roll_no,
+            student_name=name,
+            student_email=email,
+            student_phone=phone,
+            student_password=password,
+            is_enable=_as_bool(row.get('is_enable')),
+            remarks=row.get('remarks') or None,
+            created_by=self.created_by,
+            updated_by=self.created_by,
+        )
+
+
+class TeacherImporter(BaseImporter):
+    model = Teacher
+    password_field = 'teacher_password'
+
+    def prepare(self):
+        self.emails = {email.lower() for email in Teacher.objects.values_list('teacher_email', flat=True).iterator()}
+
+    def build(self, row):
+        name, email, phone, password = _required(
+            row, 'teacher_name', 'teacher_email', 'teacher_phone', 'teacher_password'
+        )
+        validate_email(email)
+        if email.lower() in self.emails:
+            raise ValidationError(f"Duplicate teacher_email '{email}'.")
+        self.emails.add(email.lower())
+        return Teacher(
+            teacher_name=name,
+            teacher_email=email,
+            teacher_phone=phone,
+            teacher_password=password,
+            is_enable=_as_bool(row.get('is_enable')),
+            remarks=row.get('remarks') or None,
+            created_by=self.created_by,
+            updated_by=self.created_by,
+        )
+
+
+class QuestionImporter(BaseImporter):
+    model = Question
+    question_types = {code for code, label in Question.QUESTION_TYPES}
+
+    def prepare(self):
+        self.categories = {}
+        for category_id, name in QuestionCategory.objects.values_list('question_category_id', 'question_category_name'):
+            self.categories[str(category_id)] = category_id
+            self.categories.setdefault(name.lower(), category_id)
+
+    def build(self, row):
+        text, question_type, category, level = _required(
+            row, 'question_text', 'question_type', 'category', 'question_level'
+        )
+        question_type = question_type.upper()
+        if question_type not in self.question_types:
+            raise ValidationError(f"Unknown question_type '{question_type}'.")
+        category_id = self.categories.get(category) or self.categories.get(category.lower())
+        if category_id is None:
+            raise ValidationError(f"Unknown category '{category}'.")
+        correct_answers = _as_list(row.get('correct_answers'))
+        if not correct_answers:
+            raise ValidationError("'correct_answers' is required.")
+        return Question(
+            question_text=text,
+            answers=_as_list(row.get('answers')),
+            correct_answers=correct_answers,
+            question_type=question_type,
+            category_id=category_id,
+            question_level=level,
+            is_enable=_as_bool(row.get('is_enable')),
+            remarks=row.get('remarks') or None,
+            created_by=self.created_by,
+            updated_by=self.created_by,
+        )
+
+    def _write(self, chunk, executor, report):
+        created = super()._write(chunk, executor, report)
+        # bulk_create skips the save signals that keep the cached pools fresh.
+        for category_id, level in {(question.category_id, question.question_level) for question in created}:
+            payloads.invalidate_question_pool(category_id, level)
+        duplicates.index_questions(created)
+        return created
+
+
+IMPORTERS = {
+    'students': StudentImporter,
+    'teachers': TeacherImporter,
+    'questions': QuestionImporter,
+}
@@ -0,0 +1,300 @@
+"""
+Database-backed background jobs, run by ``manage.py run_worker``.
+
+Jobs are deduplicated by ``dedup_key``, retried with backoff, and queued again
+when their worker's heartbeat stops for ``JOB_STALE_AFTER`` seconds. Progress
+also goes to ``JOB_PROGRESS_CACHE``, as a handler may report it from inside a
+transaction the status API cannot see yet.
+"""
+import logging
+import time
+import traceback
+from dataclasses import asdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+
+from . import analytics, exports, grading, importers
+from .models import Examination, Job, Question
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_WRITE_INTERVAL = 1.0
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help, e.g. a missing examination."""
+
+
+class JobHandler:
+    def __init__(self, kind, func, dedup_fields=()):
+        self.kind = kind
+        self.func = func
+        self.dedup_fields = tuple(dedup_fields)
+
+    def dedup_key(self, payload):
+        if not self.dedup_fields:
+            return None
+        return ':'.join(str(payload.get(field, '')) for field in self.dedup_fields)
+
+
+HANDLERS = {}
+
+
+def job_handler(kind, dedup_fields=()):
+    """Register ``func(job, progress)`` as the handler of ``kind``."""
+    def register(func):
+        HANDLERS[kind] = JobHandler(kind, func, dedup_fields)
+        return func
+    return register
+
+
+def max_attempts():
+    return getattr(settings, 'JOB_MAX_ATTEMPTS', 3)
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'JOB_RETRY_BACKOFF', 30)
+    return min(base * 2 ** max(0, attempts - 1), 60 * 60)
+
+
+def enqueue(kind, payload=None, dedup_key=None, user=None, run_after=None):
+    """
+    Queue a job and return ``(job, created)``.
+
+    When ``dedup_key`` is not given the handler's ``dedup_fields`` build one.
+    If an active job with the same key exists it is returned instead.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'.")
+    payload = payload or {}
+    if dedup_key is None:
+        dedup_key = HANDLERS[kind].dedup_key(payload)
+    try:
+        with transaction.atomic():
+            job = Job.objects.create(
+                kind=kind,
+                payload=payload,
+                dedup_key=dedup_key,
+                max_attempts=max_attempts(),
+                run_after=run_after or timezone.now(),
+                created_by=user if isinstance(user, User) else None,
+            )
+        return job, True
+    except IntegrityError:
+        if dedup_key is None:
+            raise
+        job = Job.objects.filter(kind=kind, dedup_key=dedup_key, status__in=Job.ACTIVE_STATUSES).first()
+        if job is None:
+            # The active job finished in between; queue a fresh one.
+            return enqueue(kind, payload, dedup_key, user, run_after)
+        return job, False
+
+
+def _claim_values(worker_id):
+    return {
+        'status': Job.RUNNING,
+        'locked_by': worker_id,
+        'locked_at': timezone.now(),
+        'attempts': F('attempts') + 1,
+        'updated_at': timezone.now(),
+    }
+
+
+def claim(worker_id, limit=1):
+    """Mark up to ``limit`` due jobs as running for ``worker_id`` and return them."""
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=timezone.now()).order_by('run_after', 'created_at')
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job_ids = list(due.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            Job.objects.filter(pk__in=job_ids).update(**_claim_values(worker_id))
+    else:
+        job_ids = []
+        for job_id in due.values_list('pk', flat=True)[:limit * 4]:
+            if Job.objects.filter(pk=job_id, status=Job.QUEUED).update(**_claim_values(worker_id)):
+                job_ids.append(job_id)
+                if len(job_ids) >= limit:
+                    break
+    return list(Job.objects.filter(pk__in=job_ids).order_by('run_after', 'created_at'))
+
+
+def heartbeat(worker_id, job_ids):
+    """Refresh ``locked_at`` of the jobs ``worker_id`` is still running, so they are not taken for stale."""
+    if not job_ids:
+        return 0
+    return Job.objects.filter(pk__in=job_ids, status=Job.RUNNING, locked_by=worker_id).update(
+        locked_at=timezone.now(),
+    )
+
+
+def recover_stale(after=None):
+    """
+    Release running jobs whose worker has sent no heartbeat for ``after`` seconds.
+
+    Jobs with attempts left are queued again; the others fail, as a crash on
+    the last attempt would have. Returns ``(requeued, failed)``.
+    """
+    after = after if after is not None else getattr(settings, 'JOB_STALE_AFTER', 5 * 60)
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=after))
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, error='Worker stopped responding on the last attempt.', locked_by=None, locked_at=None,
+        finished_at=now, updated_at=now,
+    )
+    requeued = stale.update(status=Job.QUEUED, locked_by=None, locked_at=None, updated_at=now)
+    return requeued, failed
+
+
+# Progress
+
+def _progress_cache():
+    return caches[getattr(settings, 'JOB_PROGRESS_CACHE', 'default')]
+
+
+def _progress_key(job_id):
+    return f'job:progress:{job_id}'
+
+
+class ProgressReporter:
+    """Callable handed to handlers as ``progress(fraction, message='')``."""
+
+    def __init__(self, job):
+        self.job = job
+        self._last_write = 0.0
+
+    def __call__(self, fraction, message=''):
+        fraction = max(0.0, min(1.0, float(fraction)))
+        _progress_cache().set(_progress_key(self.job.pk), (fraction, message[:255]), 60 * 60)
+        now = time.monotonic()
+        if now - self._last_write >= PROGRESS_WRITE_INTERVAL and not connection.in_atomic_block:
+            self._last_write = now
+            Job.objects.filter(pk=self.job.pk).update(progress=fraction, progress_message=message[:255])
+
+
+def current_progress(job):
+    """Return ``(progress, message)`` of a job, preferring the live cached value."""
+    if job.status == Job.RUNNING:
+        cached = _progress_cache().get(_progress_key(job.pk))
+        if cached is not None:
+            return cached
+    return job.progress, job.progress_message
+
+
+# Running
+
+def run(job):
+    """Run a claimed job and record its outcome. Returns the final status."""
+    handler = HANDLERS.get(job.kind)
+    # Only while this worker still holds the job; recover_stale may have handed it on.
+    owned = Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by)
+    try:
+        if handler is None:
+            raise PermanentJobError(f"No handler for job kind '{job.kind}'.")
+        result = handler.func(job, ProgressReporter(job))
+    except Exception as exc:
+        permanent = isinstance(exc, PermanentJobError)
+        logger.exception('Job %s (%s) failed on attempt %s.', job.pk, job.kind, job.attempts)
+        values = {'error': traceback.format_exc()[-4000:], 'locked_by': None, 'locked_at': None,
+                  'updated_at': timezone.now()}
+        if permanent or job.attempts >= job.max_attempts:
+            values.update(status=Job.FAILED, finished_at=timezone.now())
+        else:
+            values.update(status=Job.QUEUED, run_after=timezone.now() + timedelta(seconds=retry_delay(job.attempts)))
+        if not owned.update(**values):
+            return _released(job)
+        _progress_cache().delete(_progress_key(job.pk))
+        return values['status']
+
+    if not owned.update(
+        status=Job.SUCCEEDED, result=result, error=None, progress=1.0, locked_by=None, locked_at=None,
+        finished_at=timezone.now(), updated_at=timezone.now(),
+    ):
+        return _released(job)
+    _progress_cache().delete(_progress_key(job.pk))
+    return Job.SUCCEEDED
+
+
+def _released(job):
+    logger.warning('Job %s (%s) was released from %s while running; its outcome is dropped.',
+                   job.pk, job.kind, job.locked_by)
+    return Job.objects.filter(pk=job.pk).values_list('status', flat=True).first()
+
+
+# Handlers
+
+def _examination(job):
+    try:
+        examination = Examination.objects.filter(pk=job.payload.get('examination_id')).first()
+    except ValidationError:
+        examination = None
+    if examination is None:
+        raise PermanentJobError(f"Examination {job.payload.get('examination_id')} not found.")
+    return examination
+
+
+@job_handler('grade_examination', dedup_fields=('examination_id',))
+def grade_examination_job(job, progress):
+    examination = _examination(job)
+    report = grading.grade_examination(
+        examination,
+        workers=job.payload.get('workers'),
+        progress=lambda graded, total: progress(graded / total if total else 1.0, f'{graded} of {total} graded'),
+    )
+    return {**asdict(report), 'results_per_second': report.results_per_second}
+
+
+@job_handler('export_results', dedup_fields=('examination_id', 'format'))
+def export_results_job(job, progress):
+    examination = _examination(job)
+    file_format = job.payload.get('format', 'csv')
+    if file_format not in exports.CONTENT_TYPES:
+        raise PermanentJobError(f"Unknown export type '{file_format}'.")
+    if file_format == 'xlsx' and exports.openpyxl is None:
+        raise PermanentJobError('XLSX export requires openpyxl.')
+    progress(0.0, 'Writing export')
+    path = exports.write_export(examination, file_format)
+    return {'file': path.name, 'size': path.stat().st_size, 'download': reverse('export-download', args=[path.name])}
+
+
+@job_handler('import_rows')
+def import_rows_job(job, progress):
+    kind = job.payload.get('kind')
+    importer_class = importers.IMPORTERS.get(kind)
+    if importer_class is None:
+        raise PermanentJobError(f"Unknown import '{kind}'.")
+    path = importers.resolve_upload(job.payload.get('file'))
+    if path is None:
+        raise PermanentJobError(f"Upload {job.payload.get('file')} not found.")
+    # Students and teachers are created by auth users, questions by teachers.
+    created_by = job.created_by if kind in ('students', 'teachers') else None
+    importer = importer_class(workers=1, created_by=created_by)
+    progress(0.0, f'Importing {kind}')
+    try:
+        with open(path, encoding='utf-8-sig', newline='') as stream:
+            report = importer.run(importers.read_rows(stream, job.payload.get('format', 'csv')))
+    except Exception:
+        if job.attempts >= job.max_attempts:
+            path.unlink(missing_ok=True)
+        raise
+    path.unlink(missing_ok=True)
+    return report.as_dict()
+
+
+@job_handler('recompute_analytics', dedup_fields=('examination_id',))
+def recompute_analytics_job(job, progress):
+    examination = _examination(job)
+    progress(0.0, 'Rescoring answers')
+    changed = analytics.rescore_answers(examination, grading.build_answer_key(examination))
+    progress(0.5, 'Rebuilding question statistics')
+    questions = analytics.rebuild_statistics(
+        Question.objects.filter(category_id=examination.category_id, question_level=examination.level)
+        .values_list('pk', flat=True)
+    )
+    return {'answers_changed': changed, 'questions': questions}
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from usermanagement.importers import DEFAULT_CHUNK_SIZE, IMPORTERS, detect_format, read_rows
+
+
+class ImportCommand(BaseCommand):
+    kind = None
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file to import.')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default=None)
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Password hashing processes. Use 1 to hash in-process.',
+        )
+
+    def handle(self, *args, **options):
+        importer = IMPORTERS[self.kind](chunk_size=options['chunk_size'], workers=options['workers'])
+        file_format = options['format'] or detect_format(options['path'])
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                report = importer.run(read_rows(stream, file_format))
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for line_number, error in report.errors:
+            self.stderr.write(f"line {line_number}: {error}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report.created} {self.kind}, skipped {report.skipped} "
+            f"in {report.elapsed:.2f}s ({report.rows_per_second:.0f} rows/s)"
+        ))
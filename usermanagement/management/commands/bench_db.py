@@ -0,0 +1,130 @@
+import json
+import random
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections, transaction
+
+from usermanagement.database import describe
+
+SCRATCH_TABLE = 'bench_db_scratch'
+
+ID_COLUMNS = {
+    'postgresql': 'BIGSERIAL PRIMARY KEY',
+    'mysql': 'BIGINT AUTO_INCREMENT PRIMARY KEY',
+}
+
+
+def _percentile(samples, percent):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class Command(BaseCommand):
+    help = 'Measure concurrent read/write throughput of the configured database against a scratch table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run for.')
+        parser.add_argument('--rows', type=int, default=10000, help='Rows seeded before the run.')
+        parser.add_argument('--keep', action='store_true', help='Keep the scratch table afterwards.')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if alias not in connections:
+            raise CommandError(f"Unknown database alias {alias}.")
+        if options['readers'] < 0 or options['writers'] < 0 or options['readers'] + options['writers'] == 0:
+            raise CommandError('At least one reader or writer is required.')
+
+        connection = connections[alias]
+        self._create_table(connection, options['rows'])
+        try:
+            report = self._run(alias, options)
+        finally:
+            if not options['keep']:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DROP TABLE {SCRATCH_TABLE}')
+        report['database'] = describe(connection)
+        self.stdout.write(json.dumps(report, indent=2, default=str))
+
+    def _create_table(self, connection, rows):
+        id_column = ID_COLUMNS.get(connection.vendor, 'INTEGER PRIMARY KEY')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {SCRATCH_TABLE}')
+            cursor.execute(
+                f'CREATE TABLE {SCRATCH_TABLE} (id {id_column}, counter INTEGER NOT NULL, payload VARCHAR(255) NOT NULL)'
+            )
+            with transaction.atomic(using=connection.alias):
+                cursor.executemany(
+                    f'INSERT INTO {SCRATCH_TABLE} (counter, payload) VALUES (%s, %s)',
+                    [(0, f'row {number}') for number in range(rows)],
+                )
+
+    def _worker(self, alias, kind, deadline, max_id, results):
+        connection = connections[alias]
+        rng = random.Random()
+        latencies, errors = [], 0
+        try:
+            while time.perf_counter() < deadline:
+                row_id = rng.randint(1, max_id)
+                started = time.perf_counter()
+                try:
+                    if kind == 'read':
+                        with connection.cursor() as cursor:
+                            cursor.execute(
+                                f'SELECT id, counter, payload FROM {SCRATCH_TABLE} WHERE id BETWEEN %s AND %s',
+                                [row_id, row_id + 20],
+                            )
+                            cursor.fetchall()
+                    else:
+                        with transaction.atomic(using=alias), connection.cursor() as cursor:
+                            cursor.execute(
+                                f'UPDATE {SCRATCH_TABLE} SET counter = counter + 1 WHERE id = %s', [row_id],
+                            )
+                            cursor.execute(
+                                f'INSERT INTO {SCRATCH_TABLE} (counter, payload) VALUES (%s, %s)', [1, 'written'],
+                            )
+                except DatabaseError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+        results.append((kind, latencies, errors))
+
+    def _run(self, alias, options):
+        results = []
+        deadline = time.perf_counter() + options['duration']
+        max_id = max(1, options['rows'])
+        threads = [
+            threading.Thread(target=self._worker, args=(alias, kind, deadline, max_id, results))
+            for kind, count in (('read', options['readers']), ('write', options['writers']))
+            for _ in range(count)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        report = {'elapsed': round(elapsed, 3), 'threads': {'readers': options['readers'], 'writers': options['writers']}}
+        for kind in ('read', 'write'):
+            latencies = [latency for result_kind, samples, _ in results if result_kind == kind for latency in samples]
+            errors = sum(count for result_kind, _, count in results if result_kind == kind)
+            report[kind] = {
+                'operations': len(latencies),
+                'errors': errors,
+                'per_second': round(len(latencies) / elapsed, 1) if elapsed else None,
+                'mean_ms': round(statistics.fmean(latencies) * 1000, 3) if latencies else None,
+                'p50_ms': round(_percentile(latencies, 50) * 1000, 3) if latencies else None,
+                'p95_ms': round(_percentile(latencies, 95) * 1000, 3) if latencies else None,
+                'p99_ms': round(_percentile(latencies, 99) * 1000, 3) if latencies else None,
+            }
+        return report
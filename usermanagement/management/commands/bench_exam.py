@@ -0,0 +1,254 @@
+import json
+import random
+import statistics
+import threading
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from usermanagement import payloads
+from usermanagement.autosave import answer_buffer
+from usermanagement.database import describe
+from usermanagement.models import Examination, Question, QuestionCategory, Student
+
+BENCH_PASSWORD = 'bench-password'
+BENCH_PASS_KEY = 'bench'
+STEPS = ('login', 'join', 'paper', 'autosave', 'submit')
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class QueryCounter:
+    """``execute_wrapper`` counting the queries of the current thread's connection."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a prefixed exam-day dataset and simulate students joining, fetching papers, autosaving and '
+        'submitting concurrently. Prints a JSON report.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=32, help='Simulated students in flight at once.')
+        parser.add_argument('--questions', type=int, default=300, help='Questions per category and level.')
+        parser.add_argument('--categories', type=int, default=3)
+        parser.add_argument('--levels', default='easy,medium,hard')
+        parser.add_argument('--paper-size', type=int, default=20)
+        parser.add_argument('--autosaves', type=int, default=5, help='Autosave requests per student.')
+        parser.add_argument('--prefix', default='bench', help='Prefix of the seeded rows, reused across runs.')
+        parser.add_argument('--host', default='localhost', help='Host header; must be in ALLOWED_HOSTS.')
+        parser.add_argument('--cold', action='store_true', help='Do not prewarm the examination payload.')
+        parser.add_argument('--output', help='Also write the JSON report to this file.')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the prefixed dataset and exit.')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['cleanup']:
+            self._cleanup(prefix)
+            return
+        if options['students'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--students and --concurrency must be positive.')
+        levels = [level.strip() for level in options['levels'].split(',') if level.strip()]
+        if not levels:
+            raise CommandError('At least one level is required.')
+
+        seeded_at = time.perf_counter()
+        students = self._seed_students(prefix, options['students'])
+        categories = self._seed_questions(prefix, options['categories'], levels, options['questions'])
+        examination = Examination.objects.create(
+            examination_name=f"{prefix} exam {timezone.now():%Y%m%d%H%M%S}",
+            number_of_questions=options['paper_size'],
+            level=levels[0],
+            category=categories[0],
+            pass_key=BENCH_PASS_KEY,
+            start_time=timezone.now() - timedelta(minutes=1),
+            margin_time=24 * 60,
+        )
+        if not options['cold']:
+            payloads.prewarm(examination)
+        seed_seconds = time.perf_counter() - seeded_at
+
+        report = self._simulate(examination, students, options)
+        report['seed_seconds'] = round(seed_seconds, 3)
+        report['examination_id'] = str(examination.pk)
+        report['autosave_buffer'] = answer_buffer.stats()
+        report['database'] = describe(connections['default'])
+
+        output = json.dumps(report, indent=2, default=str)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                handle.write(output)
+        self.stdout.write(output)
+
+    # Dataset
+
+    def _seed_students(self, prefix, count):
+        existing = Student.objects.filter(student_roll_no__startswith=f'{prefix}-').count()
+        if existing < count:
+            # Every bench student shares one password, so it is hashed once.
+            password = make_password(BENCH_PASSWORD)
+            Student.objects.bulk_create([
+                Student(
+                    student_roll_no=f'{prefix}-{number}',
+                    student_name=f'{prefix} student {number}',
+                    student_email=f'{prefix}-{number}@bench.example.com',
+                    student_phone='0000',
+                    student_password=password,
+                )
+                for number in range(existing, count)
+            ], batch_size=1000)
+        return list(
+            Student.objects.filter(student_roll_no__startswith=f'{prefix}-')
+            .order_by('student_roll_no').values_list('student_email', flat=True)[:count]
+        )
+
+    def _seed_questions(self, prefix, count, levels, per_level):
+        categories = []
+        for number in range(count):
+            category, created = QuestionCategory.objects.get_or_create(
+                question_category_name=f'{prefix} category {number}',
+            )
+            categories.append(category)
+            for level in levels:
+                existing = Question.objects.filter(category=category, question_level=level).count()
+                if existing >= per_level:
+                    continue
+                with transaction.atomic():
+                    Question.objects.bulk_create([
+                        Question(
+                            question_text=f'{prefix} {level} question {index}',
+                            answers=['a', 'b', 'c', 'd'],
+                            correct_answers=[random.choice('abcd')],
+                            question_type='MCQ',
+                            category=category,
+                            question_level=level,
+                        )
+                        for index in range(existing, per_level)
+                    ], batch_size=1000)
+                # bulk_create skips the signals that keep the caches fresh.
+                payloads.invalidate_question_pool(category.pk, level)
+        return categories
+
+    def _cleanup(self, prefix):
+        students, _ = Student.objects.filter(student_roll_no__startswith=f'{prefix}-').delete()
+        categories, _ = QuestionCategory.objects.filter(question_category_name__startswith=f'{prefix} category ').delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {students + categories} bench row(s)."))
+
+    # Simulation
+
+    def _student_session(self, client, email, examination_id, autosaves, call):
+        response = call('login', (200,), client.post, reverse('auth-login'),
+                        {'email': email, 'password': BENCH_PASSWORD, 'role': 'student'},
+                        content_type='application/json')
+        if response is None:
+            return
+        auth = {'HTTP_AUTHORIZATION': f"Bearer {response.json()['token']}"}
+
+        response = call('join', (201, 200), client.post, reverse('exam-join'),
+                        {'examination_id': examination_id, 'pass_key': BENCH_PASS_KEY},
+                        content_type='application/json', **auth)
+        if response is None:
+            return
+        paper = response.json()
+        participation_id = paper['participation_id']
+
+        call('paper', (200,), client.get, reverse('exam-paper', args=[examination_id, participation_id]), **auth)
+
+        questions = [question['question_id'] for question in paper['questions']]
+        for _ in range(autosaves):
+            answers = {
+                question_id: {'answer': random.choice('abcd'), 'time_spent': random.randint(5, 90)}
+                for question_id in random.sample(questions, min(len(questions), 5))
+            }
+            call('autosave', (202,), client.post, reverse('exam-autosave'),
+                 {'participation_id': participation_id, 'answers': answers},
+                 content_type='application/json', **auth)
+
+        call('submit', (200,), client.post, reverse('exam-submit', args=[participation_id]), **auth)
+
+    def _simulate(self, examination, students, options):
+        samples = {step: [] for step in STEPS}
+        queries = {step: [] for step in STEPS}
+        errors = {step: 0 for step in STEPS}
+        lock = threading.Lock()
+        pending = iter(students)
+        examination_id = str(examination.pk)
+
+        def worker():
+            connection = connections['default']
+            counter = QueryCounter()
+            client = Client(HTTP_HOST=options['host'])
+
+            def call(step, expected, method, *args, **kwargs):
+                """Time one request and return its response, or ``None`` if it failed."""
+                counter.count = 0
+                started = time.perf_counter()
+                response = method(*args, **kwargs)
+                latency = time.perf_counter() - started
+                with lock:
+                    if response.status_code not in expected:
+                        errors[step] += 1
+                        return None
+                    samples[step].append(latency)
+                    queries[step].append(counter.count)
+                return response
+
+            try:
+                with connection.execute_wrapper(counter):
+                    while True:
+                        with lock:
+                            email = next(pending, None)
+                        if email is None:
+                            return
+                        self._student_session(client, email, examination_id, options['autosaves'], call)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(min(options['concurrency'], len(students)))]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        steps = {}
+        for step in STEPS:
+            latencies = samples[step]
+            steps[step] = {
+                'requests': len(latencies),
+                'errors': errors[step],
+                'per_second': round(len(latencies) / elapsed, 1) if elapsed else None,
+                'p50_ms': round(_percentile(latencies, 50) * 1000, 3) if latencies else None,
+                'p95_ms': round(_percentile(latencies, 95) * 1000, 3) if latencies else None,
+                'p99_ms': round(_percentile(latencies, 99) * 1000, 3) if latencies else None,
+                'queries_per_request': round(statistics.fmean(queries[step]), 2) if queries[step] else None,
+            }
+        total = sum(step['requests'] for step in steps.values())
+        return {
+            'students': len(students),
+            'concurrency': len(threads),
+            'elapsed': round(elapsed, 3),
+            'requests': total,
+            'errors': sum(errors.values()),
+            'requests_per_second': round(total / elapsed, 1) if elapsed else None,
+            'students_per_second': round(steps['submit']['requests'] / elapsed, 1) if elapsed else None,
+            'steps': steps,
+        }
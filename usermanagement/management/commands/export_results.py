@@ -0,0 +1,39 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from usermanagement import exports
+from usermanagement.models import Examination
+
+
+class Command(BaseCommand):
+    help = 'Write result exports for examinations, or for every examination of a term, into EXPORT_ROOT.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('examination_ids', nargs='*')
+        parser.add_argument('--start', help='Export examinations starting at or after this ISO date time.')
+        parser.add_argument('--end', help='Export examinations starting before this ISO date time.')
+        parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv')
+        parser.add_argument('--chunk-size', type=int, default=exports.DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        examinations = Examination.objects.order_by('start_time')
+        if options['examination_ids']:
+            examinations = examinations.filter(pk__in=options['examination_ids'])
+        for option, lookup in (('start', 'start_time__gte'), ('end', 'start_time__lt')):
+            if options[option]:
+                value = parse_datetime(options[option])
+                if value is None:
+                    raise CommandError(f"Invalid --{option} date time.")
+                examinations = examinations.filter(**{lookup: value})
+        if not (options['examination_ids'] or options['start'] or options['end']):
+            raise CommandError('Pass examination IDs or a --start/--end range.')
+        if options['format'] == 'xlsx' and exports.openpyxl is None:
+            raise CommandError('XLSX export requires openpyxl.')
+
+        try:
+            for examination in examinations.iterator():
+                path = exports.write_export(examination, options['format'], options['chunk_size'])
+                self.stdout.write(f"{examination.examination_name}: {path}")
+        except ValidationError as exc:
+            raise CommandError(exc)
@@ -0,0 +1,36 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from usermanagement.grading import DEFAULT_BATCH_SIZE, grade_examination
+from usermanagement.models import Examination
+
+
+class Command(BaseCommand):
+    help = 'Grade every result of an examination and report throughput.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('examination_id')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Number of grading processes. Defaults to one for small examinations.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            examination = Examination.objects.get(pk=options['examination_id'])
+        except (Examination.DoesNotExist, ValidationError) as exc:
+            raise CommandError(f"Examination {options['examination_id']} not found: {exc}")
+
+        report = grade_examination(
+            examination,
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+        )
+        self.stdout.write(
+            f"Graded {report.results} results against {report.questions} questions "
+            f"in {report.batches} batches using {report.workers} worker(s)."
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.elapsed:.2f}s elapsed, {report.results_per_second:.0f} results/s"
+        ))
@@ -0,0 +1,6 @@
+from ._import_command import ImportCommand
+
+
+class Command(ImportCommand):
+    help = 'Stream teachers from a CSV or JSONL file into the database.'
+    kind = 'teachers'
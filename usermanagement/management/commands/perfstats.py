@@ -0,0 +1,79 @@
+import json
+import urllib.error
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+
+from usermanagement import metrics
+
+
+def _ms(seconds):
+    if seconds is None:
+        return None
+    return '+Inf' if seconds == float('inf') else round(seconds * 1000, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Summarise request timings per view from the per-process snapshot files, '
+        'or print the /metrics output of a running server. Percentiles are histogram bucket upper bounds.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Snapshot directory. Defaults to PERF_SNAPSHOT_DIR.')
+        parser.add_argument('--url', help='Print the Prometheus text served at this /metrics URL instead.')
+        parser.add_argument('--token', help='Bearer token for --url, see PERF_METRICS_TOKEN.')
+        parser.add_argument('--json', action='store_true', help='Print the summary as JSON.')
+
+    def handle(self, *args, **options):
+        if options['url']:
+            self.stdout.write(self._fetch(options['url'], options['token']))
+            return
+
+        directory = options['dir'] or metrics.snapshot_dir()
+        if directory is None:
+            raise CommandError('PERF_SNAPSHOT_DIR is not set; pass --dir or --url.')
+        views, processes = metrics.read_snapshots(directory)
+        rows = sorted(
+            (self._summary(view_name, view) for view_name, view in views.items()),
+            key=lambda row: row['total_s'], reverse=True,
+        )
+        if options['json']:
+            self.stdout.write(json.dumps({'processes': processes, 'views': rows}, indent=2))
+            return
+
+        self.stdout.write(f"{processes} process snapshot(s) in {directory}")
+        header = ('view', 'requests', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'queries', 'db_ms', 'slow_sql', '5xx')
+        self.stdout.write('  '.join(f'{column:>10}' if index else f'{column:<40}' for index, column in enumerate(header)))
+        for row in rows:
+            values = [row['view'], row['requests'], row['mean_ms'], row['p50_ms'], row['p95_ms'], row['p99_ms'],
+                      row['queries_per_request'], row['db_ms_per_request'], row['slow_queries'], row['errors']]
+            self.stdout.write('  '.join(
+                f'{str(value):>10}' if index else f'{str(value):<40}' for index, value in enumerate(values)
+            ))
+
+    def _summary(self, view_name, view):
+        requests = view.duration.count
+        return {
+            'view': view_name,
+            'requests': requests,
+            'total_s': round(view.duration.sum, 3),
+            'mean_ms': _ms(view.duration.sum / requests) if requests else None,
+            'p50_ms': _ms(view.duration.quantile(0.5)),
+            'p95_ms': _ms(view.duration.quantile(0.95)),
+            'p99_ms': _ms(view.duration.quantile(0.99)),
+            'queries_per_request': round(view.queries.sum / requests, 2) if requests else None,
+            'db_ms_per_request': _ms(view.db_time.sum / requests) if requests else None,
+            'slow_queries': view.slow_queries,
+            'errors': view.statuses.get('5xx', 0),
+        }
+
+    def _fetch(self, url, token):
+        request = urllib.request.Request(url)
+        if token:
+            request.add_header('Authorization', f'Bearer {token}')
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.read().decode('utf-8')
+        except (urllib.error.URLError, OSError) as exc:
+            raise CommandError(f"Could not fetch {url}: {exc}")
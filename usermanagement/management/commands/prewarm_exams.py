@@ -0,0 +1,33 @@
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+
+from usermanagement import payloads
+
+
+class Command(BaseCommand):
+    help = (
+        'Build and cache the payloads of examinations that are about to start. Needs a cache shared with the '
+        'server; with a per-process cache the deadline thread prewarms inside each server process instead.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutes', type=int, default=15,
+            help='Prewarm examinations starting within this many minutes.',
+        )
+
+    def handle(self, *args, **options):
+        if isinstance(payloads._cache(), (LocMemCache, DummyCache)):
+            raise CommandError(
+                'The payload cache is local to this process, so prewarming here has no effect on the server. '
+                'Use a shared cache (IMTEHANGAH_CACHE=redis or file) or rely on EXAM_PREWARM_MINUTES.'
+            )
+        count = 0
+        for examination in payloads.exams_to_prewarm(options['minutes']):
+            payload = payloads.prewarm(examination)
+            count += 1
+            self.stdout.write(
+                f"{examination.examination_name}: {len(payload['pool'])} questions cached"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Prewarmed {count} examination(s)."))
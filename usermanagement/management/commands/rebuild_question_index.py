@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from usermanagement import duplicates, search
+from usermanagement.models import DuplicateQuestion, Question, QuestionBucket
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the full-text question index and recompute near-duplicate fingerprints. '
+        'Run after restoring a database, VACUUM on SQLite, or changing QUESTION_DUPLICATE_THRESHOLD.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--skip-search', action='store_true', help='Only recompute fingerprints.')
+        parser.add_argument('--skip-duplicates', action='store_true', help='Only rebuild the search index.')
+
+    def handle(self, *args, **options):
+        if not options['skip_search']:
+            search.rebuild()
+            self.stdout.write('Search index rebuilt.')
+        if options['skip_duplicates']:
+            return
+
+        # Start from empty buckets so each question is only compared with older ones.
+        QuestionBucket.objects.all().delete()
+        DuplicateQuestion.objects.filter(is_dismissed=False).delete()
+        indexed = flagged = 0
+        chunk = []
+        questions = Question.objects.order_by('created_at', 'pk').only('pk', 'question_text', 'answers')
+        for question in questions.iterator(chunk_size=options['chunk_size']):
+            chunk.append(question)
+            if len(chunk) >= options['chunk_size']:
+                flagged += duplicates.index_questions(chunk)
+                indexed += len(chunk)
+                chunk = []
+        if chunk:
+            flagged += duplicates.index_questions(chunk)
+            indexed += len(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Fingerprinted {indexed} question(s); {flagged} flagged as near duplicates."))
@@ -0,0 +1,101 @@
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection
+
+from usermanagement import jobs
+
+STALE_CHECK_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = (
+        'Run queued background jobs (grading, exports, analytics) on a thread pool. '
+        'Grading of large examinations still fans out to its own process pool.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Jobs run at the same time.')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds between polls when idle.')
+        parser.add_argument('--worker-id', default=f'{socket.gethostname()}-{os.getpid()}')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due.')
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1:
+            raise CommandError('--threads must be at least 1.')
+        self.stopping = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, self._stop)
+
+        worker_id = options['worker_id']
+        threads = options['threads']
+        in_flight = set()
+        lock = threading.Lock()
+        last_stale_check = 0.0
+        last_heartbeat = time.monotonic()
+        heartbeat_interval = getattr(settings, 'JOB_HEARTBEAT_INTERVAL', 60)
+        self.stdout.write(f"Worker {worker_id} running {threads} thread(s); kinds: {', '.join(sorted(jobs.HANDLERS))}")
+
+        def execute(job):
+            close_old_connections()
+            try:
+                outcome = jobs.run(job)
+                self.stdout.write(f"{job.kind} {job.pk}: {outcome} (attempt {job.attempts})")
+            finally:
+                connection.close()
+                with lock:
+                    in_flight.discard(job.pk)
+
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='job') as executor:
+            while True:
+                if time.monotonic() - last_heartbeat >= heartbeat_interval:
+                    with lock:
+                        running = list(in_flight)
+                    try:
+                        jobs.heartbeat(worker_id, running)
+                        last_heartbeat = time.monotonic()
+                    except DatabaseError as exc:
+                        # Retried on the next poll, well inside JOB_STALE_AFTER.
+                        self.stderr.write(f"Heartbeat failed: {exc}")
+
+                if self.stopping.is_set():
+                    # Keep the jobs in flight alive until they finish.
+                    with lock:
+                        idle = not in_flight
+                    if idle:
+                        break
+                    time.sleep(min(options['poll'], heartbeat_interval))
+                    continue
+
+                if time.monotonic() - last_stale_check >= STALE_CHECK_INTERVAL:
+                    last_stale_check = time.monotonic()
+                    requeued, failed = jobs.recover_stale()
+                    if requeued or failed:
+                        self.stdout.write(f"Requeued {requeued} and failed {failed} stale job(s).")
+
+                with lock:
+                    capacity = threads - len(in_flight)
+                claimed = jobs.claim(worker_id, capacity) if capacity > 0 else []
+                for job in claimed:
+                    with lock:
+                        in_flight.add(job.pk)
+                    executor.submit(execute, job)
+
+                if not claimed:
+                    with lock:
+                        idle = not in_flight
+                    if options['once'] and idle:
+                        break
+                    self.stopping.wait(options['poll'])
+        close_old_connections()
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker_id} stopped."))
+
+    def _stop(self, signum, frame):
+        # Finish the jobs in flight but claim no more.
+        self.stopping.set()
@@ -0,0 +1,316 @@
+"""
+In-process request and query metrics.
+
+Per-view histograms are rendered at ``/metrics`` and written per process under
+``PERF_SNAPSHOT_DIR`` for ``manage.py perfstats``, which skips the snapshots
+of stopped processes.
+"""
+import bisect
+import contextvars
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SQL_LOG_LIMIT = 2000
+UNRESOLVED_VIEW = '<unresolved>'
+
+_collector = contextvars.ContextVar('usermanagement_query_collector', default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, data):
+        for index, count in enumerate(data['counts']):
+            self.counts[index] += count
+        self.sum += data['sum']
+        self.count += data['count']
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def as_dict(self):
+        return {'buckets': list(self.buckets), 'counts': list(self.counts), 'sum': self.sum, 'count': self.count}
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_time = Histogram(DURATION_BUCKETS)
+        self.statuses = {}
+        self.slow_queries = 0
+
+    def as_dict(self):
+        return {
+            'duration': self.duration.as_dict(),
+            'queries': self.queries.as_dict(),
+            'db_time': self.db_time.as_dict(),
+            'statuses': dict(self.statuses),
+            'slow_queries': self.slow_queries,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        metrics = cls()
+        metrics.merge(data)
+        return metrics
+
+    def merge(self, data):
+        self.duration.merge(data['duration'])
+        self.queries.merge(data['queries'])
+        self.db_time.merge(data['db_time'])
+        for status, count in data['statuses'].items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        self.slow_queries += data['slow_queries']
+
+
+class QueryCollector:
+    __slots__ = ('count', 'time', 'slow')
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.slow = 0
+
+
+_lock = threading.Lock()
+_views = {}
+_started = time.time()
+
+
+def slow_query_threshold():
+    return getattr(settings, 'PERF_SLOW_QUERY_MS', 200) / 1000
+
+
+def observe_query(execute, sql, params, many, context):
+    """Connection ``execute_wrapper`` timing queries run inside a request."""
+    collector = _collector.get()
+    if collector is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        collector.count += 1
+        collector.time += elapsed
+        if elapsed >= slow_query_threshold():
+            collector.slow += 1
+            logger.warning('Slow query (%.1f ms) on %s: %s', elapsed * 1000, context['connection'].alias,
+                           sql[:SQL_LOG_LIMIT])
+
+
+def install_query_observer(sender, connection, **kwargs):
+    """``connection_created`` receiver adding ``observe_query`` to the connection."""
+    if observe_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(observe_query)
+
+
+def start_request():
+    collector = QueryCollector()
+    return collector, _collector.set(collector)
+
+
+def finish_request(collector, token, view_name, status_code, duration):
+    _collector.reset(token)
+    status = f'{status_code // 100}xx'
+    with _lock:
+        metrics = _views.get(view_name)
+        if metrics is None:
+            metrics = _views[view_name] = ViewMetrics()
+        metrics.duration.observe(duration)
+        metrics.queries.observe(collector.count)
+        metrics.db_time.observe(collector.time)
+        metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+        metrics.slow_queries += collector.slow
+
+
+def snapshot():
+    with _lock:
+        views = {view_name: metrics.as_dict() for view_name, metrics in _views.items()}
+    return {
+        'host': socket.gethostname(),
+        'pid': os.getpid(),
+        'started': _started,
+        'taken': time.time(),
+        'views': views,
+    }
+
+
+def reset():
+    with _lock:
+        _views.clear()
+
+
+# Snapshot files
+
+_last_snapshot = time.monotonic()
+
+STALE_SNAPSHOTS = 3
+
+
+def snapshot_dir():
+    directory = getattr(settings, 'PERF_SNAPSHOT_DIR', None)
+    return Path(directory) if directory else None
+
+
+def snapshot_interval():
+    return getattr(settings, 'PERF_SNAPSHOT_INTERVAL', 30)
+
+
+def _process_alive(host, pid):
+    # Only processes of this host can be checked; on Windows os.kill would end them.
+    if host != socket.gethostname() or os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, TypeError, ValueError, OverflowError):
+        return True
+    return True
+
+
+def is_stale(data, now=None):
+    """Whether a snapshot belongs to a process that stopped writing or has exited."""
+    now = time.time() if now is None else now
+    if data.get('taken', 0) < now - STALE_SNAPSHOTS * snapshot_interval():
+        return True
+    return not _process_alive(data.get('host'), data.get('pid'))
+
+
+def maybe_write_snapshot():
+    """Write this process's snapshot at most every ``PERF_SNAPSHOT_INTERVAL`` seconds."""
+    global _last_snapshot
+    directory = snapshot_dir()
+    if directory is None:
+        return
+    now = time.monotonic()
+    if now - _last_snapshot < snapshot_interval():
+        return
+    _last_snapshot = now
+    try:
+        write_snapshot(directory)
+    except OSError:
+        logger.exception('Could not write the performance snapshot.')
+
+
+def write_snapshot(directory):
+    directory.mkdir(parents=True, exist_ok=True)
+    data = snapshot()
+    path = directory / f"{data['host']}-{data['pid']}.json"
+    partial = path.with_name(path.name + '.part')
+    partial.write_text(json.dumps(data), encoding='utf-8')
+    os.replace(partial, path)
+    now = time.time()
+    for other, other_data in _load_snapshots(directory):
+        if is_stale(other_data, now):
+            other.unlink(missing_ok=True)
+    return path
+
+
+def _load_snapshots(directory):
+    for path in sorted(Path(directory).glob('*.json')):
+        try:
+            yield path, json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            continue
+
+
+def read_snapshots(directory):
+    """Merge the current snapshot files of every process into ``{view_name: ViewMetrics}``."""
+    views = {}
+    processes = 0
+    now = time.time()
+    for _, data in _load_snapshots(directory):
+        if is_stale(data, now):
+            continue
+        processes += 1
+        for view_name, metrics in data['views'].items():
+            if view_name in views:
+                views[view_name].merge(metrics)
+            else:
+                views[view_name] = ViewMetrics.from_dict(metrics)
+    return views, processes
+
+
+# Prometheus text exposition
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _histogram_lines(name, view_name, histogram):
+    cumulative = 0
+    for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+        cumulative += count
+        le = '+Inf' if bound == float('inf') else repr(float(bound))
+        yield f'{name}_bucket{{view="{_label(view_name)}",le="{le}"}} {cumulative}'
+    yield f'{name}_sum{{view="{_label(view_name)}"}} {histogram.sum}'
+    yield f'{name}_count{{view="{_label(view_name)}"}} {histogram.count}'
+
+
+def render_prometheus(extra_gauges=()):
+    """Return the metrics of this process in Prometheus text format 0.0.4."""
+    with _lock:
+        views = {view_name: ViewMetrics.from_dict(metrics.as_dict()) for view_name, metrics in _views.items()}
+
+    lines = []
+    histograms = (
+        ('imtehangah_request_duration_seconds', 'Request wall time.', 'duration'),
+        ('imtehangah_request_queries', 'Database queries per request.', 'queries'),
+        ('imtehangah_request_db_seconds', 'Database time per request.', 'db_time'),
+    )
+    for name, help_text, attribute in histograms:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for view_name, metrics in sorted(views.items()):
+            lines.extend(_histogram_lines(name, view_name, getattr(metrics, attribute)))
+
+    lines += ['# HELP imtehangah_responses_total Responses by status class.',
+              '# TYPE imtehangah_responses_total counter']
+    for view_name, metrics in sorted(views.items()):
+        for status, count in sorted(metrics.statuses.items()):
+            lines.append(f'imtehangah_responses_total{{view="{_label(view_name)}",status="{status}"}} {count}')
+
+    lines += ['# HELP imtehangah_slow_queries_total Queries slower than PERF_SLOW_QUERY_MS.',
+              '# TYPE imtehangah_slow_queries_total counter']
+    for view_name, metrics in sorted(views.items()):
+        lines.append(f'imtehangah_slow_queries_total{{view="{_label(view_name)}"}} {metrics.slow_queries}')
+
+    for name, help_text, samples in extra_gauges:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+        for labels, value in samples:
+            label_text = ','.join(f'{key}="{_label(label)}"' for key, label in labels.items())
+            lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+    return '\n'.join(lines) + '\n'
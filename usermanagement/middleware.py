@@ -0,0 +1,51 @@
+"""
+Request instrumentation.
+
+``PerformanceMiddleware`` should sit first in ``MIDDLEWARE`` so the wall time
+it records covers the rest of the stack. It supports sync and async requests,
+so async views are not pushed onto a thread by it.
+"""
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import metrics
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        # Unmatched paths share one series so they cannot blow up cardinality.
+        return metrics.UNRESOLVED_VIEW
+    return match.view_name or match.route or metrics.UNRESOLVED_VIEW
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        collector, token = metrics.start_request()
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._finish(request, response, collector, token, started)
+        return response
+
+    async def __acall__(self, request):
+        collector, token = metrics.start_request()
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._finish(request, response, collector, token, started)
+        return response
+
+    def _finish(self, request, response, collector, token, started):
+        metrics.finish_request(collector, token, _view_name(request), response.status_code,
+                               time.perf_counter() - started)
+        metrics.maybe_write_snapshot()
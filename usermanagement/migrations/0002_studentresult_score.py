@@ -0,0 +1,18 @@
+# Generated by Django 5.0.11 on 2026-10-18 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usermanagement', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentresult',
+            name='score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.0.11 on 2026-10-18 08:41
+
+from django.db import migrations, models
+
+
+def remove_duplicate_participations(apps, schema_editor):
+    # Keep one participation of every (examination, student) pair so the
+    # unique constraint can be created on existing data. A submitted row wins,
+    # then one with results, then the earliest join; results of the rows
+    # removed move to the one kept instead of cascading away.
+    StudentParticipation = apps.get_model('usermanagement', 'StudentParticipation')
+    StudentResult = apps.get_model('usermanagement', 'StudentResult')
+    duplicated = (
+        StudentParticipation.objects.values('examination_id', 'student_id').annotate(rows=models.Count('pk'))
+        .filter(rows__gt=1).values_list('examination_id', 'student_id')
+    )
+    for examination_id, student_id in list(duplicated):
+        rows = list(
+            StudentParticipation.objects.filter(examination_id=examination_id, student_id=student_id)
+            .annotate(has_results=models.Exists(StudentResult.objects.filter(participation_id=models.OuterRef('pk'))))
+            .order_by(models.F('submit_date_time').desc(nulls_last=True), '-has_results', 'join_date_time')
+            .values_list('pk', flat=True)
+        )
+        kept, duplicates = rows[0], rows[1:]
+        StudentResult.objects.filter(participation_id__in=duplicates).update(participation_id=kept)
+        StudentParticipation.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usermanagement', '0002_studentresult_score'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examination',
+            index=models.Index(fields=['start_time', 'is_enable'], name='examination_schedule_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examination',
+            index=models.Index(condition=models.Q(('is_enable', True)), fields=['start_time'], name='examination_enabled_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examination',
+            index=models.Index(fields=['category', 'level'], name='examination_pool_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['category', 'question_level', 'is_enable'], name='question_pool_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(condition=models.Q(('is_enable', True)), fields=['category', 'question_level'], name='question_enabled_pool_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentparticipation',
+            index=models.Index(condition=models.Q(('submit_date_time__isnull', True)), fields=['examination'], name='participation_open_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_participations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='studentparticipation',
+            constraint=models.UniqueConstraint(fields=('examination', 'student'), name='unique_student_participation'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.11 on 2026-10-18 08:43
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usermanagement', '0003_exam_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStatistics',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistics', serialize=False, to='usermanagement.question')),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('correct_count', models.PositiveIntegerField(default=0)),
+                ('total_time_spent', models.PositiveBigIntegerField(default=0)),
+                ('timed_attempt_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StudentAnswer',
+            fields=[
+                ('student_answer_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('chosen_answer', models.CharField(blank=True, max_length=255)),
+                ('is_correct', models.BooleanField(default=False)),
+                ('time_spent', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('participation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='usermanagement.studentparticipation')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_answers', to='usermanagement.question')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['question', 'is_correct', 'chosen_answer'], name='answer_item_analysis_idx'), models.Index(fields=['participation', 'is_correct'], name='answer_participation_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='studentanswer',
+            constraint=models.UniqueConstraint(fields=('participation', 'question'), name='unique_student_answer'),
+        ),
+    ]
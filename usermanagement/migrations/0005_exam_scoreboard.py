@@ -0,0 +1,30 @@
+# Generated by Django 5.0.11 on 2026-10-18 08:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usermanagement', '0004_item_analytics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamScore',
+            fields=[
+                ('participation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='exam_score', serialize=False, to='usermanagement.studentparticipation')),
+                ('score', models.FloatField(default=0)),
+                ('rank', models.PositiveIntegerField()),
+                ('submit_date_time', models.DateTimeField()),
+                ('duration_seconds', models.PositiveIntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('examination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores', to='usermanagement.examination')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exam_scores', to='usermanagement.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['examination', 'rank'], name='exam_score_rank_idx'), models.Index(fields=['examination', '-score', 'submit_date_time'], name='exam_score_order_idx')],
+            },
+        ),
+    ]
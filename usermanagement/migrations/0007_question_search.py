@@ -0,0 +1,116 @@
+# Generated by Django 5.0.11 on 2026-10-18 09:02
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+SQLITE_FORWARD = [
+    # External-content FTS5 index over the question table, matched on rowid.
+    """
+    CREATE VIRTUAL TABLE usermanagement_question_fts USING fts5(
+        question_text, answers,
+        content='usermanagement_question',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER usermanagement_question_fts_insert AFTER INSERT ON usermanagement_question BEGIN
+        INSERT INTO usermanagement_question_fts(rowid, question_text, answers)
+        VALUES (new.rowid, new.question_text, new.answers);
+    END
+    """,
+    """
+    CREATE TRIGGER usermanagement_question_fts_delete AFTER DELETE ON usermanagement_question BEGIN
+        INSERT INTO usermanagement_question_fts(usermanagement_question_fts, rowid, question_text, answers)
+        VALUES ('delete', old.rowid, old.question_text, old.answers);
+    END
+    """,
+    """
+    CREATE TRIGGER usermanagement_question_fts_update AFTER UPDATE OF question_text, answers
+    ON usermanagement_question BEGIN
+        INSERT INTO usermanagement_question_fts(usermanagement_question_fts, rowid, question_text, answers)
+        VALUES ('delete', old.rowid, old.question_text, old.answers);
+        INSERT INTO usermanagement_question_fts(rowid, question_text, answers)
+        VALUES (new.rowid, new.question_text, new.answers);
+    END
+    """,
+    "INSERT INTO usermanagement_question_fts(usermanagement_question_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS usermanagement_question_fts_insert',
+    'DROP TRIGGER IF EXISTS usermanagement_question_fts_delete',
+    'DROP TRIGGER IF EXISTS usermanagement_question_fts_update',
+    'DROP TABLE IF EXISTS usermanagement_question_fts',
+]
+
+POSTGRESQL_FORWARD = [
+    """
+    CREATE INDEX usermanagement_question_search_idx ON usermanagement_question
+    USING GIN (to_tsvector('simple', question_text || ' ' || answers::text))
+    """,
+]
+
+POSTGRESQL_REVERSE = [
+    'DROP INDEX IF EXISTS usermanagement_question_search_idx',
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def install_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD})
+
+
+def remove_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRESQL_REVERSE})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usermanagement', '0006_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionFingerprint',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='usermanagement.question')),
+                ('signature', models.JSONField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DuplicateQuestion',
+            fields=[
+                ('duplicate_question_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('similarity', models.FloatField()),
+                ('is_dismissed', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_flags', to='usermanagement.question')),
+                ('similar_to', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicated_by', to='usermanagement.question')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuestionBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.CharField(max_length=20)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='usermanagement.question')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='duplicatequestion',
+            constraint=models.UniqueConstraint(fields=('question', 'similar_to'), name='unique_duplicate_question'),
+        ),
+        migrations.AddIndex(
+            model_name='questionbucket',
+            index=models.Index(fields=['bucket'], name='question_bucket_idx'),
+        ),
+        migrations.RunPython(install_search_index, remove_search_index),
+    ]
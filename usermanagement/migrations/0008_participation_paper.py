@@ -0,0 +1,18 @@
+# Generated by Django 5.0.11 on 2026-10-18 09:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usermanagement', '0007_question_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentparticipation',
+            name='paper',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.11 on 2026-10-18 09:23
+
+from django.db import migrations, models
+
+
+def merge_duplicate_results(apps, schema_editor):
+    # Fold extra result rows of a participation into one so the unique
+    # constraint can be created. Answers of the row autosave kept writing to
+    # (the lowest primary key) win; the score is left for the next grading.
+    StudentResult = apps.get_model('usermanagement', 'StudentResult')
+    duplicated = (
+        StudentResult.objects.values('participation_id').annotate(rows=models.Count('pk'))
+        .filter(rows__gt=1).values_list('participation_id', flat=True)
+    )
+    for participation_id in list(duplicated):
+        results = list(StudentResult.objects.filter(participation_id=participation_id).order_by('pk'))
+        kept, extra = results[0], results[1:]
+        merged = {}
+        for result in reversed(results):
+            if isinstance(result.question_result, dict):
+                merged.update(result.question_result)
+        kept.question_result = merged
+        kept.score = None
+        kept.save(update_fields=['question_result', 'score'])
+        StudentResult.objects.filter(pk__in=[result.pk for result in extra]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usermanagement', '0008_participation_paper'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_results, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='studentresult',
+            constraint=models.UniqueConstraint(fields=('participation',), name='unique_participation_result'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.11 on 2026-10-18 09:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usermanagement', '0009_unique_participation_result'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='examscore',
+            name='exam_score_rank_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='examscore',
+            name='exam_score_order_idx',
+        ),
+        migrations.RemoveField(
+            model_name='examscore',
+            name='rank',
+        ),
+        migrations.AddIndex(
+            model_name='examscore',
+            index=models.Index(fields=['examination', '-score', 'submit_date_time', 'participation'], name='exam_score_order_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.0.11 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+# Admin '^name' searches are istartswith lookups. SQLite compiles them to a
+# case-insensitive LIKE, which only a NOCASE index can serve; PostgreSQL
+# compiles them to UPPER(name::text) LIKE, which needs a pattern-ops index
+# on that expression.
+NAME_COLUMNS = [
+    ('usermanagement_student', 'student_name'),
+    ('usermanagement_teacher', 'teacher_name'),
+    ('usermanagement_questioncategory', 'question_category_name'),
+    ('usermanagement_examination', 'examination_name'),
+]
+
+SQLITE_FORWARD = [
+    f'CREATE INDEX {table}_{column}_prefix_idx ON {table} ({column} COLLATE NOCASE)'
+    for table, column in NAME_COLUMNS
+]
+
+POSTGRESQL_FORWARD = [
+    f'CREATE INDEX {table}_{column}_prefix_idx ON {table} (UPPER({column}::text) text_pattern_ops)'
+    for table, column in NAME_COLUMNS
+]
+
+REVERSE = [f'DROP INDEX IF EXISTS {table}_{column}_prefix_idx' for table, column in NAME_COLUMNS]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def install_prefix_indexes(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD})
+
+
+def remove_prefix_indexes(apps, schema_editor):
+    _run(schema_editor, {'sqlite': REVERSE, 'postgresql': REVERSE})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usermanagement', '0010_scoreboard_without_stored_rank'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['dedup_key'], name='job_dedup_key_idx'),
+        ),
+        migrations.RunPython(install_prefix_indexes, remove_prefix_indexes),
+    ]
@@ -2,6 +2,7 @@ import uuid
 
 from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
 
 
 # Student Model
@@ -80,6 +81,13 @@ class Question(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     remarks = models.TextField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'question_level', 'is_enable'], name='question_pool_idx'),
+            models.Index(fields=['category', 'question_level'], condition=models.Q(is_enable=True),
+                         name='question_enabled_pool_idx'),
+        ]
+
     def __str__(self):
         return self.question_text
 
@@ -101,6 +109,14 @@ class Examination(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     remarks = models.TextField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['start_time', 'is_enable'], name='examination_schedule_idx'),
+            models.Index(fields=['start_time'], condition=models.Q(is_enable=True),
+                         name='examination_enabled_start_idx'),
+            models.Index(fields=['category', 'level'], name='examination_pool_idx'),
+        ]
+
     def __str__(self):
         return self.examination_name
 
@@ -112,6 +128,16 @@ class StudentParticipation(models.Model):
     examination = models.ForeignKey(Examination, on_delete=models.CASCADE, related_name='participations')
     join_date_time = models.DateTimeField(auto_now_add=True)
     submit_date_time = models.DateTimeField(null=True, blank=True)
+    paper = models.JSONField(null=True, blank=True)  # Question IDs drawn at join, in order
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['examination', 'student'], name='unique_student_participation'),
+        ]
+        indexes = [
+            models.Index(fields=['examination'], condition=models.Q(submit_date_time__isnull=True),
+                         name='participation_open_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.student_name} - {self.examination.examination_name}"
@@ -122,6 +148,159 @@ class StudentResult(models.Model):
     student_result_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     participation = models.ForeignKey(StudentParticipation, on_delete=models.CASCADE, related_name='results')
     question_result = models.JSONField()  # Stores results of each question
+    score = models.FloatField(null=True, blank=True)  # Filled in by grading
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['participation'], name='unique_participation_result'),
+        ]
 
     def __str__(self):
         return f"Result for {self.participation.student.student_name}"
+
+
+# StudentAnswer Model: one row per answered question, filled in at submit time
+class StudentAnswer(models.Model):
+    student_answer_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    participation = models.ForeignKey(StudentParticipation, on_delete=models.CASCADE, related_name='answers')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='student_answers')
+    chosen_answer = models.CharField(max_length=255, blank=True)  # Normalised, multiple choices joined by "|"
+    is_correct = models.BooleanField(default=False)
+    time_spent = models.PositiveIntegerField(null=True, blank=True)  # Seconds
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['participation', 'question'], name='unique_student_answer'),
+        ]
+        indexes = [
+            models.Index(fields=['question', 'is_correct', 'chosen_answer'], name='answer_item_analysis_idx'),
+            models.Index(fields=['participation', 'is_correct'], name='answer_participation_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.participation_id} - {self.question_id}"
+
+
+# QuestionStatistics Model: running per-question counters
+class QuestionStatistics(models.Model):
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name='statistics')
+    attempt_count = models.PositiveIntegerField(default=0)
+    correct_count = models.PositiveIntegerField(default=0)
+    total_time_spent = models.PositiveBigIntegerField(default=0)  # Seconds
+    timed_attempt_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Statistics for {self.question_id}"
+
+
+# ExamScore Model: materialised scoreboard row per submitted participation
+class ExamScore(models.Model):
+    participation = models.OneToOneField(StudentParticipation, on_delete=models.CASCADE, primary_key=True,
+                                         related_name='exam_score')
+    examination = models.ForeignKey(Examination, on_delete=models.CASCADE, related_name='scores')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='exam_scores')
+    score = models.FloatField(default=0)
+    submit_date_time = models.DateTimeField()
+    duration_seconds = models.PositiveIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Board order; ranks are counted on it when a page is read.
+            models.Index(fields=['examination', '-score', 'submit_date_time', 'participation'],
+                         name='exam_score_order_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.participation_id} - {self.score}"
+
+
+# QuestionFingerprint Model: MinHash signature used to find near-duplicate questions
+class QuestionFingerprint(models.Model):
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name='fingerprint')
+    signature = models.JSONField()  # MinHash values, one per permutation
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Fingerprint of {self.question_id}"
+
+
+# QuestionBucket Model: locality-sensitive hashing bands of a fingerprint
+class QuestionBucket(models.Model):
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='lsh_buckets')
+    bucket = models.CharField(max_length=20)  # Band number followed by the hash of its rows
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['bucket'], name='question_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.question_id} - {self.bucket}"
+
+
+# DuplicateQuestion Model: a question flagged as a near duplicate of an older one
+class DuplicateQuestion(models.Model):
+    duplicate_question_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='duplicate_flags')
+    similar_to = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='duplicated_by')
+    similarity = models.FloatField()  # Estimated Jaccard similarity, 0 to 1
+    is_dismissed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['question', 'similar_to'], name='unique_duplicate_question'),
+        ]
+
+    def __str__(self):
+        return f"{self.question_id} ~ {self.similar_to_id} ({self.similarity:.2f})"
+
+
+# Job Model: background work picked up by `manage.py run_worker`
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+    job_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50)
+    dedup_key = models.CharField(max_length=255, null=True, blank=True)  # One active job per key
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    progress = models.FloatField(default=0)  # 0 to 1
+    progress_message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, null=True, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'dedup_key'], condition=models.Q(status__in=['queued', 'running']),
+                                    name='unique_active_job'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_claim_idx'),
+            models.Index(fields=['dedup_key'], name='job_dedup_key_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} ({self.status})"
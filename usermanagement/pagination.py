@@ -0,0 +1,110 @@
+import base64
+import json
+import uuid
+
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import scoreboard
+
+
+class ScoreboardPagination(BasePagination):
+    """
+    Keyset pagination over (score desc, submit time, participation ID).
+
+    The cursor holds the sort key of the row next to the page, so every page
+    is a range scan on ``exam_score_order_idx`` however deep it is, and rows
+    submitted while a teacher pages never shift or repeat rows. Each row gets
+    its current rank: the first row's is counted, the rest follow from it.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        direction, key = self.decode_cursor(request)
+
+        if direction == 'previous':
+            rows = list(queryset.filter(scoreboard.ahead_of(*key)).order_by(*scoreboard.REVERSE_ORDERING)
+                        [:page_size + 1])
+            more = len(rows) > page_size
+            rows = rows[:page_size][::-1]
+            self.has_previous, self.has_next = more, True
+        else:
+            ordered = queryset.order_by(*scoreboard.ORDERING)
+            if key is not None:
+                ordered = ordered.filter(scoreboard.behind(*key))
+            rows = list(ordered[:page_size + 1])
+            more = len(rows) > page_size
+            rows = rows[:page_size]
+            self.has_previous, self.has_next = key is not None, more
+
+        if rows:
+            first = scoreboard.rank_of(rows[0], queryset)
+            for offset, row in enumerate(rows):
+                row.rank = first + offset
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(requested, self.max_page_size))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return 'next', None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            direction = data['d']
+            key = (float(data['s']), parse_datetime(data['t']), uuid.UUID(data['p']))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if direction not in ('next', 'previous') or key[1] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return direction, key
+
+    def encode_cursor(self, direction, row):
+        score, submitted, participation_id = scoreboard.sort_key(row)
+        data = {'d': direction, 's': score, 't': submitted.isoformat(), 'p': str(participation_id)}
+        encoded = base64.urlsafe_b64encode(json.dumps(data).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor('next', self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor('previous', self.page[0])
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'previous': self.get_previous_link(), 'results': data})
+
+
+class ModelCursorPagination(CursorPagination):
+    # Each viewset names its own stable ordering in ``cursor_ordering``.
+    ordering = '-pk'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering:
+            return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+        return super().get_ordering(request, queryset, view)
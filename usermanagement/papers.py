@@ -0,0 +1,85 @@
+"""
+Exam paper generation.
+
+A paper is a deterministic sample of the cached (category, level) question
+pool, drawn once at join time and stored on ``StudentParticipation.paper``.
+"""
+import random
+
+from django.conf import settings
+
+from .caching import VersionedCache
+from .models import Question, StudentParticipation
+
+PAPER_POOL_TIMEOUT = 60 * 60
+
+pool_cache = VersionedCache(
+    'paper_pool',
+    alias=getattr(settings, 'PAPER_POOL_CACHE', 'default'),
+    timeout=getattr(settings, 'PAPER_POOL_TIMEOUT', PAPER_POOL_TIMEOUT),
+)
+
+
+def _scope(category_id, level):
+    return f"{category_id}:{level}"
+
+
+def get_pool_version(category_id, level):
+    return pool_cache.version(_scope(category_id, level))
+
+
+def invalidate_pool(category_id, level):
+    pool_cache.invalidate(_scope(category_id, level))
+
+
+def get_pool(category_id, level):
+    """Return the sorted tuple of enabled question IDs for a pool."""
+    def load():
+        question_ids = Question.objects.filter(
+            category_id=category_id,
+            question_level=level,
+            is_enable=True,
+        ).values_list('question_id', flat=True)
+        return tuple(sorted(str(question_id) for question_id in question_ids))
+    return pool_cache.get_or_load(_scope(category_id, level), load)
+
+
+def get_exam_pool(examination):
+    return get_pool(examination.category_id, examination.level)
+
+
+def paper_seed(participation):
+    return participation.pk.int
+
+
+def draw_paper(pool, count, seed):
+    """Draw ``count`` question IDs from ``pool`` in O(n) for a given seed."""
+    count = max(0, min(count, len(pool)))
+    return random.Random(seed).sample(pool, count)
+
+
+def generate_paper(participation, examination=None):
+    """
+    Return the ordered question IDs of a participation's paper.
+
+    Pass ``examination`` when it is already loaded to avoid following the
+    foreign key.
+    """
+    if participation.paper is not None:
+        return list(participation.paper)
+    examination = examination or participation.examination
+    pool = get_exam_pool(examination)
+    return draw_paper(pool, examination.number_of_questions, paper_seed(participation))
+
+
+def papers_for(participation_ids):
+    """Return ``{participation_id: [question_id, ...]}`` for several participations."""
+    rows = StudentParticipation.objects.filter(pk__in=list(participation_ids)).values_list(
+        'pk', 'paper', 'examination__category_id', 'examination__level', 'examination__number_of_questions',
+    )
+    result = {}
+    for participation_id, paper, category_id, level, count in rows:
+        if paper is None:
+            paper = draw_paper(get_pool(category_id, level), count, participation_id.int)
+        result[participation_id] = list(paper)
+    return result
@@ -0,0 +1,40 @@
+"""
+In-process directory of participations.
+
+Maps a participation to its student, examination and paper so hot paths such
+as autosave can check ownership without a query. Entries are added at join
+time and loaded from the database on a miss.
+"""
+from django.conf import settings
+
+from .lru import LRUCache
+from .models import StudentParticipation
+
+directory = LRUCache(maxsize=getattr(settings, 'PARTICIPATION_DIRECTORY_SIZE', 100000))
+
+
+def remember(participation_id, student_id, examination_id, paper=None):
+    entry = (str(student_id), str(examination_id), tuple(paper) if paper is not None else None)
+    directory.set(str(participation_id), entry)
+    return entry
+
+
+def cached(participation_id):
+    return directory.get(str(participation_id))
+
+
+def lookup(participation_id):
+    """Return ``(student_id, examination_id, paper)`` or ``None`` for an unknown participation."""
+    entry = directory.get(str(participation_id))
+    if entry is None:
+        row = StudentParticipation.objects.filter(pk=participation_id).values_list(
+            'student_id', 'examination_id', 'paper'
+        ).first()
+        if row is None:
+            return None
+        entry = remember(participation_id, *row)
+    return entry
+
+
+def forget(participation_id):
+    directory.delete(str(participation_id))
@@ -0,0 +1,181 @@
+"""
+Pre-built examination payloads.
+
+The join checks and the pool's question IDs are one short-lived cache entry
+and each question has its own key, so joining reads nothing from the
+database.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from . import caching, papers
+from .models import Examination, Question
+
+PAYLOAD_GRACE = 5 * 60
+PAYLOAD_TIMEOUT = 60
+BUILD_LOCK_TIMEOUT = 10
+BUILD_POLL_INTERVAL = 0.05
+
+
+def _cache():
+    return caches[getattr(settings, 'EXAM_PAYLOAD_CACHE', 'default')]
+
+
+def payload_key(examination_id):
+    return f"exam_payload:{examination_id}"
+
+
+def question_key(question_id):
+    return f"exam_question:{question_id}"
+
+
+def close_time(examination):
+    return examination.start_time + timedelta(minutes=examination.margin_time)
+
+
+def _serialize_questions(questions):
+    serialized = {}
+    for question in questions.values('question_id', 'question_text', 'answers', 'question_type'):
+        question_id = str(question['question_id'])
+        serialized[question_id] = {
+            'question_id': question_id,
+            'question_text': question['question_text'],
+            'answers': question['answers'],
+            'question_type': question['question_type'],
+        }
+    return serialized
+
+
+def _pool_questions(examination):
+    return Question.objects.filter(category_id=examination.category_id, question_level=examination.level,
+                                   is_enable=True)
+
+
+def build_payload(examination):
+    pool = _pool_questions(examination).values_list('question_id', flat=True)
+    return {
+        'examination_id': str(examination.pk),
+        'examination_name': examination.examination_name,
+        'number_of_questions': examination.number_of_questions,
+        'pass_key': examination.pass_key,
+        'is_enable': examination.is_enable,
+        'start_time': examination.start_time.timestamp(),
+        'close_time': close_time(examination).timestamp(),
+        'margin_time': examination.margin_time,
+        'pool': tuple(sorted(str(question_id) for question_id in pool)),
+    }
+
+
+def _timeout(payload):
+    remaining = payload['close_time'] - timezone.now().timestamp()
+    return max(int(remaining), 0) + PAYLOAD_GRACE
+
+
+def _payload_timeout(payload):
+    return min(getattr(settings, 'EXAM_PAYLOAD_TIMEOUT', PAYLOAD_TIMEOUT), _timeout(payload))
+
+
+def store_questions(questions, timeout):
+    _cache().set_many({question_key(question_id): question for question_id, question in questions.items()}, timeout)
+
+
+def store_payload(payload):
+    _cache().set(payload_key(payload['examination_id']), payload, _payload_timeout(payload))
+    return payload
+
+
+def prewarm(examination):
+    """Cache the payload and every pool question not cached yet. Returns the payload."""
+    payload = build_payload(examination)
+    cached = _cache().get_many([question_key(question_id) for question_id in payload['pool']])
+    missing = [question_id for question_id in payload['pool'] if question_key(question_id) not in cached]
+    if missing:
+        store_questions(_serialize_questions(Question.objects.filter(pk__in=missing)), _timeout(payload))
+    return store_payload(payload)
+
+
+def get_payload(examination_id):
+    """Return the cached payload, building it on a miss. ``None`` if unknown."""
+    cache = _cache()
+    key = payload_key(examination_id)
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+    # One request rebuilds; the others wait for its result rather than query too.
+    lock = f'{key}:building'
+    give_up = time.monotonic() + BUILD_LOCK_TIMEOUT
+    while not cache.add(lock, True, BUILD_LOCK_TIMEOUT):
+        time.sleep(BUILD_POLL_INTERVAL)
+        payload = cache.get(key)
+        if payload is not None:
+            return payload
+        if time.monotonic() > give_up:
+            break
+    try:
+        examination = Examination.objects.filter(pk=examination_id).first()
+        if examination is None:
+            return None
+        return store_payload(build_payload(examination))
+    finally:
+        cache.delete(lock)
+
+
+def invalidate_payload(examination_id):
+    _cache().delete(payload_key(examination_id))
+
+
+def invalidate_question(question_id):
+    _cache().delete(question_key(question_id))
+
+
+def invalidate_pool_payloads(category_id, level):
+    examination_ids = Examination.objects.filter(
+        category_id=category_id, level=level,
+    ).values_list('examination_id', flat=True)
+    _cache().delete_many([payload_key(examination_id) for examination_id in examination_ids])
+
+
+def invalidate_question_pool(category_id, level):
+    """Drop everything cached from a (category, level) pool after its questions change."""
+    papers.invalidate_pool(category_id, level)
+    invalidate_pool_payloads(category_id, level)
+    caching.invalidate_category_questions(category_id)
+
+
+def exams_to_prewarm(minutes):
+    """Enabled examinations that start within ``minutes`` and are not closed yet."""
+    now = timezone.now()
+    upcoming = Examination.objects.filter(
+        is_enable=True,
+        start_time__lte=now + timedelta(minutes=minutes),
+    ).order_by('-start_time')
+    for examination in upcoming.iterator():
+        if close_time(examination) > now:
+            yield examination
+
+
+def draw(payload, seed):
+    """Draw a new paper from the payload's pool."""
+    return papers.draw_paper(payload['pool'], payload['number_of_questions'], seed)
+
+
+def paper_questions(payload, question_ids):
+    """
+    Return the serialised questions of a paper.
+
+    Questions missing from the cache, e.g. drawn before they left the pool,
+    are read from the database and cached again.
+    """
+    cached = _cache().get_many([question_key(question_id) for question_id in question_ids])
+    questions = {question_id: cached[question_key(question_id)]
+                 for question_id in question_ids if question_key(question_id) in cached}
+    missing = [question_id for question_id in question_ids if question_id not in questions]
+    if missing:
+        loaded = _serialize_questions(Question.objects.filter(pk__in=missing))
+        store_questions(loaded, _timeout(payload))
+        questions.update(loaded)
+    return [questions[question_id] for question_id in question_ids if question_id in questions]
@@ -0,0 +1,16 @@
+from rest_framework.permissions import BasePermission
+
+
+class IsStudent(BasePermission):
+    def has_permission(self, request, view):
+        return getattr(request.user, 'is_student', False)
+
+
+class IsTeacher(BasePermission):
+    def has_permission(self, request, view):
+        return getattr(request.user, 'is_teacher', False)
+
+
+class IsTeacherOrStaff(BasePermission):
+    def has_permission(self, request, view):
+        return getattr(request.user, 'is_teacher', False) or bool(request.user and request.user.is_staff)
@@ -0,0 +1,95 @@
+"""
+Materialised examination scoreboards.
+
+One ``ExamScore`` row per submitted participation, in ``exam_score_order_idx``
+order. Ranks are counted when a page is read, not stored.
+"""
+from django.db import transaction
+from django.db.models import Q, Sum
+
+from .models import ExamScore, StudentParticipation, StudentResult
+
+ORDERING = ('-score', 'submit_date_time', 'participation_id')
+REVERSE_ORDERING = ('score', '-submit_date_time', '-participation_id')
+
+UPSERT_FIELDS = ['score', 'submit_date_time', 'duration_seconds', 'updated_at']
+
+
+def _duration(participation):
+    if participation['submit_date_time'] is None or participation['join_date_time'] is None:
+        return None
+    return max(0, int((participation['submit_date_time'] - participation['join_date_time']).total_seconds()))
+
+
+def ahead_of(score, submit_date_time, participation_id):
+    """Rows placed before the given sort key."""
+    return (
+        Q(score__gt=score)
+        | Q(score=score, submit_date_time__lt=submit_date_time)
+        | Q(score=score, submit_date_time=submit_date_time, participation_id__lt=participation_id)
+    )
+
+
+def behind(score, submit_date_time, participation_id):
+    """Rows placed after the given sort key."""
+    return (
+        Q(score__lt=score)
+        | Q(score=score, submit_date_time__gt=submit_date_time)
+        | Q(score=score, submit_date_time=submit_date_time, participation_id__gt=participation_id)
+    )
+
+
+def sort_key(row):
+    return row.score, row.submit_date_time, row.participation_id
+
+
+def rank_of(row, board=None):
+    """Rank of an ``ExamScore`` row, 1 being the best."""
+    if board is None:
+        board = ExamScore.objects.filter(examination_id=row.examination_id)
+    return board.filter(ahead_of(*sort_key(row))).count() + 1
+
+
+def _rows(participations, examination_id, scores):
+    return [
+        ExamScore(
+            participation_id=participation['student_participation_id'],
+            examination_id=examination_id or participation['examination_id'],
+            student_id=participation['student_id'],
+            score=scores.get(participation['student_participation_id']) or 0.0,
+            submit_date_time=participation['submit_date_time'],
+            duration_seconds=_duration(participation),
+        )
+        for participation in participations
+    ]
+
+
+def record(scores):
+    """Insert or update the scoreboard rows of submitted participations.
+
+    ``scores`` maps participation IDs to their total score.
+    """
+    participations = StudentParticipation.objects.filter(
+        pk__in=list(scores), submit_date_time__isnull=False,
+    ).values('student_participation_id', 'examination_id', 'student_id', 'join_date_time', 'submit_date_time')
+    ExamScore.objects.bulk_create(
+        _rows(participations, None, scores),
+        update_conflicts=True, unique_fields=['participation'], update_fields=UPSERT_FIELDS, batch_size=1000,
+    )
+
+
+def rebuild(examination):
+    """Recompute the whole scoreboard of an examination from its results."""
+    totals = dict(
+        StudentResult.objects.filter(participation__examination_id=examination.pk)
+        .values('participation_id').annotate(total=Sum('score')).values_list('participation_id', 'total')
+    )
+    participations = StudentParticipation.objects.filter(
+        examination_id=examination.pk, submit_date_time__isnull=False,
+    ).values('student_participation_id', 'student_id', 'join_date_time', 'submit_date_time')
+    rows = _rows(participations.iterator(), examination.pk, totals)
+
+    with transaction.atomic():
+        ExamScore.objects.filter(examination_id=examination.pk).delete()
+        ExamScore.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
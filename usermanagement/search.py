@@ -0,0 +1,212 @@
+"""
+Ranked full-text search over the question bank.
+
+FTS5 with ``bm25`` on SQLite, a tsvector GIN index with ``ts_rank`` on
+PostgreSQL, ``icontains`` elsewhere. ``manage.py rebuild_question_index``
+repairs an SQLite index that ``VACUUM`` or a table rebuild left behind.
+"""
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models.expressions import RawSQL
+from django.db.migrations.recorder import MigrationRecorder
+
+from .models import Question
+
+FTS_TABLE = 'usermanagement_question_fts'
+MAX_TERMS = 16
+MAX_LIMIT = 100
+TEXT_WEIGHT = 10.0
+ANSWERS_WEIGHT = 1.0
+
+WORD_PATTERN = re.compile(r'\w+')
+
+POSTGRESQL_DOCUMENT = "to_tsvector('simple', q.question_text || ' ' || q.answers::text)"
+
+RESULT_FIELDS = ('question_id', 'question_text', 'answers', 'question_type', 'question_level', 'category_id',
+                 'category__question_category_name', 'is_enable')
+
+
+def terms(query):
+    return WORD_PATTERN.findall(query.casefold())[:MAX_TERMS]
+
+
+def _fts5_query(words):
+    quoted = [f'"{word}"' for word in words]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _tsquery(words):
+    return ' & '.join(words[:-1] + [f'{words[-1]}:*'])
+
+
+def _filters(category_id, level, question_type, include_disabled):
+    clauses, params = [], []
+    if category_id:
+        clauses.append('q.category_id = %s')
+        params.append(Question._meta.get_field('category').get_db_prep_value(category_id, connection))
+    if level:
+        clauses.append('q.question_level = %s')
+        params.append(level)
+    if question_type:
+        clauses.append('q.question_type = %s')
+        params.append(question_type)
+    if not include_disabled:
+        clauses.append('q.is_enable = %s')
+        params.append(True)
+    return ''.join(f' AND {clause}' for clause in clauses), params
+
+
+def _ranked_ids(words, filters, params, limit, offset):
+    if connection.vendor == 'sqlite':
+        sql = (
+            f'SELECT q.question_id, -bm25({FTS_TABLE}, %s, %s) AS score '
+            f'FROM {FTS_TABLE} JOIN usermanagement_question q ON q.rowid = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s{filters} ORDER BY bm25({FTS_TABLE}, %s, %s) LIMIT %s OFFSET %s'
+        )
+        params = [TEXT_WEIGHT, ANSWERS_WEIGHT, _fts5_query(words), *params, TEXT_WEIGHT, ANSWERS_WEIGHT,
+                  limit, offset]
+    else:
+        sql = (
+            f"SELECT q.question_id, ts_rank({POSTGRESQL_DOCUMENT}, query) AS score "
+            f"FROM usermanagement_question q, to_tsquery('simple', %s) query "
+            f"WHERE {POSTGRESQL_DOCUMENT} @@ query{filters} ORDER BY score DESC, q.question_id LIMIT %s OFFSET %s"
+        )
+        params = [_tsquery(words), *params, limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(Question._meta.pk.to_python(question_id), score) for question_id, score in cursor.fetchall()]
+
+
+def search(query, category_id=None, level=None, question_type=None, include_disabled=False, limit=20, offset=0):
+    """Return matching questions as dicts, best match first, each with a ``score``."""
+    words = terms(query)
+    if not words:
+        return []
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    offset = max(0, int(offset))
+
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        questions = Question.objects.filter(question_text__icontains=' '.join(words))
+        if category_id:
+            questions = questions.filter(category_id=category_id)
+        if level:
+            questions = questions.filter(question_level=level)
+        if question_type:
+            questions = questions.filter(question_type=question_type)
+        if not include_disabled:
+            questions = questions.filter(is_enable=True)
+        return [
+            {**row, 'score': None}
+            for row in questions.order_by('question_id').values(*RESULT_FIELDS)[offset:offset + limit]
+        ]
+
+    filters, params = _filters(category_id, level, question_type, include_disabled)
+    ranked = _ranked_ids(words, filters, params, limit, offset)
+    rows = {row['question_id']: row for row in Question.objects.filter(pk__in=[pk for pk, _ in ranked])
+            .values(*RESULT_FIELDS)}
+    return [{**rows[pk], 'score': score} for pk, score in ranked if pk in rows]
+
+
+def matching_ids(query):
+    """Return a subquery of the IDs of every question matching ``query``, for ``pk__in``."""
+    words = terms(query)
+    if not words:
+        return Question.objects.none().values('pk')
+    if connection.vendor == 'sqlite':
+        return RawSQL(
+            f'SELECT q.question_id FROM {FTS_TABLE} JOIN usermanagement_question q ON q.rowid = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s',
+            [_fts5_query(words)],
+        )
+    if connection.vendor == 'postgresql':
+        return RawSQL(
+            f"SELECT q.question_id FROM usermanagement_question q "
+            f"WHERE {POSTGRESQL_DOCUMENT} @@ to_tsquery('simple', %s)",
+            [_tsquery(words)],
+        )
+    return Question.objects.filter(question_text__icontains=' '.join(words)).values('pk')
+
+
+# Same schema as migration 0007, but safe to run again.
+SQLITE_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        question_text, answers,
+        content='usermanagement_question',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON usermanagement_question BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, question_text, answers)
+        VALUES (new.rowid, new.question_text, new.answers);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON usermanagement_question BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, question_text, answers)
+        VALUES ('delete', old.rowid, old.question_text, old.answers);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF question_text, answers
+    ON usermanagement_question BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, question_text, answers)
+        VALUES ('delete', old.rowid, old.question_text, old.answers);
+        INSERT INTO {FTS_TABLE}(rowid, question_text, answers)
+        VALUES (new.rowid, new.question_text, new.answers);
+    END
+    """,
+]
+
+POSTGRESQL_SCHEMA = [
+    """
+    CREATE INDEX IF NOT EXISTS usermanagement_question_search_idx ON usermanagement_question
+    USING GIN (to_tsvector('simple', question_text || ' ' || answers::text))
+    """,
+]
+
+
+SQLITE_OBJECTS = {FTS_TABLE, f'{FTS_TABLE}_insert', f'{FTS_TABLE}_delete', f'{FTS_TABLE}_update'}
+
+POSTGRESQL_INDEX = 'usermanagement_question_search_idx'
+
+SEARCH_MIGRATION = ('usermanagement', '0007_question_search')
+
+
+def missing(using=DEFAULT_DB_ALIAS):
+    """Return the names of index objects absent from the database."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"SELECT name FROM sqlite_master WHERE name IN ({', '.join(['%s'] * len(SQLITE_OBJECTS))})",
+                           sorted(SQLITE_OBJECTS))
+            return SQLITE_OBJECTS - {name for name, in cursor.fetchall()}
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT 1 FROM pg_indexes WHERE indexname = %s', [POSTGRESQL_INDEX])
+            return set() if cursor.fetchone() else {POSTGRESQL_INDEX}
+    return set()
+
+
+def ensure_index(sender=None, using=DEFAULT_DB_ALIAS, **kwargs):
+    """``post_migrate`` receiver: rebuild the index if a migration dropped part of it."""
+    if SEARCH_MIGRATION not in MigrationRecorder(connections[using]).applied_migrations():
+        return
+    if missing(using):
+        rebuild(using)
+
+
+def rebuild(using=DEFAULT_DB_ALIAS):
+    """Recreate missing index objects and rebuild the index from the question table."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for statement in SQLITE_SCHEMA:
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        elif connection.vendor == 'postgresql':
+            for statement in POSTGRESQL_SCHEMA:
+                cursor.execute(statement)
+            cursor.execute(f'REINDEX INDEX {POSTGRESQL_INDEX}')
@@ -0,0 +1,167 @@
+from django.contrib.auth.hashers import make_password
+from rest_framework import serializers
+
+from . import jobs
+from .models import (ExamScore, Examination, Job, Question, QuestionCategory, Student, StudentParticipation,
+                     StudentResult, Teacher)
+
+
+class ExamJoinSerializer(serializers.Serializer):
+    examination_id = serializers.UUIDField()
+    pass_key = serializers.CharField(max_length=50)
+
+
+class LoginSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    password = serializers.CharField(max_length=128, trim_whitespace=False)
+    role = serializers.ChoiceField(choices=['student', 'teacher'], default='student')
+
+
+class ExamScoreSerializer(serializers.ModelSerializer):
+    rank = serializers.IntegerField(read_only=True)  # Set by ScoreboardPagination
+    participation_id = serializers.UUIDField(read_only=True)
+    student_id = serializers.UUIDField(read_only=True)
+    student_roll_no = serializers.CharField(source='student.student_roll_no', read_only=True)
+    student_name = serializers.CharField(source='student.student_name', read_only=True)
+
+    class Meta:
+        model = ExamScore
+        fields = ['rank', 'score', 'participation_id', 'student_id', 'student_roll_no', 'student_name',
+                  'submit_date_time', 'duration_seconds']
+
+
+class JobEnqueueSerializer(serializers.Serializer):
+    kind = serializers.ChoiceField(choices=[])
+    payload = serializers.DictField(required=False, default=dict)
+    dedup_key = serializers.CharField(max_length=255, required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['kind'].choices = sorted(jobs.HANDLERS)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ['job_id', 'kind', 'dedup_key', 'payload', 'status', 'attempts', 'max_attempts', 'progress',
+                  'progress_message', 'result', 'error', 'run_after', 'created_at', 'updated_at', 'finished_at']
+        read_only_fields = fields
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['progress'], data['progress_message'] = jobs.current_progress(instance)
+        return data
+
+
+class SparseFieldsetMixin:
+    """Limit the output to the comma separated ``?fields=`` of the request."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        requested = request.query_params.get('fields') if request is not None else None
+        if requested and request.method == 'GET':
+            allowed = {name.strip() for name in requested.split(',') if name.strip()}
+            for name in set(self.fields) - allowed:
+                self.fields.pop(name)
+
+
+class HashedPasswordMixin:
+    password_field = None
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if self.password_field in attrs:
+            attrs[self.password_field] = make_password(attrs[self.password_field])
+        return attrs
+
+
+AUDIT_READ_ONLY = ['created_by', 'updated_by', 'created_at', 'updated_at']
+
+
+class StudentSerializer(SparseFieldsetMixin, HashedPasswordMixin, serializers.ModelSerializer):
+    password_field = 'student_password'
+    created_by_name = serializers.CharField(source='created_by.username', read_only=True, default=None)
+    updated_by_name = serializers.CharField(source='updated_by.username', read_only=True, default=None)
+
+    class Meta:
+        model = Student
+        fields = ['student_id', 'student_roll_no', 'student_name', 'student_email', 'student_phone',
+                  'student_password', 'is_enable', 'created_by', 'created_by_name', 'updated_by',
+                  'updated_by_name', 'created_at', 'updated_at', 'remarks']
+        read_only_fields = AUDIT_READ_ONLY
+        extra_kwargs = {'student_password': {'write_only': True}}
+
+
+class TeacherSerializer(SparseFieldsetMixin, HashedPasswordMixin, serializers.ModelSerializer):
+    password_field = 'teacher_password'
+    created_by_name = serializers.CharField(source='created_by.username', read_only=True, default=None)
+    updated_by_name = serializers.CharField(source='updated_by.username', read_only=True, default=None)
+
+    class Meta:
+        model = Teacher
+        fields = ['teacher_id', 'teacher_name', 'teacher_email', 'teacher_phone', 'teacher_password',
+                  'is_enable', 'created_by', 'created_by_name', 'updated_by', 'updated_by_name',
+                  'created_at', 'updated_at', 'remarks']
+        read_only_fields = AUDIT_READ_ONLY
+        extra_kwargs = {'teacher_password': {'write_only': True}}
+
+
+class QuestionCategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    created_by_name = serializers.CharField(source='created_by.username', read_only=True, default=None)
+    updated_by_name = serializers.CharField(source='updated_by.username', read_only=True, default=None)
+
+    class Meta:
+        model = QuestionCategory
+        fields = ['question_category_id', 'question_category_name', 'is_enable', 'created_by',
+                  'created_by_name', 'updated_by', 'updated_by_name', 'created_at', 'updated_at', 'remarks']
+        read_only_fields = AUDIT_READ_ONLY
+
+
+class QuestionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    category_name = serializers.CharField(source='category.question_category_name', read_only=True)
+    created_by_name = serializers.CharField(source='created_by.teacher_name', read_only=True, default=None)
+    updated_by_name = serializers.CharField(source='updated_by.teacher_name', read_only=True, default=None)
+
+    class Meta:
+        model = Question
+        fields = ['question_id', 'question_text', 'answers', 'correct_answers', 'question_type', 'category',
+                  'category_name', 'question_level', 'is_enable', 'created_by', 'created_by_name', 'updated_by',
+                  'updated_by_name', 'created_at', 'updated_at', 'remarks']
+        read_only_fields = AUDIT_READ_ONLY
+
+
+class ExaminationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    category_name = serializers.CharField(source='category.question_category_name', read_only=True)
+    created_by_name = serializers.CharField(source='created_by.teacher_name', read_only=True, default=None)
+    updated_by_name = serializers.CharField(source='updated_by.teacher_name', read_only=True, default=None)
+
+    class Meta:
+        model = Examination
+        fields = ['examination_id', 'examination_name', 'number_of_questions', 'level', 'category',
+                  'category_name', 'pass_key', 'start_time', 'margin_time', 'is_enable', 'created_by',
+                  'created_by_name', 'updated_by', 'updated_by_name', 'created_at', 'updated_at', 'remarks']
+        read_only_fields = AUDIT_READ_ONLY
+
+
+class StudentParticipationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    student_name = serializers.CharField(source='student.student_name', read_only=True)
+    student_roll_no = serializers.CharField(source='student.student_roll_no', read_only=True)
+    examination_name = serializers.CharField(source='examination.examination_name', read_only=True)
+
+    class Meta:
+        model = StudentParticipation
+        fields = ['student_participation_id', 'student', 'student_name', 'student_roll_no', 'examination',
+                  'examination_name', 'join_date_time', 'submit_date_time']
+
+
+class StudentResultSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    student = serializers.UUIDField(source='participation.student_id', read_only=True)
+    student_name = serializers.CharField(source='participation.student.student_name', read_only=True)
+    examination = serializers.UUIDField(source='participation.examination_id', read_only=True)
+    examination_name = serializers.CharField(source='participation.examination.examination_name', read_only=True)
+
+    class Meta:
+        model = StudentResult
+        fields = ['student_result_id', 'participation', 'student', 'student_name', 'examination',
+                  'examination_name', 'question_result', 'score']
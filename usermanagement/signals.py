@@ -0,0 +1,83 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import authentication, caching, deadlines, duplicates, payloads
+from .models import Examination, Question, QuestionCategory, Student, Teacher
+
+
+@receiver(pre_save, sender=Question)
+def remember_question_pool(sender, instance, raw=False, **kwargs):
+    instance._previous_pool = None
+    instance._previous_content = None
+    if raw or instance._state.adding:
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list(
+        'category_id', 'question_level', 'question_text', 'answers'
+    ).first()
+    if previous:
+        instance._previous_pool = previous[:2]
+        instance._previous_content = previous[2:]
+
+
+def _changed_pools(instance):
+    current = (instance.category_id, instance.question_level)
+    previous = getattr(instance, '_previous_pool', None)
+    if previous and tuple(previous) != current:
+        return [current, tuple(previous)]
+    return [current]
+
+
+@receiver(post_save, sender=Question)
+def invalidate_saved_question_pool(sender, instance, raw=False, **kwargs):
+    payloads.invalidate_question(instance.pk)
+    for pool in _changed_pools(instance):
+        payloads.invalidate_question_pool(*pool)
+
+
+@receiver(post_save, sender=Question)
+def fingerprint_question(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_content', None)
+    if created or previous is None or tuple(previous) != (instance.question_text, instance.answers):
+        duplicates.index_questions([instance])
+
+
+@receiver(post_delete, sender=Question)
+def invalidate_deleted_question_pool(sender, instance, **kwargs):
+    payloads.invalidate_question(instance.pk)
+    payloads.invalidate_question_pool(instance.category_id, instance.question_level)
+
+
+@receiver(post_save, sender=QuestionCategory)
+@receiver(post_delete, sender=QuestionCategory)
+def invalidate_categories(sender, instance, **kwargs):
+    caching.invalidate_categories()
+    caching.invalidate_category_questions(instance.pk)
+
+
+@receiver(post_save, sender=Examination)
+@receiver(post_delete, sender=Examination)
+def invalidate_examination_payload(sender, instance, **kwargs):
+    payloads.invalidate_payload(instance.pk)
+
+
+@receiver(post_save, sender=Examination)
+def schedule_examination_deadline(sender, instance, raw=False, **kwargs):
+    if not raw:
+        deadlines.scheduler.schedule_examination(instance)
+
+
+@receiver(post_delete, sender=Examination)
+def cancel_examination_deadline(sender, instance, **kwargs):
+    deadlines.scheduler.cancel(instance.pk)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Teacher)
+@receiver(post_delete, sender=Teacher)
+def revoke_cached_tokens(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    authentication.revoke(authentication.role_of(instance), instance.pk)
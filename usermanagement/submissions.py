@@ -0,0 +1,12 @@
+"""Work that follows a final submit: answer statistics, grading and the scoreboard."""
+from . import analytics, grading, scoreboard
+
+FINALIZE_CHUNK_SIZE = 250
+
+
+def finalize(participation_ids):
+    participation_ids = list(participation_ids)
+    for start in range(0, len(participation_ids), FINALIZE_CHUNK_SIZE):
+        chunk = participation_ids[start:start + FINALIZE_CHUNK_SIZE]
+        analytics.record_submissions(chunk)
+        scoreboard.record(grading.grade_participations(chunk))
@@ -1,3 +1,1188 @@
-from django.test import TestCase
+import io
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from unittest import addModuleCleanup, skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import IntegrityError, connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+
+from . import (analytics, caching, deadlines, duplicates, exports, grading, importers, jobs, metrics, papers,
+               payloads, scoreboard, search, submissions)
+from .authentication import authenticate_token, token_cache
+from .autosave import AnswerBuffer, answer_buffer
+from .database import describe
+from .management.commands import run_worker
+from .models import (DuplicateQuestion, ExamScore, Examination, Job, Question, QuestionCategory, QuestionStatistics,
+                     Student, StudentAnswer, StudentParticipation, StudentResult, Teacher)
+
+
+def setUpModule():
+    # Performance snapshots written during the run stay out of var/perf.
+    directory = tempfile.TemporaryDirectory()
+    addModuleCleanup(directory.cleanup)
+    snapshot_dir = override_settings(PERF_SNAPSHOT_DIR=Path(directory.name))
+    snapshot_dir.enable()
+    addModuleCleanup(snapshot_dir.disable)
+
+
+def create_exam_fixtures(questions=30, students=2):
+    category = QuestionCategory.objects.create(question_category_name='Mathematics')
+    Question.objects.bulk_create([
+        Question(
+            question_text=f'Question {number}',
+            answers=['a', 'b', 'c', 'd'],
+            correct_answers=['a'],
+            question_type='MCQ',
+            category=category,
+            question_level='easy',
+            is_enable=number % 5 != 0,
+        )
+        for number in range(questions)
+    ])
+    examination = Examination.objects.create(
+        examination_name='Midterm',
+        number_of_questions=10,
+        level='easy',
+        category=category,
+        pass_key='secret',
+        start_time=timezone.now() - timedelta(minutes=1),
+        margin_time=60,
+    )
+    created = [
+        Student.objects.create(
+            student_roll_no=f'R-{number}',
+            student_name=f'Student {number}',
+            student_email=f'student{number}@example.com',
+            student_phone='0300',
+            student_password=make_password('password'),
+        )
+        for number in range(students)
+    ]
+    return category, examination, created
+
+
+# Hot queries must stay on their indexes
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category, cls.examination, cls.students = create_exam_fixtures()
+        cls.participation = StudentParticipation.objects.create(student=cls.students[0], examination=cls.examination)
+
+    def assertUsesIndex(self, queryset, *index_names):
+        plan = queryset.explain()
+        self.assertNotRegex(plan, r'\bSCAN usermanagement_', plan)
+        self.assertTrue(
+            any(f'INDEX {name}' in plan for name in index_names),
+            f'Expected one of {index_names} in:\n{plan}',
+        )
+
+    def test_question_pool_uses_partial_index(self):
+        self.assertUsesIndex(
+            Question.objects.filter(
+                category_id=self.category.pk, question_level='easy', is_enable=True,
+            ).values_list('question_id', flat=True),
+            'question_enabled_pool_idx', 'question_pool_idx',
+        )
+
+    def test_answer_key_uses_composite_index(self):
+        self.assertUsesIndex(
+            Question.objects.filter(category_id=self.category.pk, question_level='easy'),
+            'question_pool_idx',
+        )
+
+    def test_upcoming_examinations_use_schedule_index(self):
+        self.assertUsesIndex(
+            Examination.objects.filter(is_enable=True, start_time__lte=timezone.now()),
+            'examination_enabled_start_idx', 'examination_schedule_idx',
+        )
+
+    def test_examinations_by_pool_use_index(self):
+        self.assertUsesIndex(
+            Examination.objects.filter(category_id=self.category.pk, level='easy'),
+            'examination_pool_idx',
+        )
+
+    def test_participation_lookup_uses_unique_index(self):
+        self.assertUsesIndex(
+            StudentParticipation.objects.filter(examination_id=self.examination.pk, student_id=self.students[0].pk),
+            'unique_student_participation', 'sqlite_autoindex_usermanagement_studentparticipation',
+        )
+
+    def test_open_participations_use_partial_index(self):
+        self.assertUsesIndex(
+            StudentParticipation.objects.filter(examination_id=self.examination.pk, submit_date_time__isnull=True),
+            'participation_open_idx',
+        )
+
+    def test_scoreboard_page_uses_order_index(self):
+        self.assertUsesIndex(
+            ExamScore.objects.filter(examination_id=self.examination.pk).order_by(*scoreboard.ORDERING),
+            'exam_score_order_idx',
+        )
+
+    def test_admin_searches_use_indexes(self):
+        self.assertUsesIndex(Student.objects.filter(student_name__istartswith='stud'),
+                             'usermanagement_student_student_name_prefix_idx')
+        self.assertUsesIndex(Examination.objects.filter(examination_name__istartswith='mid'),
+                             'usermanagement_examination_examination_name_prefix_idx')
+        self.assertUsesIndex(Student.objects.filter(student_email__exact='student0@example.com'),
+                             'sqlite_autoindex_usermanagement_student')
+        self.assertUsesIndex(Job.objects.filter(dedup_key__exact='key'), 'job_dedup_key_idx')
+
+    def test_duplicate_participation_is_rejected(self):
+        with self.assertRaises(IntegrityError):
+            StudentParticipation.objects.create(student=self.students[0], examination=self.examination)
+
+
+# Every SQLite connection is tuned for concurrent readers and writers
+@skipUnless(connection.vendor == 'sqlite', 'Pragmas are SQLite specific')
+class DatabaseProfileTests(TestCase):
+    def test_connection_pragmas(self):
+        description = describe(connection)
+        self.assertEqual(description['busy_timeout'], 5000)
+        self.assertEqual(description['synchronous'], 1)
+        self.assertEqual(description['temp_store'], 2)
+
+
+# Query budgets of the exam-day request paths
+class QueryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        answer_buffer.flush_interval = 0
+        self.category, self.examination, self.students = create_exam_fixtures()
+        response = self.client.post(
+            '/auth/login/', {'email': 'student0@example.com', 'password': 'password'},
+            content_type='application/json',
+        )
+        self.auth = {'HTTP_AUTHORIZATION': f"Bearer {response.json()['token']}"}
+
+    def join(self):
+        return self.client.post(
+            '/exams/join/', {'examination_id': str(self.examination.pk), 'pass_key': 'secret'},
+            content_type='application/json', **self.auth,
+        )
+
+    def test_warm_paper_generation_is_query_free(self):
+        participation = StudentParticipation.objects.create(student=self.students[0], examination=self.examination)
+        papers.generate_paper(participation, self.examination)
+        with self.assertNumQueries(0):
+            paper = papers.generate_paper(participation, self.examination)
+        self.assertEqual(len(paper), self.examination.number_of_questions)
+
+    def test_warm_join_only_inserts_the_participation(self):
+        payloads.prewarm(self.examination)
+        self.join()
+        StudentParticipation.objects.all().delete()
+        # SAVEPOINT, INSERT, RELEASE
+        with self.assertNumQueries(3):
+            response = self.join()
+        self.assertEqual(response.status_code, 201)
+
+    def test_rejoin_returns_the_same_paper(self):
+        first = self.join().json()
+        second = self.join()
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['questions'], first['questions'])
+        self.assertEqual(StudentParticipation.objects.count(), 1)
+
+    def test_paper_is_fixed_at_join(self):
+        joined = self.join().json()
+        paper = [question['question_id'] for question in joined['questions']]
+        self.assertEqual(StudentParticipation.objects.get(pk=joined['participation_id']).paper, paper)
+
+        # Pool edits during the examination must not change the paper.
+        disabled = Question.objects.get(pk=paper[0])
+        disabled.is_enable = False
+        disabled.save()
+        Question.objects.filter(category=self.category).exclude(pk__in=paper).update(is_enable=True)
+        papers.invalidate_pool(self.category.pk, 'easy')
+
+        response = self.client.get(
+            f"/exams/{self.examination.pk}/participations/{joined['participation_id']}/paper/", **self.auth,
+        )
+        self.assertEqual([question['question_id'] for question in response.json()['questions']], paper)
+        self.assertEqual([question['question_id'] for question in self.join().json()['questions']], paper)
+
+    def test_paper_questions_are_cached_separately_from_the_pool(self):
+        joined = self.join().json()
+        payload = payloads.get_payload(self.examination.pk)
+        self.assertNotIn('questions', payload)
+        paper = [question['question_id'] for question in joined['questions']]
+
+        cache.delete(payloads.question_key(paper[0]))
+        with self.assertNumQueries(1):
+            self.assertEqual([question['question_id'] for question in payloads.paper_questions(payload, paper)], paper)
+        with self.assertNumQueries(0):
+            payloads.paper_questions(payload, paper)
+
+    def test_payload_misses_are_built_once(self):
+        key = payloads.payload_key(self.examination.pk)
+        cache.add(f'{key}:building', True, 10)
+        built = payloads.build_payload(self.examination)
+        # Another request holds the build lock and finishes shortly.
+        threading.Timer(0.2, cache.set, [key, built, 60]).start()
+        with self.assertNumQueries(0):
+            self.assertEqual(payloads.get_payload(self.examination.pk), built)
+        self.assertLessEqual(payloads._payload_timeout(built), 60)
+
+    def test_deadline_thread_prewarms_upcoming_questions(self):
+        cache.clear()
+        self.assertEqual(deadlines.DeadlineScheduler().prewarm(), 1)
+        payload = payloads.get_payload(self.examination.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(payloads.paper_questions(payload, payload['pool'])), 24)
+        with self.assertRaises(CommandError):
+            call_command('prewarm_exams')
+
+    def test_warm_paper_fetch_and_autosave_are_query_free(self):
+        joined = self.join().json()
+        participation_id = joined['participation_id']
+        question_id = joined['questions'][0]['question_id']
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                f'/exams/{self.examination.pk}/participations/{participation_id}/paper/', **self.auth,
+            )
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.post(
+                '/exams/autosave/', {'participation_id': participation_id, 'answers': {question_id: 'a'}},
+                content_type='application/json', **self.auth,
+            )
+        self.assertEqual(response.status_code, 202)
+        answer_buffer.flush()
+
+    def test_autosave_rejects_questions_outside_the_paper(self):
+        joined = self.join().json()
+        paper = {question['question_id'] for question in joined['questions']}
+        outside = Question.objects.filter(category=self.category).exclude(pk__in=paper).first()
+        with self.assertNumQueries(0):
+            response = self.client.post(
+                '/exams/autosave/', {'participation_id': joined['participation_id'], 'answers': {str(outside.pk): 'a'}},
+                content_type='application/json', **self.auth,
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(answer_buffer.stats()['buffered'], 0)
+
+    def test_flushes_merge_into_one_result_row(self):
+        joined = self.join().json()
+        first, second = [question['question_id'] for question in joined['questions'][:2]]
+        answer_buffer.add(joined['participation_id'], {first: 'a'})
+        answer_buffer.flush()
+        answer_buffer.add(joined['participation_id'], {second: 'b'})
+        answer_buffer.flush()
+        result = StudentResult.objects.get(participation_id=joined['participation_id'])
+        self.assertEqual(result.question_result, {first: {'answer': 'a'}, second: {'answer': 'b'}})
+        with self.assertRaises(IntegrityError):
+            StudentResult.objects.create(participation_id=joined['participation_id'], question_result={})
+
+
+    def test_submit_keeps_final_answers_buffered_elsewhere(self):
+        joined = self.join().json()
+        participation_id = joined['participation_id']
+        first, second = [question['question_id'] for question in joined['questions'][:2]]
+        # The last autosave went to another worker, whose buffer flushes after the submit.
+        other_worker = AnswerBuffer(flush_interval=0)
+        other_worker.add(participation_id, {first: 'b', second: 'c'})
+
+        response = self.client.post(
+            f'/exams/participations/{participation_id}/submit/', {'answers': {first: 'a', second: 'c'}},
+            content_type='application/json', **self.auth,
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        other_worker.flush()
+        self.assertEqual(other_worker.stats()['dropped'], 2)
+        result = StudentResult.objects.get(participation_id=participation_id)
+        self.assertEqual(result.question_result, {first: {'answer': 'a'}, second: {'answer': 'c'}})
+        self.assertIsNotNone(result.score)
+
+
+# Logins check the hash once; tokens are revoked by password changes and disabling
+class AuthenticationTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        _, _, self.students = create_exam_fixtures(questions=0, students=1)
+        self.student = self.students[0]
+
+    def login(self, password='password', email='student0@example.com'):
+        return self.client.post('/auth/login/', {'email': email, 'password': password},
+                                content_type='application/json')
+
+    def test_bad_password_is_rejected(self):
+        self.assertEqual(self.login('wrong').status_code, 401)
+        self.assertEqual(self.login(email='nobody@example.com').status_code, 401)
+
+    def test_legacy_plain_text_password_is_rehashed(self):
+        Student.objects.filter(pk=self.student.pk).update(student_password='plain-text')
+        self.assertEqual(self.login('plain-text').status_code, 200)
+        stored = Student.objects.get(pk=self.student.pk).student_password
+        self.assertNotEqual(stored, 'plain-text')
+        self.assertTrue(check_password('plain-text', stored))
+
+    def test_warm_token_is_query_free(self):
+        token = self.login().json()['token']
+        self.assertEqual(authenticate_token(token).pk, self.student.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(authenticate_token(token).pk, self.student.pk)
+
+    def test_password_change_rejects_old_tokens(self):
+        token = self.login().json()['token']
+        # Another process changed it, so only the password stamp can tell.
+        Student.objects.filter(pk=self.student.pk).update(student_password=make_password('changed'))
+        token_cache.clear()
+        self.assertIsNone(authenticate_token(token))
+        self.assertIsNotNone(authenticate_token(self.login('changed').json()['token']))
+
+    def test_disabling_through_save_revokes_cached_tokens(self):
+        token = self.login().json()['token']
+        self.assertIsNotNone(authenticate_token(token))
+        self.student.is_enable = False
+        self.student.save()
+        self.assertIsNone(authenticate_token(token))
+        self.assertEqual(self.login().status_code, 401)
+
+
+# Versioned caches miss once their scope is invalidated
+class VersionedCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category, self.examination, _ = create_exam_fixtures(students=0)
+
+    def test_invalidation_and_lost_versions_never_serve_old_entries(self):
+        versioned = caching.VersionedCache('test_scope')
+        self.addCleanup(caching.VersionedCache.registry.pop, 'test_scope', None)
+        loads = []
+
+        def load():
+            loads.append(len(loads) + 1)
+            return loads[-1]
+
+        self.assertEqual(versioned.get_or_load('scope', load), 1)
+        self.assertEqual(versioned.get_or_load('scope', load), 1)
+        versioned.invalidate('scope')
+        self.assertEqual(versioned.get_or_load('scope', load), 2)
+        self.assertEqual(versioned.get_or_load('other', load), 3)
+
+        # A version key evicted from the cache restarts above every version used so far.
+        cache.delete(versioned._version_key('scope'))
+        self.assertEqual(versioned.get_or_load('scope', load), 4)
+        self.assertEqual(versioned.stats()['invalidations'], 1)
+
+    def test_question_pool_invalidation_reaches_every_cache(self):
+        papers.get_pool(self.category.pk, 'easy')
+        caching.get_category_questions(self.category.pk)
+        payloads.prewarm(self.examination)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(papers.get_pool(self.category.pk, 'easy')), 24)
+            self.assertEqual(len(caching.get_category_questions(self.category.pk)), 24)
+            self.assertEqual(len(payloads.get_payload(self.examination.pk)['pool']), 24)
+
+        # QuerySet.update sends no signals, so callers invalidate explicitly.
+        Question.objects.filter(category=self.category).update(is_enable=True)
+        payloads.invalidate_question_pool(self.category.pk, 'easy')
+        self.assertEqual(len(papers.get_pool(self.category.pk, 'easy')), 30)
+        self.assertEqual(len(caching.get_category_questions(self.category.pk)), 30)
+        self.assertEqual(len(payloads.get_payload(self.examination.pk)['pool']), 30)
+
+
+# Scores count normalised answers to the questions of the student's own paper
+class GradingTests(TestCase):
+    def setUp(self):
+        self.category, self.examination, self.students = create_exam_fixtures(students=1)
+        self.pool = list(Question.objects.filter(category=self.category).values_list('pk', flat=True))
+
+    def test_true_false_and_short_answer_normalisation(self):
+        true_false = ('TF', grading.normalize_answers('TF', [True]))
+        self.assertTrue(grading.is_correct(true_false, ' Yes '))
+        self.assertTrue(grading.is_correct(true_false, {'answer': 'T'}))
+        self.assertFalse(grading.is_correct(true_false, 'no'))
+
+        short_answer = ('SA', grading.normalize_answers('SA', ['Islamabad', 'Islamabad  City']))
+        self.assertTrue(grading.is_correct(short_answer, '  islamabad city'))
+        self.assertFalse(grading.is_correct(short_answer, ['Islamabad', 'Lahore']))
+        self.assertFalse(grading.is_correct(short_answer, ''))
+
+        multiple = ('MCQ', grading.normalize_answers('MCQ', ['a', 'c']))
+        self.assertTrue(grading.is_correct(multiple, ['C', 'a']))
+        self.assertFalse(grading.is_correct(multiple, ['a']))
+
+    def test_only_paper_questions_are_scored(self):
+        other = QuestionCategory.objects.create(question_category_name='Other')
+        foreign = Question.objects.create(question_text='Foreign', answers=['a'], correct_answers=['a'],
+                                          question_type='MCQ', category=other, question_level='easy')
+        participation = StudentParticipation.objects.create(
+            student=self.students[0], examination=self.examination, paper=[str(pk) for pk in self.pool[:3]],
+        )
+        StudentResult.objects.create(participation=participation, question_result={
+            str(question_id): 'a' for question_id in [*self.pool, foreign.pk]
+        })
+        StudentParticipation.objects.filter(pk=participation.pk).update(submit_date_time=timezone.now())
+
+        submissions.finalize([participation.pk])
+        self.assertEqual(StudentResult.objects.get(participation=participation).score, 3.0)
+        self.assertEqual(ExamScore.objects.get(participation=participation).score, 3.0)
+
+        grading.grade_examination(self.examination, workers=1)
+        self.assertEqual(StudentResult.objects.get(participation=participation).score, 3.0)
+        self.assertEqual(ExamScore.objects.get(participation=participation).score, 3.0)
+
+
+# Submissions feed the per-question counters once; regrades rescore them
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        self.category, self.examination, self.students = create_exam_fixtures(students=1)
+        self.paper = list(Question.objects.filter(category=self.category, is_enable=True)[:3])
+        other = QuestionCategory.objects.create(question_category_name='Other')
+        self.foreign = Question.objects.create(question_text='Foreign', answers=['a'], correct_answers=['a'],
+                                               question_type='MCQ', category=other, question_level='easy')
+        self.participation = StudentParticipation.objects.create(
+            student=self.students[0], examination=self.examination,
+            paper=[str(question.pk) for question in self.paper], submit_date_time=timezone.now(),
+        )
+        off_paper = Question.objects.filter(category=self.category).exclude(
+            pk__in=[question.pk for question in self.paper]).first()
+        StudentResult.objects.create(participation=self.participation, question_result={
+            str(self.paper[0].pk): {'answer': 'a', 'time_spent': 10},
+            str(self.paper[1].pk): 'b',
+            str(off_paper.pk): 'a',
+            str(self.foreign.pk): 'a',
+        })
+
+    def statistics(self, question):
+        return QuestionStatistics.objects.filter(question=question).values_list(
+            'attempt_count', 'correct_count', 'total_time_spent', 'timed_attempt_count').first()
+
+    def test_submission_increments_paper_counters_once(self):
+        submissions.finalize([self.participation.pk])
+        self.assertEqual(StudentAnswer.objects.filter(participation=self.participation).count(), 2)
+        self.assertEqual(self.statistics(self.paper[0]), (1, 1, 10, 1))
+        self.assertEqual(self.statistics(self.paper[1]), (1, 0, 0, 0))
+        self.assertIsNone(self.statistics(self.foreign))
+
+        self.assertEqual(analytics.record_submissions([self.participation.pk]), 0)
+        self.assertEqual(self.statistics(self.paper[0]), (1, 1, 10, 1))
+
+    def test_regrade_rescores_answers_and_counters(self):
+        submissions.finalize([self.participation.pk])
+        self.paper[1].correct_answers = ['b']
+        self.paper[1].save()
+        grading.grade_examination(self.examination, workers=1)
+        self.assertEqual(self.statistics(self.paper[1]), (1, 1, 0, 0))
+        self.assertEqual(StudentResult.objects.get(participation=self.participation).score, 2.0)
+        self.assertEqual(analytics.item_analysis(self.paper[1])['percent_correct'], 100.0)
+
+    def test_discrimination_ranks_by_stored_score(self):
+        question = self.paper[0]
+        students = [self.students[0], *[
+            Student.objects.create(student_roll_no=f'D-{number}', student_name=f'Ranked {number}',
+                                   student_email=f'ranked{number}@example.com', student_phone='0300',
+                                   student_password='password')
+            for number in range(3)
+        ]]
+        # Those who got the question right have the lowest totals.
+        for student, correct, score in zip(students, (True, True, False, False), (0, 1, 10, 9)):
+            participation = StudentParticipation.objects.get_or_create(
+                student=student, examination=self.examination, defaults={'submit_date_time': timezone.now()},
+            )[0]
+            StudentAnswer.objects.create(participation=participation, question=question, chosen_answer='a',
+                                         is_correct=correct)
+            ExamScore.objects.create(participation=participation, examination=self.examination, student=student,
+                                     score=score, submit_date_time=timezone.now())
+        QuestionStatistics.objects.create(question=question, attempt_count=4, correct_count=2)
+
+        with self.assertNumQueries(4):
+            analysis = analytics.item_analysis(question)
+        self.assertEqual(analysis['discrimination_index'], -1.0)
+
+
+# Ranks follow the board order and pages never repeat or skip rows
+class ScoreboardTests(TestCase):
+    def setUp(self):
+        self.category, self.examination, _ = create_exam_fixtures(students=0)
+        self.started = timezone.now() - timedelta(minutes=30)
+        self.scores = {}
+        for number, score in enumerate([3, 5, 5, 1, 5, 2, 3]):
+            self.submit(number, score)
+        staff = User.objects.create_user('staff', password='password', is_staff=True)
+        self.client.force_login(staff)
+
+    def submit(self, number, score):
+        student = Student.objects.create(
+            student_roll_no=f'S-{number}', student_name=f'Student {number}', student_email=f's{number}@example.com',
+            student_phone='0300', student_password='unusable',
+        )
+        participation = StudentParticipation.objects.create(
+            student=student, examination=self.examination, submit_date_time=self.started + timedelta(minutes=number),
+        )
+        self.scores[participation.pk] = float(score)
+        scoreboard.record({participation.pk: float(score)})
+        return participation
+
+    def page(self, url=None, **params):
+        response = self.client.get(url or f'/exams/{self.examination.pk}/scoreboard/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_ranks_and_cursor_pages(self):
+        first = self.page(page_size=3)
+        self.assertEqual([(row['rank'], row['score'], row['student_roll_no']) for row in first['results']],
+                         [(1, 5.0, 'S-1'), (2, 5.0, 'S-2'), (3, 5.0, 'S-4')])
+        self.assertIsNone(first['previous'])
+
+        # A submission ahead of the cursor shifts ranks but not the page contents.
+        self.submit(7, 9)
+        second = self.page(first['next'])
+        self.assertEqual([(row['rank'], row['student_roll_no']) for row in second['results']],
+                         [(5, 'S-0'), (6, 'S-6'), (7, 'S-5')])
+        last = self.page(second['next'])
+        self.assertEqual([(row['rank'], row['student_roll_no']) for row in last['results']], [(8, 'S-3')])
+        self.assertIsNone(last['next'])
+
+        back = self.page(second['previous'])
+        self.assertEqual([row['student_roll_no'] for row in back['results']], ['S-1', 'S-2', 'S-4'])
+        self.assertEqual(back['results'][0]['rank'], 2)
+
+    def test_regrade_moves_a_row_with_one_upsert(self):
+        participation = StudentParticipation.objects.get(student__student_roll_no='S-3')
+        with self.assertNumQueries(2):
+            scoreboard.record({participation.pk: 6.0})
+        self.assertEqual(self.page(page_size=1)['results'][0]['student_roll_no'], 'S-3')
+        self.assertEqual(ExamScore.objects.filter(examination=self.examination).count(), 7)
+
+
+# The REST API must not issue a query per listed row
+class ApiQueryCountTests(TestCase):
+    endpoints = ['students', 'teachers', 'question-categories', 'questions', 'examinations',
+                 'participations', 'results']
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.teacher = Teacher.objects.create(
+            teacher_name='Teacher', teacher_email='teacher@example.com', teacher_phone='0300',
+            teacher_password='password',
+        )
+        self.client.force_login(self.admin)
+        self.rows = 0
+
+    def add_rows(self, count):
+        for _ in range(count):
+            number = self.rows
+            self.rows += 1
+            category = QuestionCategory.objects.create(
+                question_category_name=f'Category {number}', created_by=self.admin, updated_by=self.admin,
+            )
+            Question.objects.create(
+                question_text=f'Question {number}', answers=['a', 'b'], correct_answers=['a'], question_type='MCQ',
+                category=category, question_level='easy', created_by=self.teacher, updated_by=self.teacher,
+            )
+            examination = Examination.objects.create(
+                examination_name=f'Exam {number}', number_of_questions=1, level='easy', category=category,
+                pass_key='key', start_time=timezone.now(), margin_time=30,
+                created_by=self.teacher, updated_by=self.teacher,
+            )
+            student = Student.objects.create(
+                student_roll_no=f'R-{number}', student_name=f'Student {number}',
+                student_email=f'student{number}@example.com', student_phone='0300', student_password='password',
+                created_by=self.admin, updated_by=self.admin,
+            )
+            Teacher.objects.create(
+                teacher_name=f'Teacher {number}', teacher_email=f'teacher{number}@example.com',
+                teacher_phone='0300', teacher_password='password', created_by=self.admin, updated_by=self.admin,
+            )
+            participation = StudentParticipation.objects.create(student=student, examination=examination)
+            StudentResult.objects.create(participation=participation, question_result={})
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(context.captured_queries), response
+
+    def test_list_query_count_is_constant(self):
+        self.add_rows(2)
+        for endpoint in self.endpoints:
+            small, _ = self.count_queries(f'/api/{endpoint}/')
+            self.add_rows(5)
+            large, response = self.count_queries(f'/api/{endpoint}/')
+            self.assertGreater(len(response.json()['results']), 2)
+            self.assertEqual(small, large, endpoint)
+
+    def test_sparse_fieldsets(self):
+        self.add_rows(1)
+        response = self.client.get('/api/students/?fields=student_id,student_name')
+        self.assertEqual(set(response.json()['results'][0]), {'student_id', 'student_name'})
+
+    def test_passwords_are_hashed_and_never_returned(self):
+        response = self.client.post('/api/students/', {
+            'student_roll_no': 'R-new', 'student_name': 'New', 'student_email': 'new@example.com',
+            'student_phone': '0300', 'student_password': 'secret',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertNotIn('student_password', response.json())
+        student = Student.objects.get(student_roll_no='R-new')
+        self.assertTrue(check_password('secret', student.student_password))
+        self.assertEqual(student.created_by, self.admin)
+
+    def test_conditional_get(self):
+        self.add_rows(2)
+        response = self.client.get('/api/questions/')
+        etag = response['ETag']
+        with self.assertNumQueries(3):  # session, user, MAX/COUNT
+            response = self.client.get('/api/questions/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn('Last-Modified', response)
+
+        question = Question.objects.first()
+        detail = self.client.get(f'/api/questions/{question.pk}/')
+        self.assertEqual(
+            self.client.get(f'/api/questions/{question.pk}/', HTTP_IF_NONE_MATCH=detail['ETag']).status_code, 304,
+        )
+        self.assertEqual(self.client.get(f'/api/questions/{question.pk}/',
+                                         HTTP_IF_MODIFIED_SINCE=detail['Last-Modified']).status_code, 304)
+        self.add_rows(1)
+        self.assertEqual(self.client.get('/api/questions/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_changes_after_a_delete(self):
+        self.add_rows(2)
+        listed = self.client.get('/api/questions/')
+        # An older row is deleted, so MAX(updated_at) stays where it was.
+        Question.objects.order_by('updated_at').first().delete()
+        since = http_date(time.time() + 60)
+        self.assertEqual(self.client.get('/api/questions/', HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+        self.assertEqual(self.client.get('/api/questions/', HTTP_IF_NONE_MATCH=listed['ETag']).status_code, 200)
+
+    def test_anonymous_users_cannot_read_answer_keys(self):
+        self.client.logout()
+        self.assertIn(self.client.get('/api/questions/').status_code, (401, 403))
+
+
+# Finished exports resume with Range and If-Range
+class ExportDownloadTests(TestCase):
+    body = b'0123456789' * 10
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        export_root = override_settings(EXPORT_ROOT=Path(root.name))
+        export_root.enable()
+        self.addCleanup(export_root.disable)
+        (exports.export_root() / 'results.csv').write_bytes(self.body)
+        self.client.force_login(User.objects.create_user('staff', password='password', is_staff=True))
+
+    def download(self, **headers):
+        return self.client.get('/exports/results.csv/', **headers)
+
+    def test_parse_range(self):
+        self.assertEqual(exports._parse_range('bytes=10-19', 100), (10, 19))
+        self.assertEqual(exports._parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(exports._parse_range('bytes=95-200', 100), (95, 99))
+        self.assertEqual(exports._parse_range('bytes=-5', 100), (95, 99))
+        self.assertEqual(exports._parse_range('bytes=-500', 100), (0, 99))
+        for header in ('bytes=20-10', 'bytes=100-', 'bytes=-', 'bytes=0-1,5-6', 'items=0-1', 'bytes=a-b'):
+            self.assertIsNone(exports._parse_range(header, 100), header)
+
+    def test_full_and_partial_downloads(self):
+        response = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+
+        partial = self.download(HTTP_RANGE='bytes=10-24')
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial['Content-Range'], 'bytes 10-24/100')
+        self.assertEqual(partial['Content-Length'], '15')
+        self.assertEqual(b''.join(partial.streaming_content), self.body[10:25])
+
+    def test_if_range_resumes_only_the_same_file(self):
+        etag = self.download()['ETag']
+        resumed = self.download(HTTP_RANGE='bytes=50-', HTTP_IF_RANGE=etag)
+        self.assertEqual(resumed.status_code, 206)
+        self.assertEqual(b''.join(resumed.streaming_content), self.body[50:])
+
+        # A changed file is sent whole rather than spliced onto the old one.
+        stale = self.download(HTTP_RANGE='bytes=50-', HTTP_IF_RANGE='"0-0"')
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(b''.join(stale.streaming_content), self.body)
+
+    def test_unsatisfiable_range(self):
+        response = self.download(HTTP_RANGE='bytes=100-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+
+# Result exports cover every participation, one column per paper question
+class ResultExportTests(TestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        export_root = override_settings(EXPORT_ROOT=Path(root.name))
+        export_root.enable()
+        self.addCleanup(export_root.disable)
+        self.category, self.examination, self.students = create_exam_fixtures()
+        pool = list(Question.objects.filter(is_enable=True).order_by('created_at', 'question_id')
+                    .values_list('question_id', flat=True))
+        self.paper = [str(pk) for pk in pool[:3]]
+        answered = StudentParticipation.objects.create(
+            student=self.students[0], examination=self.examination, paper=self.paper,
+            submit_date_time=timezone.now(),
+        )
+        StudentResult.objects.create(participation=answered, question_result={self.paper[0]: ['a']}, score=1)
+        # Auto-submitted at the deadline without a single autosave.
+        StudentParticipation.objects.create(
+            student=self.students[1], examination=self.examination, paper=self.paper[1:],
+            submit_date_time=timezone.now(),
+        )
+
+    def test_every_participation_is_exported_with_paper_columns(self):
+        header, *rows = exports.result_rows(self.examination)
+        self.assertEqual(header[6:], [f'Q{number}:{pk}' for number, pk in enumerate(self.paper, start=1)])
+        self.assertEqual([row[0] for row in rows], ['R-0', 'R-1'])
+        self.assertEqual(rows[0][5:], [1, 'a', '', ''])
+        self.assertEqual(rows[1][5:], ['', '', '', ''])
+
+    def test_new_export_replaces_the_previous_one(self):
+        old = exports.export_root() / f'results-{self.examination.pk}-20000101000000.csv'
+        old.write_text('old')
+        stale = exports.export_root() / 'results-other-20000101000000.csv.part'
+        stale.write_text('partial')
+        os.utime(stale, (0, 0))
+
+        exports.write_export(self.examination, 'csv')
+        path = exports.write_export(self.examination, 'csv')
+        self.assertEqual(list(exports.export_root().iterdir()), [path])
+        self.assertFalse(stale.exists())
+
+    @skipUnless(exports.openpyxl, 'openpyxl is not installed')
+    def test_xlsx_export(self):
+        path = exports.write_export(self.examination, 'xlsx')
+        sheet = exports.openpyxl.load_workbook(path, read_only=True).active
+        self.assertEqual([row[0] for row in sheet.iter_rows(values_only=True)],
+                         ['student_roll_no', 'R-0', 'R-1'])
+
+
+# Per-view timings and query counts reach the /metrics endpoint
+class PerformanceMetricsTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def test_requests_are_recorded_per_view(self):
+        self.client.get('/api/students/')
+        self.client.post('/exams/autosave/', 'not json', content_type='application/json')
+
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('imtehangah_request_duration_seconds_count{view="student-list"} 1', body)
+        self.assertIn('imtehangah_responses_total{view="exam-autosave",status="4xx"} 1', body)
+        queries = next(line for line in body.splitlines()
+                       if line.startswith('imtehangah_request_queries_sum{view="student-list"}'))
+        self.assertGreater(float(queries.split()[-1]), 0)
+
+    @override_settings(PERF_METRICS_TOKEN='scrape-token')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token').status_code, 200)
+
+    def test_stale_snapshots_are_skipped_and_removed(self):
+        self.client.get('/api/students/')
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        directory = Path(root.name)
+        exited = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                                capture_output=True, text=True, check=True)
+        for name, pid, taken in (('old', os.getpid() + 1, time.time() - 3600),
+                                 ('exited', int(exited.stdout), time.time())):
+            data = {**metrics.snapshot(), 'pid': pid, 'taken': taken}
+            (directory / f'{name}.json').write_text(json.dumps(data), encoding='utf-8')
+
+        views, processes = metrics.read_snapshots(directory)
+        self.assertEqual(processes, 0)
+        self.assertEqual(views, {})
+        path = metrics.write_snapshot(directory)
+        self.assertEqual(list(directory.glob('*.json')), [path])
+        self.assertEqual(metrics.read_snapshots(directory)[0]['student-list'].duration.count, 1)
+
+
+# Admin actions and searches on the large tables
+class AdminTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.category, self.examination, self.students = create_exam_fixtures()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def test_disabling_a_filtered_selection_revokes_tokens(self):
+        token = self.client.post(
+            '/auth/login/', {'email': 'student0@example.com', 'password': 'password'},
+            content_type='application/json',
+        ).json()['token']
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        join = {'examination_id': str(self.examination.pk), 'pass_key': 'secret'}
+        self.assertEqual(self.client.post('/exams/join/', join, content_type='application/json', **auth).status_code,
+                         201)
+
+        # Filtered on is_enable, so the action's queryset is empty once updated.
+        self.client.post('/admin/usermanagement/student/?is_enable__exact=1', {
+            'action': 'disable_selected', '_selected_action': [str(self.students[0].pk)],
+        })
+        self.assertFalse(Student.objects.get(pk=self.students[0].pk).is_enable)
+        self.assertEqual(self.client.post('/exams/join/', join, content_type='application/json', **auth).status_code,
+                         401)
+
+    def test_question_search_uses_the_full_text_index(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/admin/usermanagement/question/', {'q': 'question 7'})
+        self.assertEqual([question.question_text for question in response.context['cl'].result_list],
+                         ['Question 7'])
+        self.assertFalse(any('LIKE' in query['sql'] for query in context.captured_queries))
+
+    def test_question_search_pages_through_every_match(self):
+        Question.objects.bulk_create([
+            Question(question_text=f'Extra question {number}', answers=['a'], correct_answers=['a'],
+                     question_type='MCQ', category=self.category, question_level='easy')
+            for number in range(search.MAX_LIMIT)
+        ])
+        response = self.client.get('/admin/usermanagement/question/', {'q': 'question', 'p': 3})
+        self.assertEqual(response.context['cl'].result_count, search.MAX_LIMIT + 30)
+        self.assertEqual(len(response.context['cl'].result_list), 30)
+
+
+# Bulk imports report bad rows by line and write the rest
+class ImporterTests(TestCase):
+    def student(self, number, **values):
+        return {'student_roll_no': f'I-{number}', 'student_name': f'Imported {number}',
+                'student_email': f'imported{number}@example.com', 'student_phone': '0300',
+                'student_password': 'password', **values}
+
+    def test_bad_rows_are_reported_per_line(self):
+        def rows():
+            yield 2, self.student(1)
+            yield 3, self.student(2, student_phone='0' * 20)
+            # Inserted after prepare(), so only the database can catch it.
+            Student.objects.create(student_roll_no='I-3', student_name='Existing',
+                                   student_email='existing@example.com', student_phone='0300',
+                                   student_password='password')
+            yield 4, self.student(3)
+            yield 5, self.student(4)
+
+        report = importers.StudentImporter(workers=1).run(rows())
+        self.assertEqual(report.created, 2)
+        self.assertEqual(report.skipped, 2)
+        self.assertEqual([line for line, _ in report.errors], [3, 4])
+        self.assertIn('student_phone', report.errors[0][1])
+        self.assertEqual(sorted(Student.objects.filter(student_name__startswith='Imported')
+                                .values_list('student_roll_no', flat=True)), ['I-1', 'I-4'])
+
+    def test_upload_is_imported_by_a_job(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        with override_settings(IMPORT_ROOT=Path(root.name)):
+            self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+            upload = SimpleUploadedFile('students.jsonl', '\n'.join(
+                json.dumps(self.student(number)) for number in range(3)).encode())
+            with patch.object(importers, 'ProcessPoolExecutor') as pool:
+                response = self.client.post('/imports/students/', {'file': upload})
+                self.assertEqual(response.status_code, 202)
+                self.assertEqual(response.json()['kind'], 'import_rows')
+                self.assertFalse(Student.objects.filter(student_name__startswith='Imported').exists())
+
+                self.assertEqual(jobs.run(jobs.claim('worker-1')[0]), Job.SUCCEEDED)
+            pool.assert_not_called()
+            self.assertEqual(Job.objects.get(pk=response.json()['job_id']).result['created'], 3)
+            self.assertEqual(Student.objects.filter(student_name__startswith='Imported').count(), 3)
+            self.assertEqual(list(Path(root.name).iterdir()), [])
+
+
+# Background jobs are deduplicated, claimed once and retried on failure
+class JobTests(TestCase):
+    def setUp(self):
+        self.category, self.examination, self.students = create_exam_fixtures(students=1)
+
+    def test_enqueue_deduplicates_active_jobs(self):
+        payload = {'examination_id': str(self.examination.pk)}
+        job, created = jobs.enqueue('grade_examination', payload)
+        again, created_again = jobs.enqueue('grade_examination', payload)
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(job.pk, again.pk)
+
+        self.assertEqual([claimed.pk for claimed in jobs.claim('worker-1', 5)], [job.pk])
+        self.assertEqual(jobs.claim('worker-2', 5), [])
+        self.assertEqual(jobs.run(Job.objects.get(pk=job.pk)), Job.SUCCEEDED)
+        job.refresh_from_db()
+        self.assertEqual(job.progress, 1.0)
+        self.assertEqual(job.result['examination_id'], str(self.examination.pk))
+
+        # Finished jobs no longer block a new one with the same key.
+        self.assertTrue(jobs.enqueue('grade_examination', payload)[1])
+
+    def test_failures_are_retried_with_backoff(self):
+        job, _ = jobs.enqueue('recompute_analytics', {'examination_id': str(self.examination.pk)})
+        claimed = jobs.claim('worker-1')[0]
+        with patch.object(analytics, 'rescore_answers', side_effect=RuntimeError('boom')), \
+                self.assertLogs('usermanagement.jobs', 'ERROR'):
+            self.assertEqual(jobs.run(claimed), Job.QUEUED)
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('boom', job.error)
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.assertEqual(jobs.run(jobs.claim('worker-1')[0]), Job.SUCCEEDED)
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+
+    def test_heartbeats_keep_jobs_and_stale_last_attempts_fail(self):
+        first, _ = jobs.enqueue('grade_examination', {'examination_id': str(self.examination.pk)})
+        second, _ = jobs.enqueue('recompute_analytics', {'examination_id': str(self.examination.pk)})
+        jobs.claim('worker-1', 2)
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        Job.objects.filter(pk=second.pk).update(attempts=F('max_attempts'))
+
+        self.assertEqual(jobs.heartbeat('worker-2', [first.pk]), 0)
+        self.assertEqual(jobs.heartbeat('worker-1', [first.pk]), 1)
+        self.assertEqual(jobs.recover_stale(after=60), (0, 1))
+        self.assertEqual(Job.objects.get(pk=first.pk).status, Job.RUNNING)
+        self.assertEqual(Job.objects.get(pk=second.pk).status, Job.FAILED)
+
+        Job.objects.filter(pk=first.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.recover_stale(after=60), (1, 0))
+        self.assertEqual(Job.objects.get(pk=first.pk).status, Job.QUEUED)
+
+    def test_outcome_of_a_released_job_is_dropped(self):
+        jobs.enqueue('recompute_analytics', {'examination_id': str(self.examination.pk)})
+        job = jobs.claim('worker-1')[0]
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        jobs.recover_stale(after=60)
+        jobs.claim('worker-2')
+        with self.assertLogs('usermanagement.jobs', 'WARNING'):
+            self.assertEqual(jobs.run(job), Job.RUNNING)
+        self.assertEqual(Job.objects.filter(pk=job.pk).values_list('status', 'locked_by').get(),
+                         (Job.RUNNING, 'worker-2'))
+
+    @override_settings(JOB_HEARTBEAT_INTERVAL=0.01)
+    def test_worker_heartbeats_until_its_jobs_finish_after_sigterm(self):
+        jobs.enqueue('recompute_analytics', {'examination_id': str(self.examination.pk)})
+        beat_after_stop = threading.Event()
+
+        def command():
+            return install.call_args.args[1].__self__
+
+        def run(job):
+            command()._stop(signal.SIGTERM, None)
+            beat_after_stop.wait(5)
+            return Job.SUCCEEDED
+
+        def heartbeat(worker_id, job_ids):
+            if command().stopping.is_set() and job_ids:
+                beat_after_stop.set()
+            return len(job_ids)
+
+        with patch.object(run_worker.signal, 'signal') as install, patch.object(jobs, 'run', run), \
+                patch.object(jobs, 'heartbeat', heartbeat):
+            call_command('run_worker', threads=1, poll=0.01, worker_id='worker-1', stdout=io.StringIO())
+        self.assertTrue(beat_after_stop.is_set())
+
+    def test_missing_examination_fails_without_retry(self):
+        jobs.enqueue('export_results', {'examination_id': str(uuid.uuid4())})
+        job = jobs.claim('worker-1')[0]
+        with self.assertLogs('usermanagement.jobs', 'ERROR'):
+            self.assertEqual(jobs.run(job), Job.FAILED)
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'Ranked search needs FTS5 or tsvector')
+class QuestionSearchTests(TestCase):
+    def setUp(self):
+        self.category = QuestionCategory.objects.create(question_category_name='Physics')
+        self.other = QuestionCategory.objects.create(question_category_name='Chemistry')
+
+        def question(text, answers, category=None, level='easy', enabled=True):
+            return Question.objects.create(
+                question_text=text, answers=answers, correct_answers=answers[:1], question_type='MCQ',
+                category=category or self.category, question_level=level, is_enable=enabled,
+            )
+
+        self.in_text = question('What is the unit of electric resistance?', ['Ohm', 'Volt'])
+        self.in_answers = question('Which unit measures potential difference?', ['Volt', 'resistance meter'])
+        self.hard = question('Explain electric resistance in metals.', ['Electrons scatter'], level='hard')
+        self.disabled = question('Electric resistance of copper?', ['Low'], enabled=False)
+        question('Electric resistance of ionic solutions?', ['High'], category=self.other)
+
+    def test_text_matches_rank_above_answer_matches(self):
+        results = search.search('resistance', category_id=self.category.pk, level='easy')
+        self.assertEqual([row['question_id'] for row in results], [self.in_text.pk, self.in_answers.pk])
+        self.assertGreater(results[0]['score'], results[1]['score'])
+
+    def test_prefix_filters_and_updates(self):
+        found = {row['question_id'] for row in search.search('electric resis', category_id=self.category.pk)}
+        self.assertEqual(found, {self.in_text.pk, self.hard.pk})
+        found = {row['question_id'] for row in search.search('electric resis', include_disabled=True, limit=10)}
+        self.assertEqual(len(found), 4)
+
+        self.in_text.question_text = 'What is the unit of capacitance?'
+        self.in_text.save()
+        self.hard.delete()
+        self.assertEqual(search.search('electric resis', category_id=self.category.pk), [])
+        self.assertEqual(search.search('capacit')[0]['question_id'], self.in_text.pk)
+
+    def test_migrate_restores_a_dropped_index(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'DROP TRIGGER {search.FTS_TABLE}_insert')
+            else:
+                cursor.execute(f'DROP INDEX {search.POSTGRESQL_INDEX}')
+        self.assertTrue(search.missing())
+
+        emit_post_migrate_signal(0, False, connection.alias)
+        self.assertEqual(search.missing(), set())
+        added = Question.objects.create(question_text='Define inductance.', answers=['Henry'], correct_answers=['Henry'],
+                                        question_type='MCQ', category=self.category, question_level='easy')
+        self.assertEqual([row['question_id'] for row in search.search('inductance')], [added.pk])
+
+    def test_view_requires_query(self):
+        staff = User.objects.create_user('staff', password='password', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get('/questions/search/', {'q': ' '}).status_code, 400)
+        response = self.client.get('/questions/search/', {'q': 'resistance', 'level': 'hard'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['question_id'] for row in response.json()['results']], [str(self.hard.pk)])
+
+
+class DuplicateQuestionTests(TestCase):
+    def setUp(self):
+        self.category = QuestionCategory.objects.create(question_category_name='History')
+        self.text = 'In which year did the first battle of Panipat take place between Babur and Ibrahim Lodi?'
+
+    def question(self, text, answers=('1526', '1556', '1761', '1857')):
+        return Question.objects.create(
+            question_text=text, answers=list(answers), correct_answers=['1526'], question_type='MCQ',
+            category=self.category, question_level='easy',
+        )
+
+    def test_near_duplicate_is_flagged_against_older_question(self):
+        original = self.question(self.text)
+        self.question('Who founded the Mughal empire in India?', ['Babur', 'Akbar'])
+        copy = self.question(self.text.replace('did', 'did the').replace('?', ' ?'))
+
+        flag = DuplicateQuestion.objects.get()
+        self.assertEqual((flag.question_id, flag.similar_to_id), (copy.pk, original.pk))
+        self.assertGreaterEqual(flag.similarity, duplicates.threshold())
+
+        copy.question_text = 'Name the river on whose banks the Harappan city of Mohenjo-daro was built.'
+        copy.save()
+        self.assertFalse(DuplicateQuestion.objects.exists())
+
+    def test_import_batches_are_compared_with_each_other(self):
+        original = self.question(self.text)
+        questions = [
+            Question(question_text=self.text, answers=['1526', '1556', '1761', '1857'], correct_answers=['1526'],
+                     question_type='MCQ', category=self.category, question_level='easy')
+            for _ in range(2)
+        ]
+        Question.objects.bulk_create(questions)
+        self.assertEqual(duplicates.index_questions(questions), 3)
+        self.assertEqual(
+            set(DuplicateQuestion.objects.values_list('question_id', 'similar_to_id')),
+            {(questions[0].pk, original.pk), (questions[1].pk, original.pk), (questions[1].pk, questions[0].pk)},
+        )
+
+
+class DeadlineSchedulerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        answer_buffer.flush_interval = 0
+        self.category, self.examination, self.students = create_exam_fixtures(students=2)
+        self.scheduler = deadlines.DeadlineScheduler(settle=0)
+        self.deadline = deadlines.deadline(self.examination)
+
+    def test_close_submits_open_participations_once(self):
+        open_one, submitted = [
+            StudentParticipation.objects.create(student=student, examination=self.examination)
+            for student in self.students
+        ]
+        StudentParticipation.objects.filter(pk=submitted.pk).update(submit_date_time=timezone.now())
+        question_id = str(Question.objects.filter(category=self.category).values_list('pk', flat=True).first())
+        answer_buffer.add(open_one.pk, {question_id: 'a'})
+
+        self.assertEqual(self.scheduler.restore(), 1)
+        self.assertEqual(self.scheduler.run_due(now=self.deadline - 1), 1)
+        self.assertIsNone(StudentParticipation.objects.get(pk=open_one.pk).submit_date_time)
+
+        self.assertIsNone(self.scheduler.run_due(now=self.deadline + 1))
+        open_one.refresh_from_db()
+        self.assertIsNotNone(open_one.submit_date_time)
+        result = StudentResult.objects.get(participation=open_one)
+        self.assertEqual(result.question_result, {question_id: {'answer': 'a'}})
+        self.assertIsNotNone(result.score)
+        self.assertEqual(self.scheduler.stats()['submitted'], 1)
+        self.assertEqual(deadlines.close_examination(self.examination.pk, now=self.deadline + 1), [])
+
+    def test_rescheduled_deadline_replaces_the_old_one(self):
+        self.scheduler.schedule_examination(self.examination)
+        self.examination.margin_time += 30
+        self.scheduler.schedule_examination(self.examination)
+        self.assertEqual(self.scheduler.run_due(now=self.deadline + 1), 30 * 60 - 1)
+        self.assertTrue(self.scheduler.accepts(self.examination.pk, now=self.deadline + 1))
+
+    def test_extension_in_another_process_is_honoured(self):
+        participation = StudentParticipation.objects.create(student=self.students[0], examination=self.examination)
+        other = deadlines.DeadlineScheduler(settle=0)
+        other.restore()
+        self.scheduler.restore()
+
+        # Neither scheduler instance is the one the save signal reschedules.
+        self.examination.margin_time += 60
+        self.examination.save()
+        self.assertEqual(other.deadline_of(self.examination.pk), self.deadline)
+
+        self.assertTrue(other.accepts(self.examination.pk, now=self.deadline + 1))
+        self.assertEqual(other.deadline_of(self.examination.pk), self.deadline + 60 * 60)
+        self.assertEqual(self.scheduler.deadline_of(self.examination.pk), self.deadline)
+        self.assertEqual(self.scheduler.run_due(now=self.deadline + 1), 60 * 60 - 1)
+        self.assertIsNone(StudentParticipation.objects.get(pk=participation.pk).submit_date_time)
+        self.assertEqual(self.scheduler.stats()['closed'], 0)
+
+    def test_late_autosave_is_rejected_without_queries(self):
+        response = self.client.post(
+            '/auth/login/', {'email': 'student0@example.com', 'password': 'password'},
+            content_type='application/json',
+        )
+        auth = {'HTTP_AUTHORIZATION': f"Bearer {response.json()['token']}"}
+        participation_id = self.client.post(
+            '/exams/join/', {'examination_id': str(self.examination.pk), 'pass_key': 'secret'},
+            content_type='application/json', **auth,
+        ).json()['participation_id']
+
+        Examination.objects.filter(pk=self.examination.pk).update(start_time=timezone.now() - timedelta(hours=2))
+        deadlines.scheduler.refresh(self.examination.pk)
+        # The first late autosave confirms the deadline; the rest are rejected from memory.
+        self.assertFalse(deadlines.scheduler.accepts(self.examination.pk))
+        with self.assertNumQueries(0):
+            response = self.client.post(
+                '/exams/autosave/', {'participation_id': participation_id, 'answers': {'q': 'a'}},
+                content_type='application/json', **auth,
+            )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(answer_buffer.stats()['buffered'], 0)
+        deadlines.scheduler.cancel(self.examination.pk)
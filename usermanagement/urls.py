@@ -1,6 +1,38 @@
-from django.urls import path
-from . import views
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
 
-urlpatterns = [
+from . import views, viewsets
+
+router = DefaultRouter()
+router.register('students', viewsets.StudentViewSet)
+router.register('teachers', viewsets.TeacherViewSet)
+router.register('question-categories', viewsets.QuestionCategoryViewSet)
+router.register('questions', viewsets.QuestionViewSet)
+router.register('examinations', viewsets.ExaminationViewSet)
+router.register('participations', viewsets.StudentParticipationViewSet)
+router.register('results', viewsets.StudentResultViewSet)
 
-]
\ No newline at end of file
+urlpatterns = [
+    path('api/', include(router.urls)),
+    path('auth/login/', views.LoginView.as_view(), name='auth-login'),
+    path('exams/join/', views.ExamJoinView.as_view(), name='exam-join'),
+    path('exams/<uuid:examination_id>/participations/<uuid:participation_id>/paper/',
+         views.ExamPaperView.as_view(), name='exam-paper'),
+    path('exams/autosave/', views.autosave_view, name='exam-autosave'),
+    path('exams/autosave/stats/', views.AutosaveStatsView.as_view(), name='exam-autosave-stats'),
+    path('cache/stats/', views.CacheStatsView.as_view(), name='cache-stats'),
+    path('metrics', views.metrics_view, name='metrics'),
+    path('jobs/', views.JobListView.as_view(), name='job-list'),
+    path('jobs/<uuid:job_id>/', views.JobDetailView.as_view(), name='job-detail'),
+    path('question-bank/', views.QuestionBankView.as_view(), name='question-bank'),
+    path('question-bank/<uuid:category_id>/', views.QuestionBankView.as_view(), name='question-bank-category'),
+    path('exams/<uuid:examination_id>/scoreboard/', views.ScoreboardView.as_view(), name='exam-scoreboard'),
+    path('exams/<uuid:examination_id>/export/', views.ResultExportView.as_view(), name='exam-export'),
+    path('exports/<str:name>/', views.ExportDownloadView.as_view(), name='export-download'),
+    path('questions/search/', views.QuestionSearchView.as_view(), name='question-search'),
+    path('questions/<uuid:question_id>/analysis/', views.QuestionAnalysisView.as_view(), name='question-analysis'),
+    path('questions/<uuid:question_id>/duplicates/', views.QuestionDuplicatesView.as_view(),
+         name='question-duplicates'),
+    path('imports/<str:kind>/', views.BulkImportView.as_view(), name='bulk-import'),
+    path('exams/participations/<uuid:participation_id>/submit/', views.submit_view, name='exam-submit'),
+]
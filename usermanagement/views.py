@@ -1,3 +1,460 @@
-from django.shortcuts import render
+import json
+import uuid
+from datetime import datetime, timezone as dt_timezone
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import generics, status
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import (
+    analytics, caching, deadlines, exports, importers, jobs, metrics, papers, participations, payloads, search,
+    submissions,
+)
+from .authentication import ExamTokenAuthentication, authenticate_token, cached_principal, issue_token, token_from_header
+from .autosave import answer_buffer
+from .models import DuplicateQuestion, ExamScore, Examination, Job, Question, StudentParticipation
+from .pagination import ModelCursorPagination, ScoreboardPagination
+from .permissions import IsStudent, IsTeacherOrStaff
+from .serializers import ExamJoinSerializer, ExamScoreSerializer, JobEnqueueSerializer, JobSerializer, LoginSerializer
+
+
+def _timestamp_to_iso(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc).isoformat()
+
+
+def _check_exam_window(payload):
+    now = timezone.now().timestamp()
+    if now < payload['start_time']:
+        return 'Examination has not started yet.'
+    if now > payload['close_time']:
+        return 'Examination is closed.'
+    return None
+
+
+# Student/teacher login; the password hash is only checked here
+class LoginView(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        serializer = LoginSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        instance = authenticate(request, email=data['email'], password=data['password'], role=data['role'])
+        if instance is None:
+            return Response({'detail': 'Invalid credentials.'}, status=status.HTTP_401_UNAUTHORIZED)
+        return Response({
+            'token': issue_token(instance),
+            'role': data['role'],
+            'id': str(instance.pk),
+        })
+
+
+async def _aprincipal(request):
+    token = token_from_header(request.headers.get('Authorization'))
+    if token is None:
+        return None
+    principal = cached_principal(token)
+    if principal is None:
+        principal = await sync_to_async(authenticate_token)(token)
+    return principal
+
+
+async def _aowned_participation(request, participation_id):
+    """Return ``(principal, (student_id, examination_id, paper))`` if the caller owns the participation."""
+    principal = await _aprincipal(request)
+    if principal is None or not principal.is_student:
+        return None, None
+    entry = participations.cached(participation_id)
+    if entry is None:
+        entry = await sync_to_async(participations.lookup)(participation_id)
+    if entry is None or entry[0] != str(principal.pk):
+        return principal, None
+    return principal, entry
+
+
+# Join an examination; served from the cached payload
+class ExamJoinView(APIView):
+    authentication_classes = [ExamTokenAuthentication]
+    permission_classes = [IsStudent]
+
+    def post(self, request):
+        serializer = ExamJoinSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        payload = payloads.get_payload(data['examination_id'])
+        if payload is None or not payload['is_enable']:
+            return Response({'detail': 'Examination not found.'}, status=status.HTTP_404_NOT_FOUND)
+        if not constant_time_compare(data['pass_key'], payload['pass_key']):
+            return Response({'detail': 'Invalid pass key.'}, status=status.HTTP_403_FORBIDDEN)
+        error = _check_exam_window(payload)
+        if error:
+            return Response({'detail': error}, status=status.HTTP_403_FORBIDDEN)
+
+        response_status = status.HTTP_201_CREATED
+        participation = StudentParticipation(student_id=request.user.pk, examination_id=data['examination_id'])
+        # The paper is fixed at join time; later pool changes do not alter it.
+        participation.paper = payloads.draw(payload, papers.paper_seed(participation))
+        try:
+            with transaction.atomic():
+                participation.save(force_insert=True)
+        except IntegrityError:
+            # Rejoining, e.g. after a reload: hand back the existing paper.
+            participation = StudentParticipation.objects.filter(
+                student_id=request.user.pk, examination_id=data['examination_id'],
+            ).first()
+            if participation is None:
+                return Response({'detail': 'Could not join the examination.'}, status=status.HTTP_400_BAD_REQUEST)
+            if participation.submit_date_time is not None:
+                return Response({'detail': 'Examination already submitted.'}, status=status.HTTP_409_CONFLICT)
+            response_status = status.HTTP_200_OK
+        paper = participation.paper
+        if paper is None:
+            # Joined before papers were stored.
+            paper = payloads.draw(payload, papers.paper_seed(participation))
+        participations.remember(participation.pk, request.user.pk, data['examination_id'], paper)
+        deadlines.scheduler.schedule(payload['examination_id'], payload['close_time'] + deadlines.grace())
+
+        return Response({
+            'participation_id': str(participation.pk),
+            'examination_id': payload['examination_id'],
+            'examination_name': payload['examination_name'],
+            'close_time': _timestamp_to_iso(payload['close_time']),
+            'questions': payloads.paper_questions(payload, paper),
+        }, status=response_status)
+
+
+# Re-fetch the paper of a participation without touching the database
+class ExamPaperView(APIView):
+    authentication_classes = [ExamTokenAuthentication]
+    permission_classes = [IsStudent]
+
+    def get(self, request, examination_id, participation_id):
+        entry = participations.lookup(participation_id)
+        if entry is None or entry[:2] != (str(request.user.pk), str(examination_id)):
+            return Response({'detail': 'Participation not found.'}, status=status.HTTP_404_NOT_FOUND)
+        payload = payloads.get_payload(examination_id)
+        if payload is None or not payload['is_enable']:
+            return Response({'detail': 'Examination not found.'}, status=status.HTTP_404_NOT_FOUND)
+        error = _check_exam_window(payload)
+        if error:
+            return Response({'detail': error}, status=status.HTTP_403_FORBIDDEN)
+        paper = entry[2] if entry[2] is not None else payloads.draw(payload, participation_id.int)
+        return Response({
+            'participation_id': str(participation_id),
+            'examination_id': payload['examination_id'],
+            'examination_name': payload['examination_name'],
+            'close_time': _timestamp_to_iso(payload['close_time']),
+            'questions': payloads.paper_questions(payload, paper),
+        })
+
+
+MAX_ANSWERS_PER_AUTOSAVE = 500
+
+
+def _parse_autosave(body):
+    try:
+        data = json.loads(body)
+        participation_id = uuid.UUID(str(data['participation_id']))
+    except (ValueError, KeyError, TypeError):
+        return None, None
+    answers = data.get('answers')
+    if not isinstance(answers, dict) or len(answers) > MAX_ANSWERS_PER_AUTOSAVE:
+        return None, None
+    return participation_id, answers
+
+
+def _parse_submit(body):
+    # The client's final answers; an empty body submits what was autosaved.
+    if not body:
+        return {}
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    answers = data.get('answers', {}) if isinstance(data, dict) else None
+    if not isinstance(answers, dict) or len(answers) > MAX_ANSWERS_PER_AUTOSAVE:
+        return None
+    return answers
+
+
+# Buffer an autosave in memory; persisted in batches by the answer buffer
+@csrf_exempt
+@require_POST
+async def autosave_view(request):
+    participation_id, answers = _parse_autosave(request.body)
+    if participation_id is None:
+        return JsonResponse({'detail': 'Invalid autosave.'}, status=400)
+    principal, entry = await _aowned_participation(request, participation_id)
+    if principal is None:
+        return JsonResponse({'detail': 'Authentication required.'}, status=401)
+    if entry is None:
+        return JsonResponse({'detail': 'Participation not found.'}, status=404)
+    _, examination_id, paper = entry
+    if not deadlines.scheduler.accepts(examination_id):
+        return JsonResponse({'detail': 'Examination is closed.'}, status=403)
+    # Participations joined before papers were stored are restricted at grading.
+    if paper is not None and any(str(question_id) not in paper for question_id in answers):
+        return JsonResponse({'detail': 'Answers must belong to the paper.'}, status=400)
+    if answer_buffer.add(participation_id, answers):
+        await sync_to_async(answer_buffer.flush)()
+    return JsonResponse({'saved': len(answers)}, status=202)
+
+
+# Final submit: persist the client's final answers, then stamp submit_date_time.
+# Autosaves still buffered in other processes are dropped once it is submitted,
+# so clients send every answer with the submit.
+@csrf_exempt
+@require_POST
+async def submit_view(request, participation_id):
+    answers = _parse_submit(request.body)
+    if answers is None:
+        return JsonResponse({'detail': 'Invalid submit.'}, status=400)
+    principal, entry = await _aowned_participation(request, participation_id)
+    if principal is None:
+        return JsonResponse({'detail': 'Authentication required.'}, status=401)
+    if entry is None:
+        return JsonResponse({'detail': 'Participation not found.'}, status=404)
+    _, examination_id, paper = entry
+    if answers:
+        if not deadlines.scheduler.accepts(examination_id):
+            return JsonResponse({'detail': 'Examination is closed.'}, status=403)
+        if paper is not None and any(str(question_id) not in paper for question_id in answers):
+            return JsonResponse({'detail': 'Answers must belong to the paper.'}, status=400)
+        answer_buffer.add(participation_id, answers)
+    await sync_to_async(answer_buffer.flush)([participation_id])
+    submitted_at = timezone.now()
+    updated = await StudentParticipation.objects.filter(
+        pk=participation_id, submit_date_time__isnull=True,
+    ).aupdate(submit_date_time=submitted_at)
+    if not updated:
+        return JsonResponse({'detail': 'Participation not found or already submitted.'}, status=409)
+    await sync_to_async(submissions.finalize)([participation_id])
+    return JsonResponse({'participation_id': str(participation_id), 'submit_date_time': submitted_at.isoformat()})
+
+
+class AutosaveStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(answer_buffer.stats())
+
+
+# Hit/miss/eviction counters of the versioned caches in this process
+class CacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(caching.all_stats())
+
+
+# Cached question bank: categories, then a category's questions
+class QuestionBankView(APIView):
+    permission_classes = [IsTeacherOrStaff]
+
+    def get(self, request, category_id=None):
+        include_disabled = request.query_params.get('include_disabled') in ('1', 'true')
+        if category_id is None:
+            return Response(caching.get_categories(include_disabled=include_disabled))
+        questions = caching.get_category_questions(
+            category_id, level=request.query_params.get('level'), include_disabled=include_disabled,
+        )
+        return Response(questions)
+
+
+def _gauges():
+    cache_stats = caching.all_stats()
+    buffer_stats = answer_buffer.stats()
+    return (
+        ('imtehangah_cache_events', 'Versioned cache hits, misses, evictions and invalidations.', [
+            ({'cache': namespace, 'event': event}, value)
+            for namespace, stats in sorted(cache_stats.items())
+            for event, value in stats.items() if event != 'hit_ratio'
+        ]),
+        ('imtehangah_autosave_buffer', 'Autosave buffer counters.', [
+            ({'stat': name}, value) for name, value in sorted(buffer_stats.items())
+        ]),
+        ('imtehangah_exam_deadlines', 'Deadline scheduler counters.', [
+            ({'stat': name}, value) for name, value in sorted(deadlines.scheduler.stats().items())
+        ]),
+    )
+
+
+# Prometheus scrape target with this process's request histograms
+@require_GET
+def metrics_view(request):
+    token = getattr(settings, 'PERF_METRICS_TOKEN', None)
+    if token and not constant_time_compare(token_from_header(request.headers.get('Authorization')) or '', token):
+        return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    return HttpResponse(metrics.render_prometheus(_gauges()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# Bulk upload of students, teachers or questions as CSV or JSONL, imported by a background job
+class BulkImportView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, kind):
+        if kind not in importers.IMPORTERS:
+            return Response({'detail': f"Unknown import '{kind}'."}, status=status.HTTP_404_NOT_FOUND)
+        uploaded = request.FILES.get('file')
+        if uploaded is None:
+            return Response({'detail': "Upload a CSV or JSONL 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('format') or importers.detect_format(uploaded.name)
+        if file_format not in importers.FORMATS:
+            return Response({'detail': f"Unknown format '{file_format}'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        name = importers.save_upload(uploaded, kind, file_format)
+        job, created = jobs.enqueue('import_rows', {'kind': kind, 'file': name, 'format': file_format},
+                                    user=request.user)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+# Item analysis of a question for teachers
+class QuestionAnalysisView(APIView):
+    permission_classes = [IsTeacherOrStaff]
+
+    def get(self, request, question_id):
+        question = Question.objects.filter(pk=question_id).only('pk').first()
+        if question is None:
+            return Response({'detail': 'Question not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(analytics.item_analysis(question))
+
+
+# Ranked full-text search over the question bank
+class QuestionSearchView(APIView):
+    permission_classes = [IsTeacherOrStaff]
+
+    def get(self, request):
+        params = request.query_params
+        query = params.get('q', '').strip()
+        if not search.terms(query):
+            return Response({'detail': "'q' is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            category_id = uuid.UUID(params['category']) if params.get('category') else None
+            limit = int(params.get('limit', 20))
+            offset = int(params.get('offset', 0))
+        except ValueError:
+            return Response({'detail': 'Invalid category, limit or offset.'}, status=status.HTTP_400_BAD_REQUEST)
+        results = search.search(
+            query,
+            category_id=category_id,
+            level=params.get('level'),
+            question_type=params.get('type'),
+            include_disabled=params.get('include_disabled') in ('1', 'true'),
+            limit=limit,
+            offset=offset,
+        )
+        return Response({'query': query, 'results': results})
+
+
+# Near duplicates of a question in both directions
+class QuestionDuplicatesView(APIView):
+    permission_classes = [IsTeacherOrStaff]
+
+    def get(self, request, question_id):
+        if not Question.objects.filter(pk=question_id).exists():
+            return Response({'detail': 'Question not found.'}, status=status.HTTP_404_NOT_FOUND)
+        include_dismissed = request.query_params.get('include_dismissed') in ('1', 'true')
+        flags = DuplicateQuestion.objects.filter(question_id=question_id) | DuplicateQuestion.objects.filter(
+            similar_to_id=question_id)
+        if not include_dismissed:
+            flags = flags.filter(is_dismissed=False)
+        results = []
+        for flag in flags.select_related('question', 'similar_to').order_by('-similarity'):
+            other = flag.similar_to if flag.question_id == question_id else flag.question
+            results.append({
+                'duplicate_question_id': flag.pk,
+                'question_id': other.pk,
+                'question_text': other.question_text,
+                'relation': 'duplicate_of' if flag.question_id == question_id else 'duplicated_by',
+                'similarity': flag.similarity,
+                'is_dismissed': flag.is_dismissed,
+            })
+        return Response(results)
+
+
+# Ranked results of an examination, keyset paginated in board order
+class ScoreboardView(generics.ListAPIView):
+    permission_classes = [IsTeacherOrStaff]
+    serializer_class = ExamScoreSerializer
+    pagination_class = ScoreboardPagination
+
+    def get_queryset(self):
+        return ExamScore.objects.filter(examination_id=self.kwargs['examination_id']).select_related('student')
+
+
+# Result export: CSV is streamed, XLSX is generated and then served resumably
+class ResultExportView(APIView):
+    permission_classes = [IsTeacherOrStaff]
+
+    def get(self, request, examination_id):
+        examination = Examination.objects.filter(pk=examination_id).first()
+        if examination is None:
+            return Response({'detail': 'Examination not found.'}, status=status.HTTP_404_NOT_FOUND)
+        file_format = request.query_params.get('type', 'csv')
+        if file_format == 'csv':
+            return exports.stream_csv(f'results-{examination.pk}.csv', exports.result_rows(examination))
+        if file_format == 'xlsx':
+            if exports.openpyxl is None:
+                return Response({'detail': 'XLSX export is not available.'}, status=status.HTTP_400_BAD_REQUEST)
+            if request.query_params.get('background') in ('1', 'true'):
+                job, created = jobs.enqueue('export_results', {'examination_id': str(examination.pk), 'format': 'xlsx'},
+                                            user=request.user)
+                return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+            path = exports.write_export(examination, 'xlsx')
+            return exports.ranged_file_response(request, path, exports.CONTENT_TYPES['xlsx'])
+        return Response({'detail': f"Unknown export type '{file_format}'."}, status=status.HTTP_400_BAD_REQUEST)
+
+
+# Download a generated export; supports Range requests for resuming
+class ExportDownloadView(APIView):
+    permission_classes = [IsTeacherOrStaff]
+
+    def get(self, request, name):
+        path = exports.resolve_export(name)
+        if path is None:
+            return Response({'detail': 'Export not found.'}, status=status.HTTP_404_NOT_FOUND)
+        content_type = exports.CONTENT_TYPES.get(path.suffix.lstrip('.'), 'application/octet-stream')
+        return exports.ranged_file_response(request, path, content_type)
+
+
+# Background jobs: list and enqueue
+class JobListView(generics.ListAPIView):
+    permission_classes = [IsTeacherOrStaff]
+    serializer_class = JobSerializer
+    pagination_class = ModelCursorPagination
+    cursor_ordering = ('-created_at', '-job_id')
+
+    def get_queryset(self):
+        queryset = Job.objects.all()
+        for field in ('status', 'kind'):
+            value = self.request.query_params.get(field)
+            if value:
+                queryset = queryset.filter(**{field: value})
+        return queryset
+
+    def post(self, request):
+        serializer = JobEnqueueSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        job, created = jobs.enqueue(data['kind'], data['payload'], data.get('dedup_key'), user=request.user)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK)
+
+
+# Status and progress of one job
+class JobDetailView(generics.RetrieveAPIView):
+    permission_classes = [IsTeacherOrStaff]
+    serializer_class = JobSerializer
+    queryset = Job.objects.all()
+    lookup_field = 'job_id'
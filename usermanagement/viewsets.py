@@ -0,0 +1,153 @@
+"""
+REST API for the usermanagement models.
+
+Every viewset joins the foreign keys its serializer reads, so a list costs
+the same number of queries however long it is. Lists use cursor pagination
+and answer conditional GETs from ``updated_at``.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status, viewsets
+from rest_framework.permissions import DjangoModelPermissions
+from rest_framework.response import Response
+
+from .authentication import ExamUser
+from .models import Examination, Question, QuestionCategory, Student, StudentParticipation, StudentResult, Teacher
+from .pagination import ModelCursorPagination
+from .serializers import (ExaminationSerializer, QuestionCategorySerializer, QuestionSerializer,
+                          StudentParticipationSerializer, StudentResultSerializer, StudentSerializer,
+                          TeacherSerializer)
+
+
+def _etag_matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    return header.strip() == '*' or etag in [tag.strip() for tag in header.split(',')]
+
+
+def _not_modified_since(request, last_modified):
+    header = request.headers.get('If-Modified-Since')
+    since = parse_http_date_safe(header) if header else None
+    return since is not None and last_modified is not None and int(last_modified.timestamp()) <= since
+
+
+class ConditionalGetMixin:
+    """
+    ETag and Last-Modified for list and detail GETs.
+
+    Lists are validated with one ``MAX(updated_at)``/``COUNT(*)`` query; a
+    matching client gets a 304 without the page being loaded or serialised.
+    Lists only carry an ETag: a delete or a row moving out of the filter
+    leaves ``MAX(updated_at)`` alone, so Last-Modified could not notice it.
+    """
+    conditional_field = 'updated_at'
+
+    def _is_not_modified(self, request, etag, last_modified):
+        if 'If-None-Match' in request.headers:
+            return _etag_matches(request, etag)
+        return _not_modified_since(request, last_modified)
+
+    def _apply_headers(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if not self.conditional_field:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        state = queryset.order_by().aggregate(last_modified=Max(self.conditional_field), count=Count('pk'))
+        last_modified = state['last_modified']
+        digest = hashlib.md5(
+            f"{request.get_full_path()}|{state['count']}|{last_modified and last_modified.isoformat()}".encode()
+        ).hexdigest()
+        etag = quote_etag(digest)
+        if _etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().list(request, *args, **kwargs)
+        return self._apply_headers(response, etag, None)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.conditional_field:
+            return super().retrieve(request, *args, **kwargs)
+        instance = self.get_object()
+        last_modified = getattr(instance, self.conditional_field)
+        digest = hashlib.md5(
+            f"{request.get_full_path()}|{instance.pk}|{last_modified and last_modified.isoformat()}".encode()
+        ).hexdigest()
+        etag = quote_etag(digest)
+        if self._is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(self.get_serializer(instance).data)
+        return self._apply_headers(response, etag, last_modified)
+
+
+class AuditedModelViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    permission_classes = [DjangoModelPermissions]
+    pagination_class = ModelCursorPagination
+    cursor_ordering = '-created_at'
+    # created_by/updated_by are auth users; Question and Examination point at teachers instead
+    audit_with_user = True
+
+    def _audit_fields(self, *names):
+        user = self.request.user
+        if not self.audit_with_user or not user.is_authenticated or isinstance(user, ExamUser):
+            return {}
+        return {name: user for name in names}
+
+    def perform_create(self, serializer):
+        serializer.save(**self._audit_fields('created_by', 'updated_by'))
+
+    def perform_update(self, serializer):
+        serializer.save(**self._audit_fields('updated_by'))
+
+
+class StudentViewSet(AuditedModelViewSet):
+    queryset = Student.objects.select_related('created_by', 'updated_by')
+    serializer_class = StudentSerializer
+
+
+class TeacherViewSet(AuditedModelViewSet):
+    queryset = Teacher.objects.select_related('created_by', 'updated_by')
+    serializer_class = TeacherSerializer
+
+
+class QuestionCategoryViewSet(AuditedModelViewSet):
+    queryset = QuestionCategory.objects.select_related('created_by', 'updated_by')
+    serializer_class = QuestionCategorySerializer
+
+
+class QuestionViewSet(AuditedModelViewSet):
+    queryset = Question.objects.select_related('category', 'created_by', 'updated_by')
+    serializer_class = QuestionSerializer
+    audit_with_user = False
+
+
+class ExaminationViewSet(AuditedModelViewSet):
+    queryset = Examination.objects.select_related('category', 'created_by', 'updated_by')
+    serializer_class = ExaminationSerializer
+    audit_with_user = False
+
+
+class StudentParticipationViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = StudentParticipation.objects.select_related('student', 'examination')
+    serializer_class = StudentParticipationSerializer
+    permission_classes = [DjangoModelPermissions]
+    pagination_class = ModelCursorPagination
+    cursor_ordering = '-join_date_time'
+    conditional_field = None
+
+
+class StudentResultViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = StudentResult.objects.select_related('participation__student', 'participation__examination')
+    serializer_class = StudentResultSerializer
+    permission_classes = [DjangoModelPermissions]
+    pagination_class = ModelCursorPagination
+    cursor_ordering = 'student_result_id'
+    conditional_field = None